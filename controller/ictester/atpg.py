@@ -0,0 +1,429 @@
+import os
+import random
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from ictester.part import PinType
+from ictester.test import TestLogic
+from ictester.sim import (Model, SimulationError, expected)
+from ictester.faultsim import (FAULTS_PER_JOB, fault_list, detect)
+
+'''
+Automatic test pattern generation.
+
+Tests are generated for single stuck-at faults of a part model with PODEM:
+tester-driven pins are assigned one at a time, guided by backtracing objectives
+(activate the fault, then move it through the D-frontier towards an output),
+each assignment is implied by simulating the fault-free and the faulty circuit,
+and assignments are reverted when the fault can no longer be detected.
+
+Sequential models are handled with time-frame expansion: the search assigns pins
+in a sequence of vectors (frames), starting from unknown state. Objectives on storage
+element outputs are backtraced to clock edges and data inputs in the same or the previous frame.
+Sequences of increasing length are tried until the fault is detected, with the fault
+activated in the last frame (leaving earlier frames to set up state), in the middle, or in the first one.
+
+Faults are split between worker processes. Each generated sequence is fault simulated
+to drop other faults it detects, and finally sequences are compacted with reverse order
+fault simulation: sequences detecting nothing that later ones don't detect are dropped.
+'''
+
+BACKTRACK_LIMIT = 32  # per search
+OBJECTIVE_LIMIT = 16  # objectives tried before giving up on a search step
+EFFORT_LIMIT = 400  # circuit simulations per fault
+FRAMES = (1, 2, 3, 4, 6, 8, 12, 16)  # sequence lengths tried for sequential models
+
+INVERTING = ("NAND", "NOR", "NOT", "XNOR")
+CONTROL = {"AND": 0, "NAND": 0, "OR": 1, "NOR": 1}
+
+
+# ------------------------------------------------------------------------
+def test_pins(part):
+    # tester-driven pins and checked outputs, by pin roles
+    inputs = sorted(num for num, pin in part.pins.items() if pin.role == PinType.IN)
+    outputs = sorted(num for num, pin in part.pins.items() if pin.role in (PinType.OUT, PinType.OC, PinType.ST3))
+    return inputs, outputs
+
+
+# ------------------------------------------------------------------------
+class Podem:
+    def __init__(self, model, inputs, outputs):
+        self.model = model
+        self.inputs = inputs
+        self.outputs = [o for o in outputs if o in model.nets]
+        # lane 0: fault-free circuit, lane 1: faulty circuit. All nets can be faulty.
+        self.sim = model.simulator(inputs, self.outputs, lanes=2, faults={net: (0, 0) for net in model.nets})
+        self.pos = {pin: i for i, pin in enumerate(inputs)}
+        self.storage = self.sim.storage
+        # elements reading each net, comb elements closest to outputs first
+        self.fanout = {}
+        for e in reversed(self.sim.comb):
+            for i in e.inputs:
+                self.fanout.setdefault(i, []).append(e)
+        self.rank = {e.output: n for n, e in enumerate(reversed(self.sim.comb))}
+
+    def value(self, frame, net, lane=0):
+        # net value: 1, 0 or None (unknown)
+        if net in ("0", "1"):
+            return int(net)
+        n = self.sim.index.get(net)
+        if n is None:
+            return None
+        return self.values[frame][lane][n]
+
+    def d(self, frame, net):
+        # fault effect on a net: fault-free and faulty values known and different
+        return net in self.effects[frame]
+
+    def assign(self, frame, pos, value):
+        self.vectors[frame][pos] = value
+        self.changed = min(self.changed, frame)
+
+    def imply(self):
+        # simulate frames starting with the first one that changed
+        if self.changed:
+            self.sim.restore(self.states[self.changed - 1])
+        else:
+            self.sim.reset()
+        del self.states[self.changed:]
+        del self.values[self.changed:]
+        del self.effects[self.changed:]
+        for vector in self.vectors[self.changed:]:
+            self.sim.step([(0, 0) if v is None else (3, 0) if v else (0, 3) for v in vector])
+            self.states.append(self.sim.save())
+            good = [1 if o & 1 else 0 if z & 1 else None for o, z in zip(self.sim.O, self.sim.Z)]
+            bad = [1 if o & 2 else 0 if z & 2 else None for o, z in zip(self.sim.O, self.sim.Z)]
+            self.values.append((good, bad))
+            self.effects.append(set(net for net, g, b in zip(self.sim.nets, good, bad) if g is not None and b == 1 - g))
+        self.changed = len(self.vectors)
+
+    def detected(self):
+        return any(self.d(f, pin) for f in range(len(self.vectors)) for pin in self.outputs)
+
+    def objectives(self):
+        # (frame, net, value) objectives, most promising first
+        net, stuck = self.fault
+        frames = range(len(self.vectors))
+        if not any(self.d(f, net) for f in frames):
+            if self.value(self.activation, net) is None:
+                yield self.activation, net, 1 - stuck
+            return
+
+        # D-frontier: elements with a fault effect on an input and unknown output
+        for f in frames:
+            frontier = set(e for net in self.effects[f] for e in self.fanout.get(net, []))
+            for e in sorted(frontier, key=lambda e: self.rank[e.output]):
+                if self.value(f, e.output) is not None and self.value(f, e.output, 1) is not None:
+                    continue
+                ds = [self.d(f, i) for i in e.inputs]
+                unknown = [i for i, dd in zip(e.inputs, ds) if not dd and self.value(f, i) is None]
+                if e.op in CONTROL:
+                    for i in unknown:
+                        yield f, i, 1 - CONTROL[e.op]
+                elif e.op == "MUX":
+                    s, a, b = e.inputs
+                    if ds[0]:
+                        for i, v in ((a, 0), (b, 1)):
+                            if self.value(f, i) is None:
+                                yield f, i, v
+                    elif self.value(f, s) is None:
+                        yield f, s, 0 if ds[1] else 1
+                elif e.op == "TRI":
+                    en, data = e.inputs
+                    if ds[1] and self.value(f, en) is None:
+                        yield f, en, 1
+                    elif ds[0] and self.value(f, data) is None:
+                        yield f, data, 1 - self.sim.pulls.get(e.output, 1)
+                else:
+                    for i in unknown:
+                        yield f, i, 0
+        # storage elements: the latest fault effects first, earlier frames are left for initialization
+        for f in reversed(frames):
+            for e in self.storage:
+                if not self.d(f, e.output) and any(self.d(f, i) for i in e.inputs):
+                    yield from self._storage_objectives(e, f)
+
+    def _storage_objectives(self, e, f):
+        # moving a fault effect from storage element inputs to its output
+        clk = e.inputs[0]
+        data = e.inputs[1:3] if e.op == "JKFF" else e.inputs[1:2]
+        rest = e.inputs[1 + len(data):]
+
+        # load frame: the one with a fault effect, or the next one if the effect is the clock staying low
+        load = f
+        if self.d(f, clk) and self.value(f, clk) == 0 and e.op != "LATCH":
+            load = f + 1
+            if load >= len(self.vectors):
+                return
+        faulty = self.value(load, e.output, 1)
+        if faulty is not None and self.value(load, e.output) is None:
+            yield load, e.output, 1 - faulty
+        if self.value(load, clk) is None:
+            yield load, clk, 1
+        if e.op != "LATCH" and load > 0 and self.value(load - 1, clk) is None:
+            yield load - 1, clk, 0
+        for i in rest:
+            if self.value(load, i) is None and not self.d(load, i):
+                yield load, i, 0
+
+        if faulty is None and load > 0:
+            # faulty machine state has to be known: initialize both machines in the previous frame,
+            # to the value that the fault effect changes
+            want = None
+            if e.op == "JKFF":
+                want = 0 if self.d(load, data[0]) else 1 if self.d(load, data[1]) else None
+            elif self.value(load, data[0]) is not None:
+                want = 1 - self.value(load, data[0])
+            if rest and self.d(load, rest[0]):
+                want = 0
+            if len(rest) > 1 and self.d(load, rest[1]):
+                want = 1
+            if len(rest) > 1 and want != 1:
+                yield load - 1, rest[1], 1
+            if rest and want != 0:
+                yield load - 1, rest[0], 1
+            yield load - 1, e.output, 0 if want is None else want
+
+    def backtrace(self, frame, net, value):
+        # tester-driven pin assignment (frame, pin, value) moving towards the objective.
+        # Depth-first search through nets with unknown values, alternatives are tried when a path is blocked.
+        visited = set()
+        stack = [iter([(frame, net, value)])]
+        while stack:
+            step = next(stack[-1], None)
+            if step is None:
+                stack.pop()
+                continue
+            frame, net, value = step
+            if frame < 0 or (frame, net) in visited or self.value(frame, net) is not None:
+                continue
+            visited.add((frame, net))
+            if net in self.pos:
+                return frame, self.pos[net], value
+            e = self.sim.drivers.get(net)
+            if e:
+                stack.append(iter(self._backtrace_storage(e, frame, value) if e.storage else self._backtrace_comb(e, frame, value)))
+        return None
+
+    def _backtrace_comb(self, e, frame, value):
+        target = value ^ (e.op in INVERTING)
+        if e.op == "MUX":
+            s, a, b = e.inputs
+            sv = self.value(frame, s)
+            if sv is None:
+                return [(frame, s, v) for v, data in ((0, a), (1, b)) if self.value(frame, data) != 1 - target]
+            return [(frame, b if sv else a, target)]
+        if e.op == "TRI":
+            en, data = e.inputs
+            ev = self.value(frame, en)
+            if ev is None:
+                return [(frame, en, 0 if self.sim.pulls.get(e.output, 1) == target else 1)]
+            return [(frame, data, target)] if ev else []
+        if e.op in ("XOR", "XNOR"):
+            steps = []
+            for i in e.inputs:
+                others = sum(self.value(frame, o) or 0 for o in e.inputs if o != i)
+                steps.append((frame, i, (target ^ others) & 1))
+            return steps
+        return [(frame, i, target) for i in e.inputs]
+
+    def _backtrace_storage(self, e, frame, value):
+        clk = e.inputs[0]
+        if e.op == "JKFF":
+            j, k = e.inputs[1:3]
+            data = [(j, 1), (k, 0)] if value else [(k, 1), (j, 0)]
+            rest = e.inputs[3:]
+        else:
+            data = [(e.inputs[1], value)]
+            rest = e.inputs[2:]
+        steps = []
+        # load on a clock edge (or an open latch), if it's still possible in this frame
+        if e.op == "LATCH":
+            edge = self.value(frame, clk) != 0
+            clock = [(frame, clk, 1)]
+        else:
+            edge = frame > 0 and self.value(frame, clk) != 0 and self.value(frame - 1, clk) != 1
+            clock = [(frame, clk, 1), (frame - 1, clk, 0)]
+        if edge:
+            steps += clock + [(frame, net, v) for net, v in data]
+        # asynchronous set/reset: the one forcing the opposite value has to be inactive, or the other one active
+        if value and len(rest) > 1:
+            steps.append((frame, rest[1], 0))
+        if not value and rest:
+            steps.append((frame, rest[0], 0))
+        if value and rest:
+            steps.append((frame, rest[0], 1))
+        if not value and len(rest) > 1:
+            steps.append((frame, rest[1], 1))
+        # state held from the previous frame
+        steps.append((frame - 1, e.output, value))
+        return steps
+
+    def search(self, fault):
+        # input vectors detecting the fault, trying sequences of increasing length
+        self.effort = 0
+        for frames in (FRAMES if self.storage else (1,)):
+            for activation in sorted({frames - 1, frames // 2, 0}, reverse=True):
+                try:
+                    vectors = self.run(fault, frames, activation)
+                except SimulationError:
+                    vectors = None
+                if vectors or self.effort > EFFORT_LIMIT:
+                    return vectors
+        return None
+
+    def run(self, fault, frames, activation=0):
+        # input vectors (None for unassigned inputs) detecting the fault, or None
+        self.fault = fault
+        self.activation = activation
+        self.sim.set_faults({fault[0]: (2, 0) if fault[1] == 0 else (0, 2)})
+        self.vectors = [[None] * len(self.inputs) for f in range(frames)]
+        self.states = []
+        self.values = []
+        self.effects = []
+        self.changed = 0
+        decisions = []
+        backtracks = 0
+        while True:
+            self.imply()
+            if self.detected():
+                return self.vectors
+            self.effort += 1
+            if self.effort > EFFORT_LIMIT:
+                return None
+            assignment = None
+            for objective in islice(self.objectives(), OBJECTIVE_LIMIT):
+                assignment = self.backtrace(*objective)
+                if assignment:
+                    break
+            if assignment:
+                f, pos, v = assignment
+                self.assign(f, pos, v)
+                decisions.append((f, pos, v, False))
+                continue
+            # no way forward: flip the most recent decision that wasn't flipped yet
+            while decisions:
+                f, pos, v, flipped = decisions.pop()
+                if not flipped:
+                    self.assign(f, pos, 1 - v)
+                    decisions.append((f, pos, 1 - v, True))
+                    break
+                self.assign(f, pos, None)
+            else:
+                return None
+            backtracks += 1
+            if backtracks > BACKTRACK_LIMIT:
+                return None
+
+
+# ------------------------------------------------------------------------
+def sequence_test(model, inputs, outputs, rows, name="ATPG"):
+    # test running input vectors with outputs expected by the model
+    part = model.part
+    test = TestLogic(name, inputs=inputs, outputs=outputs, body=[[r, None] for r in rows])
+    test.attach_part(part)
+    rows = [[r, out] for r, (i, out) in zip(rows, expected(model, test))]
+    test = TestLogic(name, inputs=inputs, outputs=outputs, body=rows)
+    test.attach_part(part)
+    return test
+
+
+def _detected(model, test, faults):
+    result = set()
+    for start in range(0, len(faults), FAULTS_PER_JOB):
+        d, p = detect(model, test, faults[start:start + FAULTS_PER_JOB])
+        result.update(start + n for n in d)
+    return result
+
+
+# ------------------------------------------------------------------------
+def _job(name, inputs, outputs, indexes, seed):
+    # sequences detecting faults from the list, with fault dropping
+    from ictester.parts import catalog
+    part = catalog[name]
+    model = Model(part)
+    faults = fault_list(model)
+    podem = Podem(model, inputs, outputs)
+    rng = random.Random(seed)
+    remaining = list(indexes)
+    sequences = []
+    aborted = []
+    while remaining:
+        vectors = podem.search(faults[remaining[0]])
+        if not vectors:
+            aborted.append(remaining.pop(0))
+            continue
+        # unassigned inputs get random values, they may detect more faults
+        rows = [[rng.randint(0, 1) if v is None else v for v in vector] for vector in vectors]
+        test = sequence_test(model, inputs, outputs, rows)
+        detected = _detected(model, test, [faults[n] for n in remaining])
+        if 0 not in detected:
+            # target fault detected only on a vector with some output unknown, which isn't checked
+            aborted.append(remaining[0])
+            detected.add(0)
+        sequences.append(rows)
+        remaining = [n for i, n in enumerate(remaining) if i not in detected]
+    return sequences, aborted
+
+
+# ------------------------------------------------------------------------
+class Generation:
+    def __init__(self, model, inputs, outputs, tests, detected, aborted):
+        self.model = model
+        self.inputs = inputs
+        self.outputs = outputs
+        self.tests = tests
+        self.faults = fault_list(model)
+        self.detected = detected
+        self.aborted = aborted
+
+    @property
+    def vector_count(self):
+        return sum(t.vector_count for t in self.tests)
+
+    @property
+    def undetected(self):
+        return [f for n, f in enumerate(self.faults) if n not in self.detected]
+
+
+def generate(model, jobs=None, inputs=None, outputs=None):
+    # generate tests for all stuck-at faults of a model
+    part = model.part
+    pin_inputs, pin_outputs = test_pins(part)
+    inputs = inputs or pin_inputs
+    outputs = [o for o in (outputs or pin_outputs) if o in model.nets]
+    faults = fault_list(model)
+    jobs = jobs or os.cpu_count()
+    chunks = [list(range(n, len(faults), jobs * 4)) for n in range(min(jobs * 4, len(faults)))]
+
+    sequences = []
+    aborted = set()
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(_job, part.name.upper(), inputs, outputs, chunk, num) for num, chunk in enumerate(chunks)]
+        for f in futures:
+            s, a = f.result()
+            sequences += s
+            aborted.update(a)
+
+    # reverse order compaction: keep sequences detecting faults not detected by the ones kept so far
+    kept = []
+    detected = set()
+    for rows in reversed(sequences):
+        new = _detected(model, sequence_test(model, inputs, outputs, rows), faults) - detected
+        if new:
+            kept.insert(0, rows)
+            detected |= new
+
+    # sequences are split between tests fitting in tester memory
+    tests = []
+    body = []
+    for rows in kept:
+        if body and len(body) + len(rows) > part.max_vectors:
+            tests.append(body)
+            body = []
+        body += rows
+    if body:
+        tests.append(body)
+    names = [f"ATPG {n}" if len(tests) > 1 else "ATPG" for n in range(1, len(tests) + 1)]
+    tests = [sequence_test(model, inputs, outputs, rows, name) for name, rows in zip(names, tests)]
+    detected = set().union(*(_detected(model, t, faults) for t in tests)) if tests else set()
+    return Generation(model, inputs, outputs, tests, detected, aborted - detected)
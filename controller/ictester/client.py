@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import socket
+
+'''
+Tester daemon client.
+
+Runs a test session in ictesterd (see daemon.py) instead of starting ictester: takes the same
+arguments as ictester, prints the session output as the daemon streams it, and exits with
+the session exit code. Only the standard library is imported, to keep client startup short.
+
+Client and daemon exchange JSON messages, one per line. Client sends a single job request:
+
+    {"argv": [ictester arguments], "cwd": client working directory}
+
+daemon responds with any number of {"out": text} and {"err": text} messages (session stdout and stderr),
+followed by {"exit": exit code}.
+
+Daemon address is a Unix socket path, or "[HOST:]PORT" for TCP (localhost by default).
+'''
+
+SOCKET_FILE = os.path.join(os.path.expanduser("~"), ".ictester", "ictesterd.sock")
+PORT = 9465
+ADDRESS_ENV = "ICTESTERD"  # environment variable with the daemon address
+
+
+# ------------------------------------------------------------------------
+def default_address():
+    return os.environ.get(ADDRESS_ENV) or (SOCKET_FILE if hasattr(socket, "AF_UNIX") else str(PORT))
+
+
+def address(spec):
+    # (socket family, address) for an address string
+    host, sep, port = spec.rpartition(":")
+    if port.isdigit():
+        return socket.AF_INET, (host or "127.0.0.1", int(port))
+    return socket.AF_UNIX, spec
+
+
+def send(f, message):
+    f.write((json.dumps(message) + "\n").encode())
+    f.flush()
+
+
+# ------------------------------------------------------------------------
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    spec = default_address()
+    # the only option of its own, any other is passed to ictester
+    if argv[:1] == ["--daemon"] and len(argv) > 1:
+        spec, argv = argv[1], argv[2:]
+
+    family, addr = address(spec)
+    try:
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.connect(addr)
+    except OSError as e:
+        print(f"Could not connect to ictesterd at {spec}: {e}", file=sys.stderr)
+        return 80
+
+    with sock, sock.makefile("rwb") as f:
+        send(f, {"argv": argv, "cwd": os.getcwd()})
+        for line in f:
+            message = json.loads(line)
+            if "out" in message:
+                sys.stdout.write(message["out"])
+                sys.stdout.flush()
+            elif "err" in message:
+                sys.stderr.write(message["err"])
+                sys.stderr.flush()
+            elif "exit" in message:
+                return message["exit"]
+
+    print("Connection to ictesterd lost", file=sys.stderr)
+    return 80
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from ictester.test import TestLogic
+from ictester.sim import (Model, verify)
+from ictester.faultsim import (FAULTS_PER_JOB, fault_list, logic_tests, detections, detect)
+from ictester.timing import model_estimate
+
+'''
+Test set compaction.
+
+Part logic tests using the same pins, pin configuration and read delay are merged.
+For combinational models, the merged vectors are reduced to a small set detecting all stuck-at faults
+that the original tests detect (greedy set cover). Sequential models keep vector order:
+each test is cut after the last vector detecting a fault not detected by earlier tests,
+and tests detecting nothing new are dropped. Tests followed by a test depending on the DUT state
+they leave (see order.dependent_tests()) are never cut or dropped.
+
+Compacted tests are fault simulated again to confirm that no fault is lost, and checked against
+the model (sim.verify()) for expected outputs that no longer match. Merged sequential tests
+may detect more faults than the original ones: each original test is simulated starting
+with an unknown DUT state, while in a merged test it starts with the state left by the vectors before it.
+'''
+
+
+# ------------------------------------------------------------------------
+def run_time(test):
+    # estimated test run time in seconds: vector upload and all loops
+    return model_estimate(test).time(test.loops)
+
+
+# ------------------------------------------------------------------------
+def _popcount(x):
+    return bin(x).count("1")
+
+
+# ------------------------------------------------------------------------
+def fault_sets(model, test, vectors):
+    # for each vector: bitmask of detected faults (bit n for fault n of the model fault list)
+    faults = fault_list(model)
+    result = [0] * len(vectors)
+    for start in range(0, len(faults), FAULTS_PER_JOB):
+        chunk = faults[start:start + FAULTS_PER_JOB]
+        for num, (d, p) in enumerate(detections(model, test, chunk, vectors)):
+            result[num] |= (d >> 1) << start
+    return result
+
+
+# ------------------------------------------------------------------------
+def detected_faults(model, tests):
+    # indexes of faults detected by tests, each test starting with unknown DUT state
+    faults = fault_list(model)
+    result = set()
+    for test in tests:
+        for start in range(0, len(faults), FAULTS_PER_JOB):
+            d, p = detect(model, test, faults[start:start + FAULTS_PER_JOB])
+            result.update(start + n for n in d)
+    return result
+
+
+# ------------------------------------------------------------------------
+def _merge(model, tests, rows):
+    first = tests[0]
+    name = first.name if len(tests) == 1 else f"{first.name} and {len(tests) - 1} more"
+    test = TestLogic(name,
+        inputs=first.inputs,
+        outputs=first.outputs,
+        body=rows,
+        loops=max(t.loops for t in tests),
+        cfgnum=first.cfgnum,
+        read_delay_us=first.read_delay_us,
+    )
+    test.attach_part(model.part)
+    return test
+
+
+def _key(test):
+    return tuple(test.inputs), tuple(test.outputs), test.cfgnum, test.read_delay_us
+
+
+def _groups(tests, dependent):
+    # (chains of tests that can be merged, chains kept as they are).
+    # A chain is a test with the tests depending on it, merged chains use the same pins, configuration and read delay.
+    from ictester.order import groups
+    merged = {}
+    kept = []
+    for chain in groups(tests, dependent):
+        if len({_key(t) for t in chain}) == 1:
+            merged.setdefault(_key(chain[0]), []).append(chain)
+        else:
+            kept.append(chain)
+    return list(merged.values()), kept
+
+
+def _compact_combinational(model, chains):
+    tests = [t for chain in chains for t in chain]
+    vectors = [v for t in tests for v in t.iter_vectors() if v.output]
+    sets = fault_sets(model, tests[0], vectors)
+    remaining = 0
+    for s in sets:
+        remaining |= s
+    chosen = []
+    while remaining:
+        best = max(range(len(sets)), key=lambda n: _popcount(sets[n] & remaining))
+        chosen.append(best)
+        remaining &= ~sets[best]
+    if not chosen:
+        return None
+    return _merge(model, tests, [[vectors[n].input, vectors[n].output] for n in sorted(chosen)])
+
+
+def _last_detecting(model, test, vectors, seen):
+    # number of the last vector detecting a fault not in seen (None if there are none), updates seen
+    faults = fault_list(model)
+    last = None
+    for start in range(0, len(faults), FAULTS_PER_JOB):
+        d, p = detect(model, test, faults[start:start + FAULTS_PER_JOB], vectors)
+        for n, num in d.items():
+            if start + n not in seen:
+                seen.add(start + n)
+                last = num if last is None else max(last, num)
+    return last
+
+
+def _compact_sequential(model, chains, seen):
+    rows = []
+    used = []
+    for chain in chains:
+        cut = []
+        for test in chain:
+            vectors = list(test.iter_vectors())
+            cut.append((test, vectors, _last_detecting(model, test, vectors, seen)))
+        detecting = [n for n, (test, vectors, last) in enumerate(cut) if last is not None]
+        if not detecting:
+            continue
+        # tests before the last detecting one leave the state following tests depend on, they're run whole
+        for num, (test, vectors, last) in enumerate(cut[:detecting[-1] + 1]):
+            if num == detecting[-1]:
+                vectors = vectors[:last + 1]
+            used.append(test)
+            rows.extend([v.input, v.output or None] for v in vectors)
+    if not used:
+        return None
+    return _merge(model, used, rows)
+
+
+def _mismatches(model, tests):
+    # expected outputs that the model says are wrong (not counting the ones unknown to the model)
+    return sum(1 for t in tests for d in verify(model, t) if d.model is not None)
+
+
+# ------------------------------------------------------------------------
+class Compaction:
+    # Results are plain data, so that they can be passed back from worker processes.
+    # Compacted tests are recreated for a part with tests().
+
+    def __init__(self, model):
+        from ictester.order import dependent_tests
+        tests = logic_tests(model.part)
+        dependent = dependent_tests(model.part) & set(tests)
+        merged, kept = _groups(tests, dependent)
+        compacted = []
+        seen = set()
+        for group in merged:
+            if model.sequential:
+                test = _compact_sequential(model, group, seen)
+            else:
+                test = _compact_combinational(model, group)
+            if test:
+                compacted.append(test)
+        for chain in kept:
+            compacted.extend(_merge(model, [t], [[v.input, v.output or None] for v in t.iter_vectors()]) for t in chain)
+
+        detected = detected_faults(model, tests)
+        compacted_detected = detected_faults(model, compacted)
+        self.faults = len(fault_list(model))
+        self.detected = len(detected)
+        self.compacted_detected = len(compacted_detected)
+        self.lost = len(detected - compacted_detected)
+        # faults detected only thanks to merged tests not starting with an unknown DUT state
+        self.gained = len(compacted_detected - detected)
+        # new expected output mismatches: compacted tests would fail good parts
+        self.mismatches = max(0, _mismatches(model, compacted) - _mismatches(model, tests))
+        self.vector_count = sum(t.vector_count for t in tests)
+        self.compacted_vector_count = sum(t.vector_count for t in compacted)
+        self.run_time = sum(run_time(t) for t in tests)
+        self.compacted_run_time = sum(run_time(t) for t in compacted)
+        self.specs = [
+            (t.name, t.inputs, t.outputs, t.loops, t.cfgnum, t.read_delay_us, [[v.input, v.output or None] for v in t.iter_vectors()])
+            for t in compacted
+        ]
+
+    @property
+    def valid(self):
+        # compacted tests can replace the part's own tests
+        return not self.lost and not self.mismatches
+
+    def tests(self, part):
+        return tests_from_specs(part, self.specs)
+
+
+# ------------------------------------------------------------------------
+def tests_from_specs(part, specs):
+    result = []
+    for name, inputs, outputs, loops, cfgnum, read_delay_us, rows in specs:
+        test = TestLogic(name, inputs=inputs, outputs=outputs, body=rows, loops=loops, cfgnum=cfgnum, read_delay_us=read_delay_us)
+        test.attach_part(part)
+        result.append(test)
+    return result
+
+
+# ------------------------------------------------------------------------
+def _job(name):
+    from ictester.parts import catalog
+    return Compaction(Model(catalog[name]))
+
+
+def compact(models, jobs=None):
+    # Compaction of each model's tests, in order. Parts are processed in a process pool.
+    with ProcessPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+        yield from pool.map(_job, [m.part.name.upper() for m in models])
+
+
+# ------------------------------------------------------------------------
+def python_source(part, tests, what="compacted"):
+    # test definitions to be pasted into a part class
+    lines = [f"# {part.name} tests {what} by ictester-model", "tests = ["]
+    for t in tests:
+        lines.append(f"    TestLogic({t.name!r},")
+        lines.append(f"        inputs={t.inputs},")
+        lines.append(f"        outputs={t.outputs},")
+        if t.cfgnum:
+            lines.append(f"        cfgnum={t.cfgnum},")
+        if t.read_delay_us:
+            lines.append(f"        read_delay_us={t.read_delay_us},")
+        lines.append(f"        loops={t.loops},")
+        lines.append("        body=[")
+        for v in t.iter_vectors():
+            out = f"[{', '.join(str(int(x)) for x in v.output)}]" if v.output else "None"
+            lines.append(f"            [[{', '.join(str(int(x)) for x in v.input)}], {out}],")
+        lines.append("        ],")
+        lines.append("    ),")
+    lines.append("]")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import threading
+import traceback
+import contextlib
+import statistics
+import subprocess
+import socketserver
+from collections.abc import Mapping
+
+from ictester import ictester
+from ictester import client
+from ictester.parts import catalog
+
+'''
+Tester daemon.
+
+ictesterd keeps running between test sessions, so that each tested chip doesn't pay for interpreter
+startup, part catalog import, test vector compilation, serial port setup and tester hello.
+Test sessions are requested by ictester-client (see client.py for the protocol) with the same arguments
+as ictester takes. Each one runs as a regular ictester session in its own thread, with the output
+(text or result records) streamed back to the client as it's produced.
+
+A tester is used by a single session at a time: each one has a lock held for the whole session,
+so protocol frames of concurrent sessions never interleave. Sessions without a tester selected
+(--device) use an idle one. Sessions for different testers run in parallel, each with its own
+copy of the tested part (see Part.copy()). Compiled test vectors are shared by all copies.
+'''
+
+# ictester arguments with file names, relative to the client's working directory
+PATH_ARGS = ["failmap_save", "trace_save", "trace_baseline", "vectors", "history", "db", "metrics"]
+
+
+# ------------------------------------------------------------------------
+class ThreadOutput:
+    # sys.stdout/sys.stderr replacement, writing to a stream selected for the current thread
+
+    def __init__(self, default):
+        self.default = default
+        self.local = threading.local()
+
+    @property
+    def stream(self):
+        return getattr(self.local, "stream", None) or self.default
+
+    def write(self, text):
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+    @contextlib.contextmanager
+    def redirect(self, stream):
+        previous = getattr(self.local, "stream", None)
+        self.local.stream = stream
+        try:
+            yield stream
+        finally:
+            self.local.stream = previous
+
+
+class JobStream:
+    # session output stream, sent to the client as messages of the given kind ("out" or "err")
+
+    def __init__(self, connection, kind):
+        self.connection = connection
+        self.kind = kind
+
+    def write(self, text):
+        if text:
+            self.connection.send({self.kind: text})
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+class Connection:
+    def __init__(self, f):
+        self.f = f
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def send(self, message):
+        # session keeps running when the client goes away, so that the tester is left in a known state
+        with self.lock:
+            if self.closed:
+                return
+            try:
+                client.send(self.f, message)
+            except OSError:
+                self.closed = True
+
+
+# ------------------------------------------------------------------------
+class SessionParts(Mapping):
+    # part catalog view giving each session its own copy of the tested part
+
+    def __getitem__(self, name):
+        return catalog[name].copy()
+
+    def __iter__(self):
+        return iter(catalog)
+
+    def __len__(self):
+        return len(catalog)
+
+
+class Tester:
+    def __init__(self, device):
+        self.device = device
+        self.lock = threading.Lock()  # held for the whole test session
+        self.connection = None  # (transport, tester info)
+
+    def connect(self):
+        # open the serial port and say hello on first use, the connection is kept for following sessions
+        if not self.connection:
+            args = argparse.Namespace(emulate=False, emulate_realtime=False, device=self.device)
+            self.connection = ictester.connect(args)
+        return self.connection
+
+    def close(self):
+        if self.connection:
+            self.connection[0].close()
+            self.connection = None
+
+
+# ------------------------------------------------------------------------
+class Daemon:
+    def __init__(self, devices=[]):
+        self.testers = {device: Tester(device) for device in devices}
+        self.lock = threading.Lock()  # guards self.testers
+        # chip autodetection runs catalog tests, not session copies
+        self.detect_lock = threading.Lock()
+        if not isinstance(sys.stdout, ThreadOutput):
+            sys.stdout = ThreadOutput(sys.stdout)
+            sys.stderr = ThreadOutput(sys.stderr)
+
+    def tester(self, device):
+        with self.lock:
+            if device is None:
+                if self.testers:
+                    idle = [t for t in self.testers.values() if not t.lock.locked()]
+                    return (idle or list(self.testers.values()))[0]
+                device = ictester.get_serial_port(None)
+            return self.testers.setdefault(device, Tester(device))
+
+    def close(self):
+        for tester in self.testers.values():
+            with tester.lock:
+                tester.close()
+
+    def job(self, argv, cwd, connection):
+        # run a test session, returns its exit code
+        out = JobStream(connection, "out")
+        with sys.stdout.redirect(out), sys.stderr.redirect(JobStream(connection, "err")):
+            try:
+                code = self.session(argv, cwd, out)
+            except SystemExit as e:
+                code = e.code
+            except Exception:
+                traceback.print_exc()
+                traceback.print_exc(file=sys.stderr.default)
+                code = 1
+            if code is not None and not isinstance(code, int):
+                print(code, file=sys.stderr)
+                code = 1
+        return code or 0
+
+    def session(self, argv, cwd, out):
+        args = ictester.parse_cmd(argv)
+        for name in PATH_ARGS:
+            value = getattr(args, name)
+            if value:
+                setattr(args, name, os.path.join(cwd, value))
+
+        if args.list or args.list_all or args.emulate:
+            return ictester.run(args, None, SessionParts(), out, sys.stdout.redirect)
+
+        tester = self.tester(args.device)
+        with tester.lock, (self.detect_lock if args.detect else contextlib.nullcontext()):
+            args.device = tester.device
+            try:
+                return ictester.run(args, tester.connect(), SessionParts(), out, sys.stdout.redirect)
+            except SystemExit as e:
+                # tester communication failed, reconnect in the next session
+                if e.code == 80:
+                    tester.close()
+                raise
+            except Exception:
+                tester.close()
+                raise
+
+
+# ------------------------------------------------------------------------
+class Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        connection = Connection(self.wfile)
+        try:
+            request = json.loads(self.rfile.readline())
+            argv, cwd = list(request["argv"]), request["cwd"]
+        except (ValueError, KeyError, TypeError) as e:
+            connection.send({"err": f"Invalid request: {e}\n"})
+            connection.send({"exit": 1})
+            return
+        code = self.server.tester_daemon.job(argv, cwd, connection)
+        connection.send({"exit": code})
+
+
+class TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+if hasattr(socket, "AF_UNIX"):
+    class UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+
+def make_server(daemon, spec):
+    family, addr = client.address(spec)
+    if family == socket.AF_INET:
+        server = TCPServer(addr, Handler)
+    else:
+        if os.path.exists(addr):
+            # socket left by a daemon that didn't shut down cleanly can be reused
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+                try:
+                    s.connect(addr)
+                except OSError:
+                    os.unlink(addr)
+                else:
+                    raise OSError(f"ictesterd is already running at {addr}")
+        os.makedirs(os.path.dirname(os.path.abspath(addr)), exist_ok=True)
+        server = UnixServer(addr, Handler)
+        os.chmod(addr, 0o600)
+    server.tester_daemon = daemon
+    return server
+
+
+def server_address(server):
+    if server.address_family == socket.AF_INET:
+        return f"{server.server_address[0]}:{server.server_address[1]}"
+    return server.server_address
+
+
+# ------------------------------------------------------------------------
+def bench(runs, ictester_args):
+    # per-chip latency: ictester started for each chip, and ictester-client talking to a running daemon
+    spec = os.path.join(tempfile.mkdtemp(), "bench.sock") if hasattr(socket, "AF_UNIX") else "127.0.0.1:0"
+    server = make_server(Daemon(), spec)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    env = dict(os.environ)
+    package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env["PYTHONPATH"] = os.pathsep.join(p for p in [package_dir, env.get("PYTHONPATH")] if p)
+    commands = {
+        "ictester": [sys.executable, "-m", "ictester.ictester", *ictester_args],
+        "ictester-client": [sys.executable, "-m", "ictester.client", "--daemon", server_address(server), *ictester_args],
+    }
+
+    results = {}
+    for name, cmd in commands.items():
+        # first session warms the daemon up (compiles test vectors), and checks the arguments
+        if subprocess.run(cmd, env=env, stdout=subprocess.DEVNULL).returncode not in (0, 1, 2):
+            print(f"{name} failed, check ictester arguments")
+            return 1
+        times = []
+        for i in range(runs):
+            start = time.monotonic()
+            subprocess.run(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            times.append(time.monotonic() - start)
+        results[name] = times
+    server.shutdown()
+    server.server_close()
+    if server.address_family != socket.AF_INET:
+        os.unlink(spec)
+
+    print(f"Per-chip latency, {runs} runs of: ictester {' '.join(ictester_args)}")
+    print()
+    print("                   median [ms]  mean [ms]  min [ms]  max [ms]")
+    for name, times in results.items():
+        ms = [t * 1000 for t in times]
+        print(f" {name:16s}  {statistics.median(ms):11.1f}  {statistics.fmean(ms):9.1f}  {min(ms):8.1f}  {max(ms):8.1f}")
+    print()
+    print(f"Speedup: {statistics.median(results['ictester']) / statistics.median(results['ictester-client']):.2f}x")
+    return 0
+
+
+# ------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description='IC tester daemon')
+    parser.add_argument('-d', '--device', action="append", default=[], help='Serial port with a tester to use (may be repeated), testers are autodetected otherwise')
+    parser.add_argument('--listen', metavar='ADDRESS', default=client.default_address(), help=f'Unix socket path, or [HOST:]PORT for TCP (default: ${client.ADDRESS_ENV} or {client.default_address()})')
+    parser.add_argument('--preload', metavar='PARTS', default=None, help='Comma-separated list of parts to compile test vectors for on startup')
+    parser.add_argument('--bench', metavar='RUNS', type=int, default=None, help='Compare per-chip latency of ictester and ictester-client with a daemon, ictester arguments follow "--"')
+    parser.add_argument('ictester_args', nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.bench is not None:
+        ictester_args = args.ictester_args[1:] if args.ictester_args[:1] == ["--"] else args.ictester_args
+        if args.bench <= 0 or not ictester_args:
+            parser.error("--bench requires a positive number of runs and ictester arguments")
+        return bench(args.bench, ictester_args)
+    if args.ictester_args:
+        parser.error(f"unrecognized arguments: {' '.join(args.ictester_args)}")
+
+    for name in args.preload.split(",") if args.preload else []:
+        try:
+            catalog[name.strip().upper()].copy()
+        except KeyError:
+            parser.error(f"Part \"{name}\" not found")
+
+    daemon = Daemon(args.device)
+    for tester in daemon.testers.values():
+        try:
+            transport, info = tester.connect()
+            print(f"Tester at {tester.device}: firmware version {info.firmware_version}")
+        except SystemExit:
+            print(f"Tester at {tester.device} not available, will retry with the first session")
+
+    try:
+        server = make_server(daemon, args.listen)
+    except OSError as e:
+        print(f"Could not start ictesterd: {e}")
+        return 1
+    print(f"Listening at {server_address(server)}", flush=True)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        daemon.close()
+        if server.address_family != socket.AF_INET:
+            os.unlink(server.server_address)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,387 @@
+import os
+import sys
+import json
+import random
+import hashlib
+import logging
+from ictester.part import (Pin, PinType, ZIFFunc)
+from ictester.test import TestLogic
+from ictester.response import RespType
+from ictester.parts import catalog
+from ictester.sim import (Model, SimulationError, lane_values, lane_bit)
+
+'''
+Chip autodetection.
+
+Catalog parts with a model are grouped by package layout (pin count, VCC and GND pins).
+An unknown chip is identified within a group with a decision tree: each node holds an experiment
+(short sequence of input vectors) that best splits the remaining candidate parts,
+according to their models.
+
+Experiments are electrically safe for all remaining candidates: only pins that are inputs
+of all of them (or not connected in some) are driven, all other pins are read using a ZIF function allowed for each
+candidate's pin role (pins may only get pull-ups or stay in high impedance).
+As candidates are eliminated, more pins can be driven. Splits leaving candidates without
+any pin to drive are avoided, as nothing can tell such candidates apart any more.
+
+The tester can't return DUT outputs, only check them: an experiment is run as a test expecting
+outputs of a reference candidate. Passing experiment leaves candidates agreeing with the reference,
+failing one also reports DUT pin values on the first failed vector.
+Inputs of a candidate that are not driven are pulled up (or float, which reads high for TTL inputs).
+
+Decision trees are precomputed on first use and cached.
+A chip that powers up in a layout is identified in that layout only.
+'''
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".ictester", "cache")
+EXPERIMENT_LENGTH = 8  # vectors in an experiment
+RANDOM_EXPERIMENTS = 32  # random experiments considered at each decision tree node, in addition to ones based on part tests
+SCORED_EXPERIMENTS = 16  # experiments fully scored at each node
+TREE_VERSION = 2  # decision trees cached by earlier versions are rebuilt
+READ_FUNCS = [ZIFFunc.IN_PU_WEAK, ZIFFunc.IN_PU_STRONG, ZIFFunc.IN_HIZ]  # preferred ZIF functions of pins that are read
+OUTPUT_ROLES = (PinType.OUT, PinType.OC, PinType.ST3, PinType.BIDI)
+
+logger = logging.getLogger('ictester')
+
+_models = {}
+
+
+# ------------------------------------------------------------------------
+def layout(part):
+    return (part.pincount, tuple(part.vcc), tuple(part.gnd))
+
+
+def layouts(pincount):
+    # layouts for a pin count, most used ones first: {layout: [part names]}
+    groups = {}
+    for name, part in sorted(catalog.items()):
+        if part.pincount == pincount and part.netlist and any(isinstance(t, TestLogic) for t in part.tests):
+            groups.setdefault(layout(part), []).append(name)
+    return dict(sorted(groups.items(), key=lambda x: -len(x[1])))
+
+
+def model(name):
+    if name not in _models:
+        _models[name] = Model(catalog[name])
+    return _models[name]
+
+
+# ------------------------------------------------------------------------
+def role(part, pin):
+    return part.pins[pin].role if pin in part.pins else PinType.NC
+
+
+def pin_functions(candidates):
+    # ZIF function for each non-power pin, safe for all candidates. Returns (driven pins, read pins, functions)
+    part = catalog[candidates[0]]
+    power = set(part.vcc) | set(part.gnd)
+    driven = []
+    read = []
+    funcs = {}
+    for pin in range(1, part.pincount + 1):
+        if pin in power:
+            continue
+        roles = {role(catalog[name], pin) for name in candidates}
+        # not connected pins can be driven safely too
+        if PinType.IN in roles and roles <= {PinType.IN, PinType.NC}:
+            driven.append(pin)
+            funcs[pin] = ZIFFunc.OUT
+            continue
+        # inputs accept pull-ups, other roles limit functions to the allowed ones
+        allowed = set(READ_FUNCS)
+        for r in roles - {PinType.IN}:
+            allowed &= set(Pin._pin_zif_allowed_funcs[r])
+        read.append(pin)
+        funcs[pin] = next((f for f in READ_FUNCS if f in allowed), ZIFFunc.IN_HIZ)
+    return driven, read, funcs
+
+
+# ------------------------------------------------------------------------
+def predict(name, driven, read, funcs, experiments):
+    # candidate outputs on read pins (1, 0 or None) for each experiment and vector
+    part = catalog[name]
+    m = model(name)
+    inputs = [pin for pin in sorted(part.pins) if part.pins[pin].role == PinType.IN]
+    outputs = {e.output for e in m.elements if e.output not in inputs}
+    observed = [pin for pin in read if pin in outputs and role(part, pin) in OUTPUT_ROLES]
+    result = [[] for e in experiments]
+    try:
+        sim = m.simulator(inputs, observed, lanes=len(experiments))
+        positions = [driven.index(pin) if pin in driven else None for pin in inputs]
+        for step in range(len(experiments[0])):
+            rows = [[1 if pos is None else e[step][pos] for pos in positions] for e in experiments]
+            values = dict(zip(observed, sim.step(lane_values(rows))))
+            for lane, r in enumerate(result):
+                r.append([
+                    lane_bit(values[pin], lane) if pin in values
+                    else None if role(part, pin) in OUTPUT_ROLES
+                    else (1 if funcs[pin] != ZIFFunc.IN_HIZ else None)
+                    for pin in read
+                ])
+    except SimulationError:
+        return [[[None] * len(read) for v in e] for e in experiments]
+    return result
+
+
+# ------------------------------------------------------------------------
+def checked_pins(reference):
+    # positions of read pins checked by the experiment: known in the reference on the last vector
+    return [n for n, x in enumerate(reference[-1]) if x is not None]
+
+
+def _differs(v, ref, checked):
+    # None if the vector isn't checked (reference unknown), otherwise True if a known value differs
+    if any(ref[n] is None for n in checked):
+        return None
+    return any(v[n] is not None and v[n] != ref[n] for n in checked)
+
+
+def outcome(pred, reference):
+    # experiment result for a chip behaving as predicted: None (pass) or (failed vector number, read pin values)
+    checked = checked_pins(reference)
+    for num, (v, ref) in enumerate(zip(pred, reference)):
+        if _differs(v, ref, checked):
+            return (num, v)
+    return None
+
+
+def consistent(pred, reference, result):
+    checked = checked_pins(reference)
+    for num, (v, ref) in enumerate(zip(pred, reference)):
+        differs = _differs(v, ref, checked)
+        if result and num == result[0]:
+            # candidate has to fail on this vector, with known values matching the DUT
+            return bool(differs) and all(x is None or y is None or x == y for x, y in zip(v, result[1]))
+        if differs:
+            return False
+    return True
+
+
+def remaining(candidates, preds, reference, result):
+    return [c for c in candidates if consistent(preds[c], reference, result)]
+
+
+# ------------------------------------------------------------------------
+def experiments(candidates, driven, rng):
+    # random vector sequences and ones made of candidates' test vectors
+    length = EXPERIMENT_LENGTH if driven else 1
+    result = [[[rng.randint(0, 1) for pin in driven] for i in range(length)] for n in range(RANDOM_EXPERIMENTS)]
+    if not driven:
+        return result[:1]
+    for name in candidates:
+        for t in catalog[name].tests:
+            if not isinstance(t, TestLogic):
+                continue
+            vectors = []
+            for v in t.iter_vectors():
+                vectors.append([int(v.pin(pin)) if pin in t.inputs else 1 for pin in driven])
+                if len(vectors) == length:
+                    break
+            result.append(vectors + [vectors[-1]] * (length - len(vectors)))
+    unique = {repr(e): e for e in result}
+    return list(unique.values())
+
+
+def split_cost(candidates, left):
+    # cost of a chip ending up with candidates left after an experiment: number of candidates left,
+    # times the number of all candidates if no pin can be driven for them (they can't be told apart any more)
+    if len(left) > 1 and not pin_functions(left)[0]:
+        return len(left) * len(candidates)
+    return len(left)
+
+
+def best_experiment(candidates):
+    # decision tree node for a list of candidates, None if they can't be told apart
+    driven, read, funcs = pin_functions(candidates)
+    rng = random.Random(",".join(candidates))
+    exps = experiments(candidates, driven, rng)
+    preds = {c: predict(c, driven, read, funcs, exps) for c in candidates}
+
+    # experiments splitting candidates into the largest number of distinct predictions are scored
+    signatures = [len({repr(preds[c][n]) for c in candidates}) for n in range(len(exps))]
+    shortlist = sorted(range(len(exps)), key=lambda n: -signatures[n])[:SCORED_EXPERIMENTS]
+    best = None
+    for n in shortlist:
+        # reference: candidate with the most known outputs
+        ref = min(candidates, key=lambda c: sum(x is None for v in preds[c][n] for x in v))
+        reference = preds[ref][n]
+        # expected cost of candidates left, for a chip being any of the candidates.
+        # Splits leaving candidates with no pins to drive are avoided, such candidates can't be split further.
+        lefts = [remaining(candidates, {d: preds[d][n] for d in candidates}, reference, outcome(preds[c][n], reference)) for c in candidates]
+        if all(len(left) == len(candidates) for left in lefts):
+            continue
+        score = sum(split_cost(candidates, left) for left in lefts)
+        if best is None or score < best[0]:
+            best = (score, n, ref)
+
+    if best is None:
+        return None
+    score, n, ref = best
+    return {
+        "driven": driven,
+        "read": read,
+        "funcs": {pin: f.name for pin, f in funcs.items()},
+        "vectors": exps[n],
+        "reference": ref,
+        "predictions": {c: preds[c][n] for c in candidates},
+    }
+
+
+# ------------------------------------------------------------------------
+def node_key(candidates):
+    return ",".join(sorted(candidates))
+
+
+def build_tree(candidates):
+    # {candidates key: node}, for all candidate lists reachable from the root
+    tree = {}
+    todo = [sorted(candidates)]
+    while todo:
+        cands = todo.pop()
+        key = node_key(cands)
+        if key in tree:
+            continue
+        node = best_experiment(cands)
+        tree[key] = node
+        if not node:
+            continue
+        preds = node["predictions"]
+        reference = preds[node["reference"]]
+        for c in cands:
+            left = remaining(cands, preds, reference, outcome(preds[c], reference))
+            if 1 < len(left) < len(cands):
+                todo.append(left)
+    return tree
+
+
+def _tree_path(candidates):
+    h = hashlib.sha1()
+    for name in sorted(candidates):
+        part = catalog[name]
+        h.update(repr((name, part.netlist, sorted((p, pin.role.name) for p, pin in part.pins.items()))).encode())
+    for value in (EXPERIMENT_LENGTH, RANDOM_EXPERIMENTS, SCORED_EXPERIMENTS, TREE_VERSION):
+        h.update(str(value).encode())
+    return os.path.join(CACHE_DIR, f"detect-{catalog[candidates[0]].pincount}-{h.hexdigest()[:16]}.json")
+
+
+def tree(candidates):
+    path = _tree_path(candidates)
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+    logger.log(20, "Building decision tree for %s parts", len(candidates))
+    t = build_tree(candidates)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(t, f)
+    except OSError as e:
+        logger.log(20, "Could not cache decision tree: %s", e)
+    return t
+
+
+# ------------------------------------------------------------------------
+def detection_part(candidates, node):
+    # part description used to run an experiment: candidates' package with experiment pin functions
+    base = catalog[candidates[0]]
+    package = next(c for c in type(base).__mro__ if c.__name__.startswith("Package"))
+    pin_cfg = {}
+    for pin, func in node["funcs"].items():
+        pin = int(pin)
+        pin_role = PinType.IN if pin in node["driven"] else PinType.OUT
+        pin_cfg[pin] = Pin(f"P{pin}", pin_role, [ZIFFunc[func]])
+    cls = type("DetectionPart", (package,), {"name": "unknown", "desc": "Unknown chip", "pin_cfg": pin_cfg, "tests": []})
+    return cls()
+
+
+def run_experiment(tr, candidates, node, safety_off):
+    # None on pass, (failed vector number, read pin values) on failure, False if DUT can't be powered up
+    part = detection_part(candidates, node)
+    part.setup(tr)
+    resp = part.powerup(tr, safety_off)
+    if resp.response != RespType.OK and not safety_off:
+        part.disconnect(tr)
+        return False
+
+    reference = node["predictions"][node["reference"]]
+    checked = checked_pins(reference)
+    body = [[v, None if any(ref[n] is None for n in checked) else [ref[n] for n in checked]] for v, ref in zip(node["vectors"], reference)]
+    test = TestLogic("Detection", inputs=node["driven"], outputs=[node["read"][n] for n in checked], body=body, loops=1)
+    test.attach_part(part)
+    test.setup(tr)
+    resp = test.run(tr, 1, imeasure=False)
+    if resp.response == RespType.FAIL:
+        # tester disconnects the DUT on failure
+        return (test.failed_vector_num, [int(test.failed_pin_vector[pin-1]) for pin in node["read"]])
+    part.disconnect(tr)
+    if resp.response != RespType.PASS:
+        return False
+    return None
+
+
+def identify(tr, pincount, safety_off=False, report=print):
+    # names of parts matching the chip (single one if identified).
+    # Next package layout is tried only if the chip can't be powered up in a layout. Once it is, the chip
+    # is taken to have that layout: in another one its outputs or supply pins could end up being driven.
+    for lay, names in layouts(pincount).items():
+        pins, vcc, gnd = lay
+        report(f"Package layout: {pincount} pins, VCC: {', '.join(map(str, vcc))}, GND: {', '.join(map(str, gnd))}, {len(names)} candidates")
+        t = tree(names)
+        candidates = sorted(names)
+        step = 0
+        result = None
+        while len(candidates) > 1:
+            key = node_key(candidates)
+            if key not in t:
+                # chip doesn't behave like any candidate, continue outside of the precomputed tree
+                t[key] = best_experiment(candidates)
+            node = t[key]
+            if not node:
+                break
+            step += 1
+            result = run_experiment(tr, candidates, node, safety_off)
+            if result is False:
+                report(f"  Step {step}: DUT power up failed")
+                if step > 1:
+                    return []
+                break
+            reference = node["predictions"][node["reference"]]
+            left = remaining(candidates, node["predictions"], reference, result)
+            report(f"  Step {step}: driving pins {node['driven'] or 'none'}, {len(left)} candidate{'s' if len(left) != 1 else ''} left")
+            logger.log(20, "Candidates: %s", ", ".join(left))
+            if len(left) == len(candidates):
+                break
+            candidates = left
+        if result is not False:
+            return candidates
+    return []
+
+
+# ------------------------------------------------------------------------
+def main():
+    # precompute decision trees and report steps needed to identify each part
+    pincounts = [int(x) for x in sys.argv[1:]] or [14, 16, 20, 24]
+    for pincount in pincounts:
+        for lay, names in layouts(pincount).items():
+            t = tree(names)
+            print(f"{pincount} pins, VCC {lay[1]}, GND {lay[2]}: {len(names)} parts, {sum(1 for n in t.values() if n)} tree nodes")
+            for name in sorted(names):
+                candidates = sorted(names)
+                steps = 0
+                while len(candidates) > 1 and t.get(node_key(candidates)):
+                    node = t[node_key(candidates)]
+                    preds = node["predictions"]
+                    reference = preds[node["reference"]]
+                    left = remaining(candidates, preds, reference, outcome(preds[name], reference))
+                    if len(left) == len(candidates):
+                        break
+                    candidates = left
+                    steps += 1
+                same = f" (indistinguishable from: {', '.join(c for c in candidates if c != name)})" if len(candidates) > 1 else ""
+                print(f"    {name}: {steps} steps{same}")
+
+
+if __name__ == "__main__":
+    main()
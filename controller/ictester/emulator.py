@@ -0,0 +1,163 @@
+import time
+import logging
+import math
+import random
+from collections import deque
+from struct import (pack, unpack)
+from ictester.command import CmdType
+from ictester.response import RespType
+from ictester.test import (TestType, DRAMType, DRAMTestType, UnivibType, UnivibTestType, RunFlag)
+from ictester.timing import (link_time, logic_loop_time, imeasure_time)
+from ictester.pulse import (CPU_CYCLE_NS, SAMPLE_CYCLES, SAMPLE_OFFSET)
+from ictester.speedgrade import (STEPS, UNRESOLVABLE, SpeedBin, sample_time)
+from ictester.tester import PROTOCOL_VERSION
+
+logger = logging.getLogger('ictester')
+
+# nominal pulse width [ns] with tester's built-in timing components (470pF + internal/pull-up resistor)
+UNIVIB_PULSE_NS = {
+    UnivibType.UNI_74121: 0.693 * 2000 * 470e-3,
+    UnivibType.UNI_74122: 0.32 * 10000 * 470e-3 * (1 + 0.7 / 10),
+    UnivibType.UNI_74123_1: 0.28 * 10000 * 470e-3 * (1 + 0.7 / 10),
+    UnivibType.UNI_74123_2: 0.28 * 10000 * 470e-3 * (1 + 0.7 / 10),
+}
+UNIVIB_JITTER = 0.01  # relative pulse width standard deviation
+RETRIG_LOOPS = 6
+RETRIG_INTERVAL_CYCLES = 14  # 0.5us delay + trigger
+
+DRAM_ACCESS_NS = 60  # ~CAS to Dout access time (tCAC) of the emulated memory, within -15 grade limits
+
+# (Ivcc, Ignd) raw shunt readings reported by the emulated tester
+IDLE_CURRENT = (800, 800)
+VBUS = 3125  # 5V in 1.6mV units
+
+FIRMWARE_VERSION = 1
+MAX_VECTORS_16 = 6016
+MAX_VECTORS_24 = 4096
+ERR_VECT_NUM = 12
+
+
+# ------------------------------------------------------------------------
+class Emulator:
+    # Transport-compatible tester emulator, modelling a tester with a good DUT inserted.
+    # Used to run the controller without hardware.
+    # In realtime mode responses are delayed as long as the tester would take to send them
+    # (serial link transfers and logic test runs, from the run time model).
+
+    def __init__(self, seed=None, realtime=False):
+        self.realtime = realtime
+        self.ready = 0  # time when the emulated tester is done with the last command
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.responses = deque()
+        self.random = random.Random(seed)
+        self.test_type = None
+        self.test_params = b''
+        self.pincount = 0
+        self.vectors_count = 0
+        self.connected_cfg = None  # pin configuration set on the switches
+
+    def set_timeout(self, seconds):
+        pass
+
+    def send(self, b):
+        b = bytes(b)
+        self.bytes_sent += len(b)
+        logger.log(18, "<- (%s bytes) %s [emulated]", len(b), b.hex(" "))
+        self.busy(link_time(2 + len(b)))
+        self.handle(b[0], b[1:])
+
+    def recv(self):
+        payload = self.responses.popleft()
+        if self.realtime:
+            self.busy(link_time(2 + len(payload)))
+            time.sleep(max(0, self.ready - time.monotonic()))
+        logger.log(18, "-> (%s bytes) %s [emulated]", len(payload), payload.hex(" "))
+        self.bytes_received += 2 + len(payload)
+        return payload
+
+    def close(self):
+        pass
+
+    def busy(self, seconds):
+        self.ready = max(self.ready, time.monotonic()) + seconds
+
+    def respond(self, resp, payload=b''):
+        self.responses.append(bytes([resp.value]) + payload)
+
+    def handle(self, cmd, data):
+        cmd = CmdType(cmd)
+        if cmd == CmdType.HELLO:
+            self.respond(RespType.HELLO, pack("<BBHHH", PROTOCOL_VERSION, FIRMWARE_VERSION, MAX_VECTORS_16, MAX_VECTORS_24, 0))
+        elif cmd == CmdType.DUT_SETUP:
+            self.pincount = data[1]
+            self.connected_cfg = None
+            self.respond(RespType.OK)
+        elif cmd == CmdType.DUT_POWERUP:
+            self.connected_cfg = None  # power pins only
+            self.respond(RespType.OK, pack("<H", VBUS))
+        elif cmd == CmdType.TEST_SETUP:
+            self.test_type = TestType(data[1])
+            self.test_params = data[2:]
+            self.vectors_count = 0
+            switched = self.connected_cfg != data[0]
+            self.connected_cfg = data[0]
+            self.respond(RespType.OK, bytes([switched]))
+        elif cmd == CmdType.VECTORS_LOAD:
+            self.vectors_count += unpack("<H", data[0:2])[0]
+            max_vectors = MAX_VECTORS_16 if self.pincount <= 16 else MAX_VECTORS_24
+            if self.vectors_count > max_vectors:
+                self.respond(RespType.ERR, bytes([ERR_VECT_NUM]))
+            else:
+                self.respond(RespType.OK)
+        elif cmd == CmdType.RUN:
+            loops, flags = unpack("<HB", data[0:3])
+            if self.realtime and self.test_type == TestType.LOGIC:
+                delay = unpack("<H", self.test_params[0:2])[0]
+                imeasure = not flags & RunFlag.NO_IMEASURE.value
+                self.busy(imeasure_time(self.vectors_count, flags & RunFlag.ITRACE.value, imeasure)
+                    + loops * logic_loop_time(self.pincount, self.vectors_count, self.vectors_count, delay))
+            resp, payload = self.run(loops)
+            self.respond(resp, payload)
+        elif cmd == CmdType.DUT_DISCONNECT:
+            self.connected_cfg = None
+            self.respond(RespType.OK, pack("<H", VBUS) + pack("<hh", *IDLE_CURRENT) * 4)
+        else:
+            self.respond(RespType.OK)
+
+    def run(self, loops):
+        if self.test_type == TestType.DRAM:
+            return self.run_dram(loops)
+        elif self.test_type == TestType.UNIVIB:
+            return self.run_univib(loops)
+        return RespType.PASS, b''
+
+    def run_dram(self, loops):
+        if DRAMTestType(self.test_params[1]) == DRAMTestType.SPEED_BIN:
+            failed_reads = [0 if sample_time(step) >= DRAM_ACCESS_NS else loops * 2 * 65536 for step in range(STEPS)]
+            payload = pack(f"<{STEPS}I", *failed_reads)
+            # emulated memory is a good part, it has to get a real grade
+            device = DRAMType(self.test_params[0]).name.removeprefix("DRAM_")
+            grade = SpeedBin(device, payload).grade
+            assert grade not in (None, UNRESOLVABLE), f"Emulated {device} (tCAC {DRAM_ACCESS_NS} ns) gets no speed grade: {grade}"
+            return RespType.PASS, payload
+        return RespType.PASS, b''
+
+    def pulse_width(self, device, num):
+        # Width in CPU cycles, as measured by the tester: pulse end is seen by the first sample
+        # taken after it, sampling start is shifted by 0..2 cycles for consecutive pulses
+        width = self.random.gauss(UNIVIB_PULSE_NS[device], UNIVIB_PULSE_NS[device] * UNIVIB_JITTER) / CPU_CYCLE_NS
+        start = SAMPLE_OFFSET + num % SAMPLE_CYCLES
+        return start + math.ceil(max(width - start, 0) / SAMPLE_CYCLES) * SAMPLE_CYCLES
+
+    def run_univib(self, loops):
+        device = UnivibType(self.test_params[0])
+        test_type = UnivibTestType(self.test_params[1])
+        if test_type not in (UnivibTestType.PULSE_WIDTH, UnivibTestType.RETRIGGER_PULSE_WIDTH):
+            return RespType.PASS, b''
+
+        retrigger = test_type == UnivibTestType.RETRIGGER_PULSE_WIDTH
+        widths = [self.pulse_width(device, i) for i in range(loops)]
+        retrig_offset = RETRIG_LOOPS * RETRIG_INTERVAL_CYCLES if retrigger else 0
+        payload = pack("<HHHIQH", len(widths), min(widths), max(widths), sum(widths), sum(w * w for w in widths), retrig_offset)
+        return RespType.PASS, payload
@@ -0,0 +1,98 @@
+from collections import Counter
+from enum import Enum
+from struct import iter_unpack
+
+from ictester.march import MARCH_C_MINUS
+
+FailPattern = Enum("FailPattern", names=[
+        ("STUCK_AT_0", 1),
+        ("STUCK_AT_1", 2),
+        ("COUPLING", 3),
+    ]
+)
+
+RUN_DIR_DOWN = 0x80
+
+
+# ------------------------------------------------------------------------
+class FailRun:
+    def __init__(self, step, row, column, length):
+        self.step = step & ~RUN_DIR_DOWN
+        self.down = bool(step & RUN_DIR_DOWN)
+        self.row = row
+        self.column = column
+        self.length = length
+
+
+# ------------------------------------------------------------------------
+class FailMap:
+    def __init__(self, address_space, page_mode=False, algorithm=MARCH_C_MINUS):
+        self.address_space = address_space
+        self.page_mode = page_mode
+        self.algorithm = algorithm
+        self.runs = []
+        self.overflow = False
+        self._cells = None
+
+    def add_frame(self, payload):
+        for x in iter_unpack("<BHHH", payload):
+            self.runs.append(FailRun(*x))
+        self._cells = None
+
+    def __len__(self):
+        return len(self.runs)
+
+    def failed_reads(self):
+        # Yield (step, row, column) for each failed read, in memory access order
+        mask = self.address_space - 1
+        for run in self.runs:
+            for i in range(run.length):
+                offset = -i if run.down else i
+                if self.page_mode:
+                    yield run.step, run.row, (run.column + offset) & mask
+                else:
+                    yield run.step, (run.row + offset) & mask, run.column
+
+    @property
+    def cells(self):
+        # failing cells: (row, column) -> set of failing steps
+        if self._cells is None:
+            self._cells = {}
+            for step, row, column in self.failed_reads():
+                self._cells.setdefault((row, column), set()).add(step)
+        return self._cells
+
+    def pattern(self, cell, steps):
+        # cell values expected by the reads depend on the data background
+        row, column = cell
+        reads = self.algorithm.reads
+        reads_0 = {s for s in reads if self.algorithm.expected(s, row, column) == 0}
+        reads_1 = {s for s in reads if self.algorithm.expected(s, row, column) == 1}
+        if steps >= reads_0 and not steps & reads_1:
+            return FailPattern.STUCK_AT_1
+        if steps >= reads_1 and not steps & reads_0:
+            return FailPattern.STUCK_AT_0
+        return FailPattern.COUPLING
+
+    def by_step(self):
+        return Counter(step for step, row, column in self.failed_reads())
+
+    def by_row(self):
+        return Counter(row for row, column in self.cells)
+
+    def by_column(self):
+        return Counter(column for row, column in self.cells)
+
+    def by_pattern(self):
+        return Counter(self.pattern(cell, steps) for cell, steps in self.cells.items())
+
+    def save_pbm(self, filename):
+        # Failing cells as a black and white image, one pixel per cell (rows top to bottom)
+        row_bytes = self.address_space // 8
+        bitmap = bytearray(row_bytes * self.address_space)
+        for row, column in self.cells:
+            bitmap[row * row_bytes + column // 8] |= 0x80 >> (column % 8)
+
+        with open(filename, "wb") as f:
+            f.write(f"P4\n# ictester DRAM failure map, rows x columns\n{self.address_space} {self.address_space}\n".encode())
+            f.write(bitmap)
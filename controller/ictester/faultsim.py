@@ -0,0 +1,189 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from ictester.test import TestLogic
+from ictester.sim import (Model, SimulationError)
+
+'''
+Stuck-at fault simulation.
+
+Every net of a part model (pins and internal nodes) gets two faults: stuck-at-0 and stuck-at-1.
+Faulty machines are simulated in parallel, one per simulator lane, with lane 0 running
+the fault-free machine. A fault is detected by a test if a faulty machine output
+is known and different from the value checked by the test, on a vector for which
+the fault-free machine agrees with the test. Faults making a checked output unknown
+(e.g. a stuck clock leaving a flip-flop in its unknown initial state) are only potentially detected.
+'''
+
+FAULTS_PER_JOB = 511  # faulty machines per simulator run, plus the fault-free machine in lane 0
+
+_models = {}
+
+
+# ------------------------------------------------------------------------
+def logic_tests(part):
+    return [t for t in part.tests if isinstance(t, TestLogic)]
+
+
+# ------------------------------------------------------------------------
+def fault_list(model):
+    return [(net, value) for net in model.nets for value in (0, 1)]
+
+
+# ------------------------------------------------------------------------
+def net_name(model, net):
+    if isinstance(net, int):
+        return f"{model.part.pins[net].name} (pin {net})"
+    if net.startswith("_"):
+        # internal net created from a nested expression
+        e = next(e for e in model.elements if e.output == net)
+        return f"{e.op}({', '.join(model.part.pins[i].name if isinstance(i, int) else i for i in e.inputs)}) ({net})"
+    return net
+
+
+def fault_name(model, fault):
+    net, value = fault
+    return f"{net_name(model, net)} stuck-at-{value}"
+
+
+# ------------------------------------------------------------------------
+def detections(model, test, faults, vectors=None):
+    # (detected, potentially detected) lane masks for each test vector, lane n+1 holds fault n
+    lanes = len(faults) + 1
+    masks = {}
+    for lane, (net, value) in enumerate(faults, 1):
+        s0, s1 = masks.get(net, (0, 0))
+        if value:
+            s1 |= 1 << lane
+        else:
+            s0 |= 1 << lane
+        masks[net] = (s0, s1)
+
+    sim = model.simulator(test.inputs, test.outputs, lanes=lanes, faults=masks, cfgnum=test.cfgnum)
+    full = sim.all
+    for v in (vectors if vectors is not None else test.iter_vectors()):
+        outputs = sim.step([(full, 0) if x else (0, full) for x in v.input])
+        detected = 0
+        potential = 0
+        for (o, z), expected in zip(outputs, v.output):
+            good, bad = (o, z) if expected else (z, o)
+            if good & 1:
+                detected |= bad
+                potential |= full & ~(o | z)
+        yield detected & ~1, potential & ~1
+
+
+# ------------------------------------------------------------------------
+def detect(model, test, faults, vectors=None):
+    # faults detected by a test: {fault index: number of the first vector detecting it},
+    # and a list of potentially detected fault indexes
+    remaining = (1 << (len(faults) + 1)) - 2
+    first = {}
+    potential = 0
+    try:
+        for num, (d, p) in enumerate(detections(model, test, faults, vectors)):
+            potential |= p
+            if d & remaining:
+                for n in range(len(faults)):
+                    if ((d & remaining) >> (n + 1)) & 1:
+                        first[n] = num
+                remaining &= ~d
+            if not remaining:
+                break
+    except SimulationError:
+        # some faulty machine doesn't settle: find it and count it as undetected
+        if len(faults) == 1:
+            return {}, []
+        half = len(faults) // 2
+        d1, p1 = detect(model, test, faults[:half], vectors)
+        d2, p2 = detect(model, test, faults[half:], vectors)
+        return {**d1, **{half + n: num for n, num in d2.items()}}, p1 + [half + n for n in p2]
+
+    return first, [n for n in range(len(faults)) if (potential >> (n + 1)) & 1]
+
+
+# ------------------------------------------------------------------------
+def _job(name, start, end):
+    # detected and potentially detected faults for each part test, for a range of the part fault list
+    from ictester.parts import catalog
+    if name not in _models:
+        _models[name] = Model(catalog[name])
+    model = _models[name]
+    faults = fault_list(model)[start:end]
+    result = []
+    for test in logic_tests(model.part):
+        detected, potential = detect(model, test, faults)
+        result.append(({start + n: num for n, num in detected.items()}, [start + n for n in potential]))
+    return result
+
+
+# ------------------------------------------------------------------------
+class Coverage:
+    def __init__(self, model, detected, potential):
+        self.model = model
+        self.faults = fault_list(model)
+        self.tests = logic_tests(model.part)
+        # detected[n]: {fault index: first detecting vector number} for test n
+        # potential[n]: set of fault indexes potentially detected by test n
+        self.detected = detected
+        self.potential = potential
+
+    @property
+    def total(self):
+        return set().union(*(d.keys() for d in self.detected))
+
+    @property
+    def potentially_detected(self):
+        total = self.total
+        potential = set().union(*self.potential)
+        return [f for n, f in enumerate(self.faults) if n in potential and n not in total]
+
+    @property
+    def undetected(self):
+        found = self.total | set().union(*self.potential)
+        return [f for n, f in enumerate(self.faults) if n not in found]
+
+    @property
+    def ratio(self):
+        return len(self.total) / len(self.faults) if self.faults else 1
+
+    def test_ratio(self, num):
+        return len(self.detected[num]) / len(self.faults) if self.faults else 1
+
+    def new(self):
+        # faults detected by each test, that aren't detected by tests run before it
+        seen = set()
+        result = []
+        for detected in self.detected:
+            result.append(detected.keys() - seen)
+            seen |= detected.keys()
+        return result
+
+    @property
+    def useless(self):
+        return [t for t, new in zip(self.tests, self.new()) if not new]
+
+
+# ------------------------------------------------------------------------
+def coverage(models, jobs=None):
+    # Coverage for each model, in order. Fault ranges of all models are simulated in a process pool.
+    jobs = jobs or os.cpu_count()
+    work = []
+    for model in models:
+        count = len(fault_list(model))
+        ranges = [(start, min(start + FAULTS_PER_JOB, count)) for start in range(0, count, FAULTS_PER_JOB)]
+        work.append((model, ranges))
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [
+            (model, [pool.submit(_job, model.part.name.upper(), start, end) for start, end in ranges])
+            for model, ranges in work
+        ]
+        for model, parts in futures:
+            tests = logic_tests(model.part)
+            detected = [{} for t in tests]
+            potential = [set() for t in tests]
+            for f in parts:
+                for num, (d, p) in enumerate(f.result()):
+                    detected[num].update(d)
+                    potential[num].update(p)
+            yield Coverage(model, detected, potential)
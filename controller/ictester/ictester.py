@@ -1,7 +1,12 @@
 #!/usr/bin/env python3
 
+import io
+import os
 import sys
+import time
 import argparse
+import sqlite3
+import contextlib
 import math
 import re
 import difflib
@@ -12,10 +17,24 @@ from colorama import just_fix_windows_console
 from colorama import Fore, Back, Style
 from struct import unpack
 
-from ictester.test import TestType
+from ictester.test import (TestType, DRAMTestType)
 from ictester.transport import Transport
-from ictester.response import RespType
+from ictester.emulator import Emulator
+from ictester.response import (RespType, ICTesterException)
+from ictester.tester import hello
 from ictester.parts import catalog
+from ictester import trace
+from ictester import march
+from ictester import speedgrade
+from ictester import vectorfile
+from ictester import order
+from ictester import profiles
+from ictester import detect
+from ictester import timing
+from ictester.prefetch import Prefetcher
+from ictester import report as results
+from ictester import store
+from ictester import metrics
 
 just_fix_windows_console()
 
@@ -61,7 +80,7 @@ def print_parts(list_tests=False):
             print(f"{name:7s} {part.package_name:6s} {part.desc}")
             if (list_tests):
                 for t in part.tests:
-                    print(f"  * {t.name} ({len(t.vectors)} vectors)")
+                    print(f"  * {t.name} ({t.vector_count} vectors)")
 
 # ------------------------------------------------------------------------
 def print_part_info(part):
@@ -94,11 +113,10 @@ def print_failed_vector(part, test, failed_vector_num, failed_pin_vector, contex
     o_width = [len(x) for x in o_names]
 
     print()
-    start_vec = max(failed_vector_num - context, 0)
     print_vector("", i_names, o_names, i_width, o_width, color="", separator="->")
-    for i in range(start_vec, failed_vector_num+1):
-        inputs = [int(x) for x in test.vectors[i].input]
-        outputs = [int(x) for x in test.vectors[i].output]
+    for i, v in test.failed_context[-(context+1):]:
+        inputs = [int(x) for x in v.input]
+        outputs = [int(x) for x in v.output]
         if i != failed_vector_num:
             print_vector(f"{i}:", inputs, outputs, i_width, o_width, color=LO)
         else:
@@ -106,8 +124,81 @@ def print_failed_vector(part, test, failed_vector_num, failed_pin_vector, contex
     print()
 
 # ------------------------------------------------------------------------
-def parse_cmd():
-    parser = argparse.ArgumentParser(description='IC tester controller')
+def print_itrace(test, baseline=None, show_all=False):
+    points = test.itrace
+    outliers = set(points.outliers(baseline))
+
+    print(f"   Supply current trace: {HI}{len(points)}{ENDC} points, ", end="")
+    print(f"{FAIL if outliers else OK}{len(outliers)}{ENDC} outlier{'s' if len(outliers) != 1 else ''}")
+    if not outliers and not show_all:
+        return
+
+    # trace points of windowed tests include state restore vectors, don't try to match them
+    i_names = [test.part.pins[pin].name for pin in test.inputs] if test.type == TestType.LOGIC and not test.windowed else []
+    print(f"   {'#':>6}  Ivcc [mA]  Ignd [mA]  𝚫I [mA]  Vbus [V]   {' '.join(i_names)}")
+    for num, p in enumerate(points):
+        if num not in outliers and not show_all:
+            continue
+        color = FAIL if num in outliers else LO
+        inputs = ""
+        if i_names and num < len(test.vectors):
+            inputs = ' '.join(f"{int(v):>{len(n)}}" for v, n in zip(test.vectors[num].input, i_names))
+        print(f"   {color}{num:>6}  {p.ivcc:9.2f}  {p.ignd:9.2f}  {p.idelta:7.2f}  {p.vbus:8.3f}   {inputs}{ENDC}")
+
+# ------------------------------------------------------------------------
+def print_failmap(test, top=8):
+    fmap = test.failmap
+    cells = fmap.cells
+    print(f" Failure map: {HI}{test.failed_reads}{ENDC} failed reads, {HI}{len(cells)}{ENDC} failing cells ({len(fmap)} runs)")
+    if fmap.overflow:
+        print(f" {WARN}WARNING:{ENDC} too many failures, failure map is incomplete")
+
+    steps = ', '.join(f"{HI}{fmap.algorithm.step_name(step)}{ENDC}: {count}" for step, count in sorted(fmap.by_step().items()))
+    print(f" Failed reads by {fmap.algorithm.name} element:operation: {steps}")
+    patterns = ', '.join(f"{p.name.lower().replace('_', '-')}: {HI}{count}{ENDC}" for p, count in fmap.by_pattern().most_common())
+    print(f" Failing cells by pattern: {patterns}")
+    rows = ', '.join(f"{HI}{row}{ENDC} ({count})" for row, count in fmap.by_row().most_common(top))
+    print(f" Rows with most failing cells: {rows}")
+    columns = ', '.join(f"{HI}{column}{ENDC} ({count})" for column, count in fmap.by_column().most_common(top))
+    print(f" Columns with most failing cells: {columns}")
+
+# ------------------------------------------------------------------------
+def print_speed_bin(sb):
+    print(" Read sampling time after ~CAS:")
+    for step, fails in enumerate(sb.failed_reads):
+        color = OK if not fails else FAIL
+        note = " (MARCH tests)" if step == speedgrade.MARCH_READ_STEP else ""
+        print(f"   {speedgrade.sample_time(step):4d} ns: {color}{fails:>8}{ENDC} failed reads{note}")
+    if sb.access_time is None:
+        print(f" Access time from ~CAS: {WARN}longer than {speedgrade.sample_time(speedgrade.STEPS - 1)} ns{ENDC}")
+    elif sb.resolution_limited:
+        print(f" Access time from ~CAS: {HI}{sb.access_time} ns{ENDC} or less (resolution: {speedgrade.CPU_CYCLE_NS} ns)")
+    else:
+        print(f" Access time from ~CAS: {HI}{sb.access_time_min}..{sb.access_time} ns{ENDC} (resolution: {speedgrade.CPU_CYCLE_NS} ns)")
+    if sb.grade == speedgrade.UNRESOLVABLE:
+        print(f" Estimated speed grade: {WARN}unresolvable{ENDC} (access time range doesn't decide the grade)")
+    elif sb.grade:
+        print(f" Estimated speed grade: {HI}{sb.device}{sb.grade}{ENDC} or better")
+    else:
+        print(f" Estimated speed grade: {WARN}slower than any {sb.device} grade{ENDC}")
+    if not sb.stable:
+        print(f" {WARN}WARNING:{ENDC} failures at longer read delays, memory is unreliable")
+
+# ------------------------------------------------------------------------
+def print_pulse(test):
+    p = test.pulse
+    limits = f" (limits: {test.limits[0]}..{test.limits[1]} ns)" if test.limits else ""
+    color = HI if not test.limits or p.within(test.limits) else FAIL
+    print(f" Pulse width{limits}: min {color}{p.min:.0f}{ENDC}, max {color}{p.max:.0f}{ENDC}, mean {HI}{p.mean:.1f}{ENDC}, stddev {HI}{p.stddev:.1f}{ENDC} ns ({p.count} pulses)")
+    if p.retrig_offset:
+        print(f" Retriggered pulse width: {HI}{p.extended:.1f}{ENDC} ns (last trigger at {p.retrig_offset:.0f} ns)")
+    if p.timeout:
+        print(f" {WARN}WARNING:{ENDC} output stuck active")
+
+# ------------------------------------------------------------------------
+def parse_cmd(argv=None):
+    # argv is given when running sessions on behalf of ictester-client
+    parser = argparse.ArgumentParser(prog='ictester' if argv is not None else None, description='IC tester controller')
     parser.add_argument('-d', '--device', default=None, help='Serial port where the IC tester is connected')
     parser.add_argument('-l', '--loops', type=int, default=None, help='Loop count (1..65535)')
     parser.add_argument('-t', '--test', type=int, default=None, help='Test number to run')
@@ -115,9 +206,31 @@ def parse_cmd():
     parser.add_argument('-L', '--list', action="store_true", help='List all supported parts')
     parser.add_argument('-A', '--list-all', action="store_true", help='List all supported parts and all tests for each part')
     parser.add_argument('--safety-off', action="store_true", help='Disable safety checks')
+    parser.add_argument('-M', '--failmap', action="store_true", help='Don\'t stop DRAM tests on the first failure, collect all failing cells')
+    parser.add_argument('--failmap-save', metavar='FILE', default=None, help='Save DRAM failure map to a PBM image file')
+    parser.add_argument('--march', metavar='ALGORITHM', default=None, help=f'March algorithm for DRAM tests: {", ".join(march.ALGORITHMS)}, or march notation, eg. "any(w0); up(r0,w1); down(r1,w0)"')
+    parser.add_argument('-T', '--trace', action="store_true", help='Record supply current for each vector (measurement point) and report outliers')
+    parser.add_argument('--trace-save', metavar='FILE', default=None, help='Save supply current traces to a CSV file (or NumPy .npy file)')
+    parser.add_argument('--trace-baseline', metavar='FILE', default=None, help='Compare supply current traces against ones saved for a known-good part')
+    parser.add_argument('--vectors', metavar='FILE', default=None, help='Run logic test vectors from a file (text or binary, see ictester-vectors) instead of part tests')
+    parser.add_argument('-P', '--profile', default=None, help='Test profile: "screen" (1 loop, compacted tests, no current measurements), "qualify" (full loops, current traces), or one declared by the part. Comma-separated list of profiles runs them one after another, as long as the part passes')
+    parser.add_argument('--two-phase', action="store_true", help='Screen the part first, qualify only parts passing the screen (same as --profile screen,qualify)')
+    parser.add_argument('--order', default='auto', help='Test order: "auto" (most likely to fail per second of run time first, based on test history), "declared" (as declared by the part), "config" (declared, tests using the same pin configuration together), or a comma-separated list of test numbers')
+    parser.add_argument('--history', metavar='FILE', default=order.HISTORY_FILE, help=f'Test history file used for test ordering (default: {order.HISTORY_FILE})')
+    parser.add_argument('--time-budget', metavar='SECONDS', type=float, default=None, help='Reduce test loop counts so that the whole test run fits in the given time (each test runs at least once), based on run time estimates calibrated with test history')
+    parser.add_argument('--detect', metavar='PINS', type=int, choices=[14, 16, 20, 24], default=None, help='Identify an unknown chip with a given pin count (14, 16, 20 or 24) instead of testing a selected part')
+    parser.add_argument('--test-detected', action="store_true", help='Run all tests of the identified part (with --detect)')
+    parser.add_argument('--no-prefetch', action="store_true", help='Don\'t prepare test vectors for the next test while the current one runs')
+    parser.add_argument('--emulate', action="store_true", help='Don\'t connect to the tester, use tester emulator with a good DUT')
+    parser.add_argument('--emulate-realtime', action="store_true", help='Make the emulated tester respond as slow as a real one would (serial link transfers and logic test runs). Implies --emulate')
+    parser.add_argument('--db', metavar='FILE', default=None, help=f'Store test results in a SQLite database (default: {store.DB_FILE}, not used with --emulate unless given explicitly), query it with ictester-db')
+    parser.add_argument('--no-db', action="store_true", help='Don\'t store test results in the database')
+    parser.add_argument('--lot', default=None, help='Lot name stored with test results')
+    parser.add_argument('--metrics', metavar='FILE', default=None, help='Update tester metrics in FILE (Prometheus textfile collector format) after the session, serve them with ictester-metrics')
+    parser.add_argument('--format', choices=results.FORMATS, default='text', help='Output format: "text" (default), "json" (single JSON object after all tests), or "ndjson" (JSON record for each test, written as soon as the test finishes)')
     parser.add_argument('-v', '--verbose', action="count", default=0, help='Verbose output. Repeat for even more verbosity')
     parser.add_argument('part', help='Part symbol', nargs='?')
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     logger.setLevel(21 - args.verbose)
 
@@ -130,24 +243,74 @@ def parse_cmd():
     if args.delay is not None and (args.delay < 0 or args.delay > 13107):
         parser.error("Delay should be between 0 and 13107")
 
-    if not args.list and not args.list_all and args.part is None:
+    if args.time_budget is not None:
+        if args.time_budget <= 0:
+            parser.error("Time budget should be greater than 0")
+        if args.loops is not None:
+            parser.error("--time-budget can't be used with --loops")
+
+    if not args.list and not args.list_all and args.detect is None and args.part is None:
         parser.error("'part' argument is required")
 
+    if args.detect is not None and args.part is not None:
+        parser.error("'part' can't be used with --detect")
+
+    if args.test_detected and args.detect is None:
+        parser.error("--test-detected requires --detect")
+
+    if args.two_phase:
+        if args.profile:
+            parser.error("--two-phase can't be used with --profile")
+        args.profile = "screen,qualify"
+
+    if args.trace_save or args.trace_baseline:
+        args.trace = True
+
+    if args.emulate_realtime:
+        args.emulate = True
+
+    if args.no_db:
+        args.db = None
+    elif args.db is None and not args.emulate:
+        args.db = store.DB_FILE
+
+    if args.failmap_save:
+        args.failmap = True
+
+    if args.order not in ("auto", "declared", "config"):
+        try:
+            args.order = [int(x) for x in args.order.split(",")]
+        except ValueError:
+            parser.error("Test order should be 'auto', 'declared', 'config' or a list of test numbers")
+        if any(n <= 0 for n in args.order):
+            parser.error("Test numbers start from 1")
+
+    if args.march is not None:
+        try:
+            args.march = march.get_algorithm(args.march)
+        except ValueError as e:
+            parser.error(str(e))
+
     return args
 
 # ------------------------------------------------------------------------
-def get_part(part_name):
+def get_part(part_name, parts=catalog):
     try:
-        part = catalog[part_name]
+        part = parts[part_name]
     except KeyError:
         print(f"Part \"{part_name}\" not found. Use --list to list all supported parts.")
-        matches = difflib.get_close_matches(part_name, catalog, n=1, cutoff=0.7)
+        matches = difflib.get_close_matches(part_name, parts, n=1, cutoff=0.7)
         if matches:
             matches = ', '.join(matches)
             print(f"Supported part with the most similar name is: {HI}{matches}{ENDC}")
         sys.exit(100)
     return part
 
+# ------------------------------------------------------------------------
+def number(part, test):
+    # test number as used by --test, None for tests not declared by the part (compacted, from a file)
+    return part.tests.index(test) + 1 if test in part.tests else None
+
 # ------------------------------------------------------------------------
 def get_serial_port(device):
     # Try searching for ictester
@@ -169,38 +332,139 @@ def get_serial_port(device):
 # --- Main ---------------------------------------------------------------
 # ------------------------------------------------------------------------
 
-def main():
-    args = parse_cmd()
+def connect(args):
+    if args.emulate:
+        transport = Emulator(realtime=args.emulate_realtime)
+    else:
+        serial_port = get_serial_port(args.device)
+        try:
+            transport = Transport(serial_port, 500000)
+        except SerialException as e:
+            print(f"Could not open connection to the tester: {e}")
+            sys.exit(80)
 
-    if args.list or args.list_all:
-        print_parts(list_tests=args.list_all)
-        sys.exit(0)
+    try:
+        tester = hello(transport)
+    except ICTesterException as e:
+        print(f"Could not start communication with the tester: {e}")
+        sys.exit(80)
+
+    return transport, tester
 
-    part = get_part(args.part.upper())
-    serial_port = get_serial_port(args.device)
+# ------------------------------------------------------------------------
+def session(args, report, connection=None, parts=catalog):
+    # connection: (transport, tester info) of an already connected tester
+    # parts: where parts are looked up by name
+    part = get_part(args.part.upper(), parts) if args.part else None
+
+    transport, tester = connection or connect(args)
+    transport.bytes_sent = transport.bytes_received = 0
+
+    if args.detect:
+        candidates = detect.identify(transport, args.detect, args.safety_off)
+        print()
+        if len(candidates) == 1:
+            print(f"Detected part: {OK}{candidates[0]}{ENDC}")
+        elif candidates:
+            print(f"{WARN}Part can't be identified, candidates:{ENDC} {', '.join(candidates)}")
+        else:
+            print(f"{FAIL}Unknown part{ENDC}")
+        if report:
+            report.emit("detect", pins=args.detect, candidates=candidates)
+        if len(candidates) != 1 or not args.test_detected:
+            return 0 if len(candidates) == 1 else 4
+        print()
+        part = parts[candidates[0]]
+
+    started = time.monotonic()
+    part.setup(transport, tester)
+    setup_time = time.monotonic() - started
+
+    baseline = {}
+    if args.trace_baseline:
+        try:
+            baseline = trace.load_baseline(args.trace_baseline)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Could not load current trace baseline: {e}")
+            sys.exit(60)
+    traces = []
 
     try:
-        transport = Transport(serial_port, 500000)
-    except SerialException as e:
-        print(f"Could not open connection to the tester: {e}")
-        sys.exit(80)
+        history = order.History(args.history)
+    except (OSError, ValueError) as e:
+        print(f"{WARN}WARNING:{ENDC} could not load test history: {e}")
+        history = order.History(None)
 
-    part.setup(transport)
+    try:
+        phases = [profiles.get_profile(part, name) for name in args.profile.split(",")] if args.profile else [None]
+    except ValueError as e:
+        print(e)
+        sys.exit(70)
 
-    if args.test:
+    if args.vectors:
         try:
-            run_tests = [part.tests[args.test-1]]
+            selected = [vectorfile.load(args.vectors, part, loops=1)]
+        except (OSError, ValueError) as e:
+            print(f"Could not load test vectors: {e}")
+            sys.exit(70)
+    elif args.test:
+        try:
+            selected = [part.tests[args.test-1]]
         except IndexError:
             print(f"Test number {args.test} is not available for {part.name}")
             sys.exit(70)
+    elif isinstance(args.order, list):
+        try:
+            selected = [part.tests[n-1] for n in args.order]
+        except IndexError:
+            print(f"Test order refers to tests not available for {part.name}")
+            sys.exit(70)
     else:
-        run_tests = part.tests
-
-    longest_desc = max(len(t.name) for t in run_tests)
-
-    total_time = 0
+        selected = part.tests
+
+    # (profile, test) for each test run
+    run_tests = []
+    for profile in phases:
+        tests = profile.tests(part, selected) if profile else selected
+        if args.order == "auto" and not args.vectors and not args.test:
+            tests = order.order(part, tests, history, args.loops or (profile and profile.loops))
+        elif args.order == "config" and not args.vectors and not args.test:
+            tests = order.config(part, tests)
+        run_tests.extend((profile, t) for t in tests)
+
+    longest_desc = max(len(t.name) for p, t in run_tests)
+
+    # loop count and run time estimate for each test run
+    calibration = timing.Calibration(history, part, [t for p, t in run_tests])
+    plan = []
+    for profile, test in run_tests:
+        if args.delay is not None:
+            test.set_delay(args.delay)
+        if args.failmap and test.type == TestType.DRAM:
+            test.failmap_enabled = True
+        if args.march and test.type == TestType.DRAM:
+            test.algorithm = args.march
+        loops = args.loops if args.loops is not None else profile.loops if profile and profile.loops else test.loops
+        trace_on = args.trace or bool(profile and profile.trace)
+        plan.append((calibration.estimate(test, trace_on, not profile or profile.imeasure), loops))
+    if args.time_budget:
+        run_loops = timing.fit_loops(plan, args.time_budget)
+    else:
+        run_loops = [loops for e, loops in plan]
+    estimated = sum(e.time(loops) for (e, l), loops in zip(plan, run_loops))
 
     print_part_info(part)
+    if report:
+        report.emit("part",
+            part=part.name, package=part.package_name, desc=part.desc,
+            tester={"device": "emulator" if args.emulate else transport.port,
+                "protocol_version": tester.protocol_version, "firmware_version": tester.firmware_version},
+            start=results.timestamp(), estimated_time=estimated, tests=len(run_tests))
+    if args.time_budget:
+        color = WARN if estimated > args.time_budget else HI
+        print(f"Estimated test time: {color}{estimated:.2f} sec.{ENDC} (budget: {args.time_budget:.2f} sec.)")
+    else:
+        print(f"Estimated test time: {HI}{estimated:.2f} sec.{ENDC}")
     print()
 
     tests_failed = 0
@@ -208,7 +472,9 @@ def main():
     tests_passed = 0
 
     print("DUT power up: ", end="")
+    started = time.monotonic()
     resp = part.powerup(transport, args.safety_off)
+    setup_time += time.monotonic() - started
     vbus = unpack("<h", resp.payload)[0] * 1.6 / 1000
     if resp.response == RespType.OK:
         print(f"{OK}OK{ENDC}, ", end="");
@@ -216,48 +482,105 @@ def main():
         print(f"{FAIL}Overcurrent{ENDC}, ", end="")
     print(f"Vbus idle = {HI}{vbus:5.3f} V{ENDC}");
     print()
+    if report:
+        report.emit("powerup", result=resp.response.name, vbus=vbus, setup_time=setup_time)
     if resp.response == RespType.ERR and not args.safety_off:
         return 3
 
-    for test in run_tests:
-        loops = args.loops if args.loops is not None else test.loops
+    prefetch = Prefetcher([t for p, t in run_tests]) if not args.no_prefetch else None
+
+    phase = None
+    for index, ((profile, test), (estimate, _), loops) in enumerate(zip(run_tests, plan, run_loops)):
+        if profile is not phase:
+            phase = profile
+            print(f"Profile: {HI}{profile.name}{ENDC}")
+        trace_on = args.trace or bool(profile and profile.trace)
         plural = "s" if loops != 1 else ""
-        stats = f"({len(test.vectors)} vectors, {loops} loop{plural})"
+        stats = f"({test.vector_count} vectors, {loops} loop{plural})"
         endc = "\n" if logger.isEnabledFor(20) else ""
         print(f" * Testing: {HI}{test.name:{longest_desc}s}{ENDC}   {stats:25}  ... ", end=endc, flush=True)
 
         if tests_failed:
             print(f"\b\b\b\b{SKIP}SKIP{ENDC}")
             resp.response = None
+            if report:
+                report.emit("test", **results.test_record(part, test, number(part, test), profile, loops, None))
             continue
 
-        if args.delay is not None:
-            test.set_delay(args.delay)
-        test.setup(transport)
-
-        resp = test.run(transport, loops)
+        if prefetch:
+            prefetch.ready(index)
+        try:
+            calibrated = calibration.calibrated(test)
+            deadline = timing.timeout(estimate.time(loops), calibrated)
+            logger.log(20, "Response deadline: %.1fs (%s)", deadline, "calibrated estimate" if calibrated else "uncalibrated, generous")
+            transport.set_timeout(deadline)
+            started = time.monotonic()
+            test.setup(transport)
+            upload_time = time.monotonic() - started
+            resp = test.run(transport, loops, trace_on, not profile or profile.imeasure)
+            transport.set_timeout(timing.COMMAND_TIMEOUT)
+        except ICTesterException as e:
+            print(f"\b\b\b\b{FAIL}ERR{ENDC}")
+            print(f"Test aborted: {e}")
+            sys.exit(80)
+        logger.log(20, "Run time: %.3fs, estimated: %.3fs", test.elapsed or 0, estimate.run_time(loops))
 
         print(f"\b\b\b\b{result_color[resp.response]}{resp.response.name}{ENDC}", end="")
         if resp.response in (RespType.PASS, RespType.FAIL):
             print(f"  ({test.elapsed:.2f} sec.)", end="")
         print()
 
+        if test.itrace is not None:
+            traces.append((test.name, test.itrace))
+            try:
+                print_itrace(test, baseline.get(test.name), show_all=logger.isEnabledFor(20))
+            except ValueError as e:
+                print(f"   {WARN}WARNING:{ENDC} {e}")
+
         if resp.response == RespType.FAIL:
             tests_failed += 1
             if test.type == TestType.LOGIC:
                 print()
                 print(f"Test failed on loop: {HI}{test.failed_loop}{ENDC}")
                 print_failed_vector(part, test, test.failed_vector_num, test.failed_pin_vector)
+            if test.type == TestType.UNIVIB and test.pulse:
+                print()
+                print_pulse(test)
+                print()
             if test.type == TestType.DRAM:
                 print()
-                print(f" Failing address: row {HI}{test.failed_row}{ENDC}, column {HI}{test.failed_column}{ENDC} on MARCH C- step {HI}{test.failed_march_step}{ENDC}")
+                if test.chip_test_type == DRAMTestType.SPEED_BIN:
+                    print(f" Failing address: row {HI}{test.failed_row}{ENDC}, column {HI}{test.failed_column}{ENDC} at all read sampling times")
+                else:
+                    print(f" Failing address: row {HI}{test.failed_row}{ENDC}, column {HI}{test.failed_column}{ENDC} on {test.algorithm.name} element:operation {HI}{test.algorithm.step_name(test.failed_march_step)}{ENDC}")
+                if test.failmap is not None:
+                    print_failmap(test)
+                    if args.failmap_save:
+                        try:
+                            test.failmap.save_pbm(args.failmap_save)
+                        except OSError as e:
+                            print(f" {WARN}WARNING:{ENDC} could not save failure map: {e}")
                 print()
         elif resp.response == RespType.PASS:
             tests_passed += 1
+            if test.type == TestType.DRAM and test.speed_bin:
+                print_speed_bin(test.speed_bin)
+            if test.type == TestType.UNIVIB and test.pulse:
+                print_pulse(test)
         elif resp.response == RespType.TIMING_ERROR:
             tests_warning += 1
 
+        if resp.response in (RespType.PASS, RespType.FAIL):
+            history.record(part, test, loops, resp.response == RespType.FAIL, not profile or profile.imeasure, trace_on)
+
+        if report:
+            report.emit("test", **results.test_record(part, test, number(part, test), profile, loops, resp.response, baseline.get(test.name), upload_time))
+
+    if prefetch:
+        prefetch.close()
+    started = time.monotonic()
     part.disconnect(transport)
+    disconnect_time = time.monotonic() - started
 
     if resp.response != RespType.FAIL:
         print()
@@ -271,9 +594,26 @@ def main():
         print(f" {name}:  {HI}{m[0]:6.2f}      {m[1]:6.2f}      {m[2]:6.2f}{ENDC}")
     print()
 
+    if part.relay_switches + part.relay_skips > 1:
+        saved = part.relay_skips * timing.RELAY_SWITCH_US / 1000
+        print(f"Pin configuration switches: {HI}{part.relay_switches}{ENDC}, skipped: {HI}{part.relay_skips}{ENDC} (~{saved:.1f} ms saved)")
+        print()
+
     logger.log(20, "Bytes sent: %s, received: %s", transport.bytes_sent, transport.bytes_received)
 
-    tests_skipped = len(part.tests) - (tests_failed + tests_warning + tests_passed)
+    if history.path and not args.emulate:
+        try:
+            history.save()
+        except OSError as e:
+            print(f"{WARN}WARNING:{ENDC} could not save test history: {e}")
+
+    if args.trace_save:
+        try:
+            trace.save(traces, args.trace_save)
+        except (OSError, RuntimeError) as e:
+            print(f"{WARN}WARNING:{ENDC} could not save current traces: {e}")
+
+    tests_skipped = len(run_tests) - (tests_failed + tests_warning + tests_passed)
 
     print(f"Total tests: {HI}{len(run_tests)}{ENDC}", end="")
     if tests_failed:
@@ -298,8 +638,74 @@ def main():
 
     print(f"{result}{ENDC}")
 
+    if report:
+        report.emit("summary",
+            vbus_min=part.vbus, currents=results.currents(part),
+            transport={"bytes_sent": transport.bytes_sent, "bytes_received": transport.bytes_received},
+            relay_switches=part.relay_switches, relay_skips=part.relay_skips,
+            tests={"total": len(run_tests), "failed": tests_failed, "warning": tests_warning, "skipped": tests_skipped, "passed": tests_passed},
+            result=results.plain(result), exit_code=ret, end=results.timestamp(), disconnect_time=disconnect_time)
+
+    return ret
+
+# ------------------------------------------------------------------------
+def run(args, connection=None, parts=catalog, stdout=None, redirect=contextlib.redirect_stdout):
+    # test session with result storage and reporting set up as requested by args.
+    # stdout: where result records are written (default: sys.stdout)
+    # redirect: context manager replacing stdout for machine-readable output formats
+    if args.list or args.list_all:
+        print_parts(list_tests=args.list_all)
+        sys.exit(0)
+
+    db = None
+    if args.db:
+        try:
+            db = store.Store(args.db, args.lot)
+        except (OSError, sqlite3.Error) as e:
+            print(f"{WARN}WARNING:{ENDC} could not open results database: {e}", file=sys.stderr)
+
+    collector = None
+    if args.metrics:
+        collector = metrics.Metrics()
+        try:
+            if os.path.exists(metrics.state_file(args.metrics)):
+                collector.load(metrics.state_file(args.metrics))
+        except (OSError, ValueError) as e:
+            print(f"{WARN}WARNING:{ENDC} could not load metrics, starting over: {e}", file=sys.stderr)
+
+    report = results.Report(args.format, stdout, listeners=[l for l in (db, collector) if l])
+    try:
+        if args.format == "text":
+            ret = session(args, report, connection, parts)
+        else:
+            # regular output is replaced with result records, it only ends up in an error record if the session is aborted
+            output = io.StringIO()
+            try:
+                with redirect(output):
+                    ret = session(args, report, connection, parts)
+            except SystemExit:
+                report.error(output.getvalue())
+                raise
+    except SystemExit as e:
+        if args.format == "text":
+            report.emit("error", message=f"Session aborted, exit code: {e.code}")
+        raise
+    finally:
+        report.close()
+        error = db.close() if db else None
+        if error:
+            print(f"{WARN}WARNING:{ENDC} could not store test results: {error}", file=sys.stderr)
+        if collector:
+            try:
+                collector.write(args.metrics)
+            except OSError as e:
+                print(f"{WARN}WARNING:{ENDC} could not write metrics: {e}", file=sys.stderr)
     return ret
 
+# ------------------------------------------------------------------------
+def main():
+    return run(parse_cmd())
+
 if __name__ == "__main__":
     sys.exit(main())
 
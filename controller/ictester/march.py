@@ -0,0 +1,254 @@
+import re
+import sys
+from enum import Enum
+from itertools import product
+
+Background = Enum("Background", names=[
+        ("SOLID", 0),
+        ("CHECKERBOARD", 1),
+        ("ROW_STRIPES", 2),
+        ("COLUMN_STRIPES", 3),
+    ]
+)
+
+MAX_ELEMENTS = 16
+MAX_OPS = 8
+
+EL_DOWN = 0x80
+OP_WRITE = 0b10
+
+DIRECTIONS = {
+    "up": False, "⇑": False,
+    "down": True, "⇓": True,
+    "any": False, "⇕": False,
+}
+
+
+# ------------------------------------------------------------------------
+def bg_flip(background, row, column):
+    # 1 if data background inverts the value stored in a cell (physical address)
+    if background == Background.CHECKERBOARD:
+        return (row ^ column) & 1
+    if background == Background.ROW_STRIPES:
+        return row & 1
+    if background == Background.COLUMN_STRIPES:
+        return column & 1
+    return 0
+
+
+# ------------------------------------------------------------------------
+class MarchElement:
+    def __init__(self, down, ops, background=Background.SOLID):
+        # ops: list of (write, value)
+        if not 1 <= len(ops) <= MAX_OPS:
+            raise ValueError(f"March element needs 1 to {MAX_OPS} operations, got {len(ops)}")
+        self.down = down
+        self.ops = ops
+        self.background = background
+
+    def __bytes__(self):
+        header = (EL_DOWN if self.down else 0) | self.background.value << 4 | len(self.ops)
+        return bytes([header] + [(OP_WRITE if write else 0) | value for write, value in self.ops])
+
+    def __str__(self):
+        ops = ','.join(f"{'w' if write else 'r'}{value}" for write, value in self.ops)
+        return f"{'down' if self.down else 'up'}({ops})"
+
+
+# ------------------------------------------------------------------------
+class MarchAlgorithm:
+    def __init__(self, name, elements):
+        if not 1 <= len(elements) <= MAX_ELEMENTS:
+            raise ValueError(f"March algorithm needs 1 to {MAX_ELEMENTS} elements, got {len(elements)}")
+        self.name = name
+        self.elements = elements
+
+    @classmethod
+    def parse(cls, text, name=None, background=Background.SOLID):
+        # "any(w0); up(r0,w1); down(r1,w0)"
+        elements = []
+        for el in filter(None, (e.strip() for e in text.split(";"))):
+            m = re.fullmatch(r"(\S+)\s*\(([^)]*)\)", el)
+            if not m or m[1].lower() not in DIRECTIONS:
+                raise ValueError(f"Invalid march element: {el}")
+            ops = []
+            for op in (o.strip().lower() for o in m[2].split(",")):
+                if not re.fullmatch(r"[rw][01]", op):
+                    raise ValueError(f"Invalid march operation '{op}' in: {el}")
+                ops.append((op[0] == "w", int(op[1])))
+            elements.append(MarchElement(DIRECTIONS[m[1].lower()], ops, background))
+        return cls(name if name else text, elements)
+
+    def __bytes__(self):
+        return bytes([len(self.elements)]) + b''.join(bytes(e) for e in self.elements)
+
+    def __str__(self):
+        return '; '.join(str(e) for e in self.elements)
+
+    def __len__(self):
+        return sum(len(e.ops) for e in self.elements)
+
+    @property
+    def reads(self):
+        # step code (as reported by the tester) -> (element, read value, background)
+        return {
+            num | opnum << 4: (el, value, el.background)
+            for num, el in enumerate(self.elements)
+            for opnum, (write, value) in enumerate(el.ops)
+            if not write
+        }
+
+    def step_name(self, step):
+        num, opnum = step & 0x0f, step >> 4
+        el = self.elements[num]
+        write, value = el.ops[opnum]
+        return f"{num}:{'w' if write else 'r'}{value}"
+
+    def expected(self, step, row, column):
+        el, value, background = self.reads[step]
+        return value ^ bg_flip(background, row, column)
+
+
+# ------------------------------------------------------------------------
+def _algorithm(name, text, background=Background.SOLID):
+    return MarchAlgorithm.parse(text, name, background)
+
+
+ALGORITHMS = {a.name: a for a in [
+    _algorithm("MATS+", "any(w0); up(r0,w1); down(r1,w0)"),
+    _algorithm("March B", "any(w0); up(r0,w1,r1,w0,r0,w1); up(r1,w0,w1); down(r1,w0,w1,w0); down(r0,w1,w0)"),
+    _algorithm("March C-", "any(w0); up(r0,w1); up(r1,w0); down(r0,w1); down(r1,w0); up(r0)"),
+    _algorithm("March SS", "any(w0); up(r0,r0,w0,r0,w1); up(r1,r1,w1,r1,w0); down(r0,r0,w0,r0,w1); down(r1,r1,w1,r1,w0); any(r0)"),
+    _algorithm("Checkerboard", "any(w0); any(r0); any(w1); any(r1)", Background.CHECKERBOARD),
+    _algorithm("Row stripes", "any(w0); any(r0); any(w1); any(r1)", Background.ROW_STRIPES),
+    _algorithm("Column stripes", "any(w0); any(r0); any(w1); any(r1)", Background.COLUMN_STRIPES),
+]}
+
+MARCH_C_MINUS = ALGORITHMS["March C-"]
+
+
+# ------------------------------------------------------------------------
+def get_algorithm(spec):
+    # predefined algorithm name (case insensitive) or march notation
+    for name, a in ALGORITHMS.items():
+        if name.lower() == spec.lower():
+            return a
+    return MarchAlgorithm.parse(spec)
+
+
+# ------------------------------------------------------------------------
+def access_order(algorithm, address_space, page_mode=False):
+    # Reference interpreter: yield (step, row, column, write, value) for each memory access,
+    # in the same order the tester does. Values are physical cell values.
+    mask = address_space - 1
+    for num, el in enumerate(algorithm.elements):
+        inv = mask if el.down else 0
+        ops = [(num | opnum << 4, write, value) for opnum, (write, value) in enumerate(el.ops)]
+        if page_mode:
+            for r in range(address_space):
+                for step, write, value in ops:
+                    for c in range(address_space):
+                        row, column = r ^ inv, c ^ inv
+                        yield step, row, column, write, value ^ bg_flip(el.background, row, column)
+        else:
+            for c, r in product(range(address_space), repeat=2):
+                row, column = r ^ inv, c ^ inv
+                for step, write, value in ops:
+                    yield step, row, column, write, value ^ bg_flip(el.background, row, column)
+
+
+# ------------------------------------------------------------------------
+class FaultyMemory:
+    # Bit memory with a single injected fault, used to evaluate algorithm fault coverage.
+    # Fault kinds:
+    #   SAF0/SAF1 - stuck-at fault
+    #   TF_UP/TF_DOWN - transition fault (cell can't go 0->1 or 1->0)
+    #   CFIN - inversion coupling fault: aggressor transition inverts the victim
+    #   CFID0/CFID1 - idempotent coupling fault: aggressor transition sets the victim to 0/1
+    #   AF - address decoder fault: victim address accesses the aggressor cell
+
+    def __init__(self, address_space, fault=None, victim=None, aggressor=None, rising=True):
+        self.address_space = address_space
+        self.cells = {}
+        self.fault = fault
+        self.victim = victim
+        self.aggressor = aggressor
+        self.rising = rising
+
+    def _cell(self, cell):
+        if self.fault == "AF" and cell == self.victim:
+            return self.aggressor
+        return cell
+
+    def read(self, cell):
+        cell = self._cell(cell)
+        if self.fault in ("SAF0", "SAF1") and cell == self.victim:
+            return int(self.fault[-1])
+        return self.cells.get(cell, 0)
+
+    def write(self, cell, value):
+        cell = self._cell(cell)
+        old = self.cells.get(cell, 0)
+        if cell == self.victim:
+            if self.fault == "TF_UP" and old == 0 and value == 1:
+                return
+            if self.fault == "TF_DOWN" and old == 1 and value == 0:
+                return
+        self.cells[cell] = value
+        if cell == self.aggressor and old != value and (value == 1) == self.rising:
+            if self.fault == "CFIN":
+                self.cells[self.victim] = self.cells.get(self.victim, 0) ^ 1
+            elif self.fault in ("CFID0", "CFID1"):
+                self.cells[self.victim] = int(self.fault[-1])
+
+
+# ------------------------------------------------------------------------
+def detects(algorithm, memory, page_mode=False):
+    for step, row, column, write, value in access_order(algorithm, memory.address_space, page_mode):
+        if write:
+            memory.write((row, column), value)
+        elif memory.read((row, column)) != value:
+            return True
+    return False
+
+
+# ------------------------------------------------------------------------
+FAULT_KINDS = ["SAF0", "SAF1", "TF_UP", "TF_DOWN", "CFIN", "CFID0", "CFID1", "AF"]
+COUPLED_FAULTS = ["CFIN", "CFID0", "CFID1", "AF"]
+
+
+def coverage(algorithm, address_space=4, page_mode=False):
+    # fault kind -> fraction of injected faults detected, for every cell (and aggressor) position
+    cells = list(product(range(address_space), repeat=2))
+    result = {}
+    for kind in FAULT_KINDS:
+        detected = total = 0
+        for victim in cells:
+            if kind in COUPLED_FAULTS:
+                for aggressor in cells:
+                    if aggressor == victim:
+                        continue
+                    for rising in ([True] if kind == "AF" else [True, False]):
+                        m = FaultyMemory(address_space, kind, victim, aggressor, rising)
+                        detected += detects(algorithm, m, page_mode)
+                        total += 1
+            else:
+                m = FaultyMemory(address_space, kind, victim)
+                detected += detects(algorithm, m, page_mode)
+                total += 1
+        result[kind] = detected / total
+    return result
+
+
+# ------------------------------------------------------------------------
+def main():
+    names = sys.argv[1:] if len(sys.argv) > 1 else ALGORITHMS.keys()
+    print(f"{'Algorithm':<16} {'ops':>4}  " + ' '.join(f"{k:>7}" for k in FAULT_KINDS))
+    for name in names:
+        a = get_algorithm(name)
+        cov = coverage(a)
+        print(f"{a.name:<16} {len(a):>4}n " + ' '.join(f"{100*v:6.1f}%" for v in cov.values()))
+
+
+if __name__ == "__main__":
+    main()
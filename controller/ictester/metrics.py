@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import argparse
+from http.server import (ThreadingHTTPServer, BaseHTTPRequestHandler)
+
+'''
+Tester metrics for monitoring.
+
+Result records of test sessions (see report.py) are turned into counters and histograms:
+chips tested and test results per part, durations of session phases (DUT setup, vector upload,
+test run, DUT disconnect), bytes transferred, bus voltage and supply current distributions.
+
+Metrics are kept in a JSON state file, so they accumulate over many ictester runs.
+After each session they're also written to a text file in Prometheus text format,
+for the node_exporter textfile collector. ictester-metrics serves them over HTTP
+in OpenMetrics (or Prometheus, depending on what the scraper accepts) text format.
+'''
+
+PORT = 9464
+
+DURATION_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+VBUS_BUCKETS = [4.5, 4.6, 4.7, 4.75, 4.8, 4.85, 4.9, 4.95, 5.0, 5.05, 5.1, 5.25]
+CURRENT_BUCKETS = [0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5]
+
+# name: (type, unit, help, histogram buckets)
+FAMILIES = {
+    "ictester_chips_tested": ("counter", None, "Chips tested, by part, tester and session result", None),
+    "ictester_tests": ("counter", None, "Test runs, by part and test result", None),
+    "ictester_phase_duration_seconds": ("histogram", "seconds", "Duration of test session phases", DURATION_BUCKETS),
+    "ictester_sent_bytes": ("counter", "bytes", "Bytes sent to the tester", None),
+    "ictester_received_bytes": ("counter", "bytes", "Bytes received from the tester", None),
+    "ictester_vbus_volts": ("histogram", "volts", "DUT bus voltage: idle after power up, and lowest measured", VBUS_BUCKETS),
+    "ictester_supply_current_amperes": ("histogram", "amperes", "DUT supply current measurements, by part", CURRENT_BUCKETS),
+}
+
+SESSION_RESULTS = {0: "ok", 1: "defective", 2: "timing_error"}
+
+OPENMETRICS_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PROMETHEUS_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ------------------------------------------------------------------------
+def _num(v):
+    v = float(v)
+    return str(int(v)) if v.is_integer() and abs(v) < 1e15 else repr(v)
+
+
+def _escape(s):
+    return str(s).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+# ------------------------------------------------------------------------
+class Metrics:
+    # result records sink (a Report listener), collecting metrics
+
+    def __init__(self):
+        self.values = {name: {} for name in FAMILIES}  # name: {labels: counter value or histogram [bucket counts..., sum, count]}
+        self.part = None
+        self.tester = None
+
+    def inc(self, name, labels, amount=1):
+        key = tuple(sorted(labels.items()))
+        family = self.values[name]
+        family[key] = family.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        if value is None:
+            return
+        buckets = FAMILIES[name][3]
+        key = tuple(sorted(labels.items()))
+        h = self.values[name].setdefault(key, [0] * len(buckets) + [0, 0])
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                h[i] += 1
+        h[-2] += value
+        h[-1] += 1
+
+    def __call__(self, r):
+        kind = r["record"]
+        if kind == "part":
+            self.part = r["part"]
+            self.tester = r["tester"]["device"]
+        elif self.part is None:
+            return  # session without a tested part (autodetection only), or chip already counted
+        elif kind == "powerup":
+            self.observe("ictester_phase_duration_seconds", {"phase": "dut_setup"}, r.get("setup_time"))
+            self.observe("ictester_vbus_volts", {"measurement": "idle"}, r["vbus"])
+            if r["result"] != "OK":
+                self.chip("overcurrent")
+        elif kind == "test":
+            self.inc("ictester_tests", {"part": self.part, "result": r["result"].lower()})
+            self.observe("ictester_phase_duration_seconds", {"phase": "upload"}, r.get("upload_time"))
+            self.observe("ictester_phase_duration_seconds", {"phase": "run"}, r["elapsed"])
+        elif kind == "summary":
+            self.observe("ictester_phase_duration_seconds", {"phase": "disconnect"}, r.get("disconnect_time"))
+            self.inc("ictester_sent_bytes", {"tester": self.tester}, r["transport"]["bytes_sent"])
+            self.inc("ictester_received_bytes", {"tester": self.tester}, r["transport"]["bytes_received"])
+            self.observe("ictester_vbus_volts", {"measurement": "min"}, r["vbus_min"])
+            for name, m in r["currents"].items():
+                # the measurement a point was selected by: Ivcc for *_ivcc, Ignd for *_ignd
+                ma = m["ivcc"] if name.endswith("ivcc") else m["ignd"]
+                self.observe("ictester_supply_current_amperes", {"part": self.part, "measurement": name}, ma / 1000)
+            self.chip(SESSION_RESULTS.get(r["exit_code"], "error"))
+        elif kind == "error":
+            self.chip("error")
+
+    def chip(self, result):
+        # chip is counted once per session, with the first conclusive result
+        self.inc("ictester_chips_tested", {"part": self.part, "tester": self.tester, "result": result})
+        self.part = None
+
+    # --------------------------------------------------------------------
+    def render(self, openmetrics=True):
+        lines = []
+        for name, (kind, unit, text, buckets) in FAMILIES.items():
+            family = self.values[name]
+            if not family:
+                continue
+            # Prometheus text format names counter families after their samples
+            family_name = name + "_total" if kind == "counter" and not openmetrics else name
+            lines.append(f"# TYPE {family_name} {kind}")
+            if unit and openmetrics:
+                lines.append(f"# UNIT {family_name} {unit}")
+            lines.append(f"# HELP {family_name} {_escape(text)}")
+            for labels, value in sorted(family.items()):
+                if kind == "counter":
+                    lines.append(f"{name}_total{_labels(labels)} {_num(value)}")
+                    continue
+                for bound, count in zip(buckets + [float("inf")], value[:-2] + [value[-1]]):
+                    le = "+Inf" if bound == float("inf") else repr(float(bound))
+                    lines.append(f"{name}_bucket{_labels(labels, [('le', le)])} {_num(count)}")
+                lines.append(f"{name}_sum{_labels(labels)} {_num(value[-2])}")
+                lines.append(f"{name}_count{_labels(labels)} {_num(value[-1])}")
+        if openmetrics:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def load(self, path):
+        with open(path) as f:
+            data = json.load(f)
+        for name, samples in data.items():
+            if name in self.values:
+                self.values[name] = {tuple(tuple(l) for l in labels): value for labels, value in samples}
+
+    def save(self, path):
+        data = {name: [[list(labels), value] for labels, value in family.items()] for name, family in self.values.items()}
+        _replace(path, json.dumps(data))
+
+    def write(self, path):
+        # update the state file and the textfile collector file
+        self.save(state_file(path))
+        _replace(path, self.render(openmetrics=False))
+
+
+# ------------------------------------------------------------------------
+def state_file(path):
+    return path + ".json"
+
+
+def _replace(path, text):
+    # readers (textfile collector, metrics server) never see a partially written file
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+# ------------------------------------------------------------------------
+def make_server(source, bind="127.0.0.1", port=PORT):
+    # HTTP server with metrics from source() at /metrics
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            openmetrics = "application/openmetrics-text" in self.headers.get("Accept", "")
+            try:
+                body = source().render(openmetrics).encode()
+            except (OSError, ValueError) as e:
+                self.send_error(500, str(e))
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", OPENMETRICS_TYPE if openmetrics else PROMETHEUS_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ThreadingHTTPServer((bind, port), Handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve ictester metrics over HTTP')
+    parser.add_argument('--bind', default="127.0.0.1", help='Address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=PORT, help=f'Port to listen on (default: {PORT})')
+    parser.add_argument('file', help='Metrics file, as given to ictester --metrics')
+    args = parser.parse_args()
+
+    def source():
+        m = Metrics()
+        if os.path.exists(state_file(args.file)):
+            m.load(state_file(args.file))
+        return m
+
+    try:
+        server = make_server(source, args.bind, args.port)
+    except OSError as e:
+        print(f"Could not start metrics server: {e}")
+        return 1
+    print(f"Serving metrics at http://{args.bind}:{args.port}/metrics")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
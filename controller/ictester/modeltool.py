@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+
+import sys
+import argparse
+from ictester.parts import catalog
+from ictester.test import TestLogic
+from ictester.netlist import NetlistError
+from ictester.sim import (Model, SimulationError, verify, expected)
+from ictester.faultsim import (coverage, fault_name, logic_tests)
+from ictester.compact import (compact, python_source)
+from ictester.atpg import generate as generate_tests
+from ictester.vectorfile import (VectorCodec, write, write_text)
+
+MAX_REPORTED = 10
+
+
+# ------------------------------------------------------------------------
+def parts_arg(parser, names):
+    if not names:
+        return [catalog[n] for n in sorted(catalog)]
+    try:
+        return [catalog[n.upper()] for n in names]
+    except KeyError as e:
+        parser.error(f"Unknown part: {e.args[0]}")
+
+
+# ------------------------------------------------------------------------
+def cmd_verify(args, parser):
+    failed = 0
+    for part in parts_arg(parser, args.parts):
+        if not logic_tests(part):
+            continue
+        if not part.netlist:
+            print(f"{part.name}: no model")
+            continue
+        try:
+            model = Model(part)
+            problems = [(t, verify(model, t)) for t in logic_tests(part)]
+        except (NetlistError, SimulationError) as e:
+            print(f"{part.name}: model error: {e}")
+            failed += 1
+            continue
+
+        count = sum(len(d) for t, d in problems)
+        if not count:
+            print(f"{part.name}: OK")
+            continue
+        failed += 1
+        print(f"{part.name}: {count} discrepancies")
+        for test, discrepancies in problems:
+            for d in discrepancies[:MAX_REPORTED]:
+                print(f"    {d}")
+            if len(discrepancies) > MAX_REPORTED:
+                print(f"    {test.name}: ... {len(discrepancies) - MAX_REPORTED} more")
+
+    return 1 if failed else 0
+
+
+# ------------------------------------------------------------------------
+def write_tests(part, tests, output, compress, what):
+    # write tests as Python test definitions or vector files (one for each test)
+    try:
+        if output.lower().endswith(".py"):
+            with open(output, "w") as f:
+                f.write(python_source(part, tests, what))
+            print(f"Test definitions written to {output}")
+            return True
+        for num, t in enumerate(tests, 1):
+            destination = output
+            if len(tests) > 1:
+                base, dot, ext = output.rpartition(".")
+                destination = f"{base}-{num}.{ext}" if dot else f"{output}-{num}"
+            codec = VectorCodec(part.pincount, part.vcc, t.inputs, t.outputs)
+            rows = ([v.input, v.output or None] for v in t.iter_vectors())
+            if destination.lower().endswith(".vec"):
+                count = write_text(destination, codec, rows)
+            else:
+                count = write(destination, codec, rows, compress)
+            print(f"{count} vectors written to {destination}")
+    except OSError as e:
+        print(f"Could not write {what} tests: {e}")
+        return False
+    return True
+
+
+# ------------------------------------------------------------------------
+def cmd_compact(args, parser):
+    parts = parts_arg(parser, args.parts)
+    if args.output and len(parts) != 1:
+        parser.error("--output requires a single part")
+
+    models = []
+    for part in parts:
+        if not logic_tests(part):
+            continue
+        if not part.netlist:
+            print(f"{part.name}: no model")
+            continue
+        try:
+            model = Model(part)
+            for t in logic_tests(part):
+                model.simulator(t.inputs, t.outputs, cfgnum=t.cfgnum)
+        except (NetlistError, SimulationError) as e:
+            print(f"{part.name}: model error: {e}")
+            continue
+        models.append(model)
+
+    failed = 0
+    for model, c in zip(models, compact(models, args.jobs)):
+        part = model.part
+        saved = 100 * (1 - c.compacted_run_time / c.run_time) if c.run_time else 0
+        print(f"{part.name}: {c.vector_count} -> {c.compacted_vector_count} vectors, "
+            f"estimated run time {c.run_time:.3f}s -> {c.compacted_run_time:.3f}s ({saved:.0f}% less), "
+            f"{c.detected}/{c.faults} faults detected -> {c.compacted_detected}/{c.faults}")
+        if c.gained:
+            print(f"    {c.gained} more faults detected: in merged tests, tests start with the DUT state left by the previous ones, not an unknown one")
+        if c.lost:
+            print(f"    {c.lost} faults are not detected by compacted tests")
+        if c.mismatches:
+            print(f"    {c.mismatches} expected outputs don't match the model: compacted tests would fail good parts")
+        if not c.valid:
+            print("    compaction rejected")
+            failed += 1
+            continue
+        tests = c.tests(part)
+        for t in tests:
+            print(f"    {t.name}: {t.vector_count} vectors")
+        if not args.output:
+            continue
+
+        if not write_tests(part, tests, args.output, args.compress, "compacted"):
+            return 1
+
+    return 1 if failed else 0
+
+
+# ------------------------------------------------------------------------
+def cmd_atpg(args, parser):
+    part, = parts_arg(parser, [args.part])
+    if not part.netlist:
+        parser.error(f"{part.name} has no model")
+    try:
+        model = Model(part)
+        gen = generate_tests(model, args.jobs)
+    except (NetlistError, SimulationError) as e:
+        print(f"{part.name}: model error: {e}")
+        return 1
+
+    faults = len(gen.faults)
+    ratio = 100 * len(gen.detected) / faults if faults else 100
+    print(f"{part.name}: {len(gen.detected)}/{faults} faults detected ({ratio:.1f}%) with {gen.vector_count} vectors")
+    for t in gen.tests:
+        print(f"    {t.name}: {t.vector_count} vectors")
+    undetected = [(n, f) for n, f in enumerate(gen.faults) if n not in gen.detected]
+    shown = undetected if args.verbose else undetected[:MAX_REPORTED]
+    for n, fault in shown:
+        # aborted: search limits reached, others are redundant or need longer sequences
+        label = "Aborted" if n in gen.aborted else "Undetected"
+        print(f"    {label}: {fault_name(model, fault)}")
+    if len(undetected) > len(shown):
+        print(f"    Undetected: ... {len(undetected) - len(shown)} more")
+
+    if args.output and gen.tests:
+        if not write_tests(part, gen.tests, args.output, args.compress, "generated"):
+            return 1
+    return 0
+
+
+# ------------------------------------------------------------------------
+def cmd_generate(args, parser):
+    part, = parts_arg(parser, [args.part])
+    if not part.netlist:
+        parser.error(f"{part.name} has no model")
+    try:
+        test = part.tests[args.test-1]
+    except IndexError:
+        parser.error(f"{part.name} has no test {args.test}")
+    if not isinstance(test, TestLogic):
+        parser.error(f"{part.name} test {args.test} is not a logic test")
+
+    try:
+        rows = expected(Model(part), test)
+        codec = VectorCodec(part.pincount, part.vcc, test.inputs, test.outputs)
+        if args.destination.lower().endswith(".vec"):
+            count = write_text(args.destination, codec, rows)
+        else:
+            count = write(args.destination, codec, rows, args.compress)
+    except (NetlistError, SimulationError, OSError) as e:
+        print(f"Generation failed: {e}")
+        return 1
+
+    print(f"{count} vectors written to {args.destination}")
+    return 0
+
+
+# ------------------------------------------------------------------------
+def cmd_coverage(args, parser):
+    models = []
+    for part in parts_arg(parser, args.parts):
+        if not logic_tests(part):
+            continue
+        if not part.netlist:
+            print(f"{part.name}: no model")
+            continue
+        try:
+            model = Model(part)
+            for t in logic_tests(part):
+                model.simulator(t.inputs, t.outputs, cfgnum=t.cfgnum)
+        except (NetlistError, SimulationError) as e:
+            print(f"{part.name}: model error: {e}")
+            continue
+        models.append(model)
+
+    for cov in coverage(models, args.jobs):
+        print(f"{cov.model.part.name}: {len(cov.total)}/{len(cov.faults)} faults detected ({100 * cov.ratio:.1f}%)")
+        for num, (test, new) in enumerate(zip(cov.tests, cov.new())):
+            print(f"    {test.name}: {100 * cov.test_ratio(num):.1f}%, {len(new)} not detected by earlier tests")
+        if cov.useless:
+            print(f"    Tests adding no coverage: {', '.join(t.name for t in cov.useless)}")
+        for label, faults in (("Potentially detected", cov.potentially_detected), ("Undetected", cov.undetected)):
+            shown = faults if args.verbose else faults[:MAX_REPORTED]
+            for fault in shown:
+                print(f"    {label}: {fault_name(cov.model, fault)}")
+            if len(faults) > len(shown):
+                print(f"    {label}: ... {len(faults) - len(shown)} more")
+
+    return 0
+
+
+# ------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description='Simulate ictester part models')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('verify', help='Check test vectors against part models')
+    p.add_argument('parts', nargs='*', help='Part symbols (default: all parts)')
+    p.set_defaults(func=cmd_verify)
+
+    p = sub.add_parser('coverage', help='Report stuck-at fault coverage of part tests')
+    p.add_argument('-j', '--jobs', type=int, help='Number of simulation processes (default: number of CPUs)')
+    p.add_argument('-v', '--verbose', action="store_true", help='List all undetected faults')
+    p.add_argument('parts', nargs='*', help='Part symbols (default: all parts)')
+    p.set_defaults(func=cmd_coverage)
+
+    p = sub.add_parser('compact', help='Minimize part test vectors, keeping stuck-at fault coverage')
+    p.add_argument('-j', '--jobs', type=int, help='Number of simulation processes (default: number of CPUs)')
+    p.add_argument('-o', '--output', help='Write compacted tests: Python test definitions (.py), or vector files (.vec for text files, binary otherwise)')
+    p.add_argument('-z', '--compress', action="store_true", help='Compress vector data (binary files only)')
+    p.add_argument('parts', nargs='*', help='Part symbols (default: all parts)')
+    p.set_defaults(func=cmd_compact)
+
+    p = sub.add_parser('atpg', help='Generate tests for stuck-at faults from the part model')
+    p.add_argument('-j', '--jobs', type=int, help='Number of test generation processes (default: number of CPUs)')
+    p.add_argument('-v', '--verbose', action="store_true", help='List all undetected faults')
+    p.add_argument('-o', '--output', help='Write generated tests: Python test definitions (.py), or vector files (.vec for text files, binary otherwise)')
+    p.add_argument('-z', '--compress', action="store_true", help='Compress vector data (binary files only)')
+    p.add_argument('part', help='Part symbol')
+    p.set_defaults(func=cmd_atpg)
+
+    p = sub.add_parser('generate', help='Write test vectors with outputs computed by the part model')
+    p.add_argument('-t', '--test', type=int, default=1, help='Part test providing input vectors (default: 1)')
+    p.add_argument('-z', '--compress', action="store_true", help='Compress vector data (binary files only)')
+    p.add_argument('part', help='Part symbol')
+    p.add_argument('destination', help='Destination file: .vec for a text file, binary vector file otherwise')
+    p.set_defaults(func=cmd_generate)
+
+    args = parser.parse_args()
+    return args.func(args, parser)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
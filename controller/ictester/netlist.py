@@ -0,0 +1,186 @@
+import re
+
+'''
+Gate-level part models.
+
+Netlist is a list of assignments, one per line:
+
+    1Y = NAND(1A, 1B)
+    Q = DFF(CLK, D, NOT(~PRE), NOT(~CLR))
+    {n}Y = NOT({n}A)  for n in 1 2 3 4 5 6
+
+Nets are part pins (by pin name, or by pin number as @N) or internal nets (any other name).
+Expressions may be nested. '0' and '1' are constants. '#' starts a comment.
+'for VAR in VALUES...' repeats the line for each value, substituting {VAR}.
+
+Combinational elements:
+    AND, OR, NAND, NOR, XOR, XNOR (2+ inputs), NOT, BUF
+    MUX(s, a, b) - a if s=0, b if s=1
+    TRI(en, d) - 3-state output: d if en=1, otherwise pulled high
+                 (or low, if the pin has no tester pull-up in the test configuration)
+
+Storage elements (assignment target is the element output):
+    DFF(clk, d, [set, [reset]]) - rising edge D flip-flop
+    JKFF(clk, j, k, [set, [reset]]) - rising edge J-K flip-flop
+    LATCH(en, d, [set, [reset]]) - transparent while en=1
+Set and reset are asynchronous and active high, set takes precedence over reset.
+Falling edge triggered elements use NOT(clk).
+'''
+
+GATES = {
+    "AND": (2, None),
+    "OR": (2, None),
+    "NAND": (2, None),
+    "NOR": (2, None),
+    "XOR": (2, None),
+    "XNOR": (2, None),
+    "NOT": (1, 1),
+    "BUF": (1, 1),
+    "MUX": (3, 3),
+    "TRI": (2, 2),
+}
+
+STORAGE = {
+    "DFF": (2, 4),
+    "JKFF": (3, 5),
+    "LATCH": (2, 4),
+}
+
+CONSTANTS = ("0", "1")
+
+TOKEN = re.compile(r"\s*([(),=]|[^\s(),=]+)")
+
+
+# ------------------------------------------------------------------------
+class NetlistError(ValueError):
+    pass
+
+
+# ------------------------------------------------------------------------
+class Element:
+    def __init__(self, op, output, inputs):
+        self.op = op
+        self.output = output
+        self.inputs = inputs
+
+    @property
+    def storage(self):
+        return self.op in STORAGE
+
+    def __str__(self):
+        return f"{self.output} = {self.op}({', '.join(map(str, self.inputs))})"
+
+
+# ------------------------------------------------------------------------
+def _expand(text):
+    for num, line in enumerate(text.splitlines(), 1):
+        line = line.split("#")[0].strip()
+        if not line:
+            continue
+        m = re.fullmatch(r"(.*?)\s+for\s+(\w+)\s+in\s+(.+)", line)
+        if m:
+            for value in m[3].split():
+                yield num, m[1].replace("{" + m[2] + "}", value)
+        else:
+            yield num, line
+
+
+# ------------------------------------------------------------------------
+class Netlist:
+    def __init__(self, text):
+        self.text = text
+        self.elements = []
+        self._tmp = 0
+        for num, line in _expand(text):
+            try:
+                self._parse_line(line)
+            except NetlistError as e:
+                raise NetlistError(f"line {num}: {e}: {line}")
+
+    def _parse_line(self, line):
+        tokens = TOKEN.findall(line)
+        if len(tokens) < 3 or tokens[1] != "=":
+            raise NetlistError("expected: net = expression")
+        target = tokens[0]
+        pos, expr = self._parse_expr(tokens, 2)
+        if pos != len(tokens):
+            raise NetlistError("unexpected text after expression")
+        if isinstance(expr, tuple):
+            op, args = expr
+            self.elements.append(Element(op, target, [self._flatten(a) for a in args]))
+        else:
+            self.elements.append(Element("BUF", target, [expr]))
+
+    def _parse_expr(self, tokens, pos):
+        if pos >= len(tokens) or tokens[pos] in "(),=":
+            raise NetlistError("expected net name or element")
+        name = tokens[pos]
+        if pos + 1 < len(tokens) and tokens[pos + 1] == "(":
+            if name not in GATES and name not in STORAGE:
+                raise NetlistError(f"unknown element {name}")
+            args = []
+            pos += 2
+            while True:
+                pos, arg = self._parse_expr(tokens, pos)
+                args.append(arg)
+                if pos >= len(tokens):
+                    raise NetlistError("missing ')'")
+                if tokens[pos] == ")":
+                    pos += 1
+                    break
+                if tokens[pos] != ",":
+                    raise NetlistError("expected ',' or ')'")
+                pos += 1
+            low, high = GATES.get(name) or STORAGE.get(name)
+            if len(args) < low or (high is not None and len(args) > high):
+                raise NetlistError(f"wrong number of {name} inputs")
+            return pos, (name, args)
+        return pos + 1, name
+
+    def _flatten(self, expr):
+        # nested expressions become internal nets
+        if not isinstance(expr, tuple):
+            return expr
+        op, args = expr
+        if op in STORAGE:
+            raise NetlistError(f"{op} can't be used inside an expression")
+        self._tmp += 1
+        net = f"_{self._tmp}"
+        self.elements.append(Element(op, net, [self._flatten(a) for a in args]))
+        return net
+
+    def bind(self, part):
+        # elements with part pin references replaced by pin numbers
+        names = {}
+        for num, pin in part.pins.items():
+            names.setdefault(pin.name, []).append(num)
+
+        def resolve(net):
+            if net in CONSTANTS:
+                return net
+            if net.startswith("@") and net[1:].isdigit():
+                num = int(net[1:])
+                if num not in part.pins:
+                    raise NetlistError(f"{part.name} has no pin {num}")
+                return num
+            if net in names:
+                if len(names[net]) > 1:
+                    raise NetlistError(f"{part.name} pin name {net} is ambiguous, use pin number")
+                return names[net][0]
+            return net
+
+        elements = [Element(e.op, resolve(e.output), [resolve(i) for i in e.inputs]) for e in self.elements]
+
+        driven = {}
+        for e in elements:
+            if e.output in CONSTANTS:
+                raise NetlistError(f"constant can't be assigned: {e}")
+            if e.output in driven:
+                raise NetlistError(f"net {e.output} has more than one driver")
+            driven[e.output] = e
+        for e in elements:
+            for i in e.inputs:
+                if isinstance(i, str) and i not in CONSTANTS and i not in driven:
+                    raise NetlistError(f"net {i} is not driven and it's not a {part.name} pin")
+
+        return elements
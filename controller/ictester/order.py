@@ -0,0 +1,153 @@
+import os
+import json
+import logging
+from ictester.test import TestLogic
+from ictester.timing import Calibration
+
+'''
+Test ordering.
+
+Tests are run starting with the ones most likely to find a defect in the shortest time:
+in the order of decreasing failure probability per second of run time.
+Failure probability of a test is estimated from its failure history for the part
+(number of runs and failures, with a prior for tests without history), run time
+is estimated with the run time model, calibrated with measured run times (see timing.py).
+
+Tests that check DUT state left by the test run before them (found with the part model:
+expected outputs unknown to the model, when the test starts with unknown DUT state)
+are kept together with that test. Parts without a model keep their declaration order.
+Tests using the same pin configuration are run one after another, so that the tester
+doesn't need to reconfigure its analog switches back and forth.
+'''
+
+HISTORY_FILE = os.path.join(os.path.expanduser("~"), ".ictester", "history.json")
+PRIOR_RUNS = 2  # failure probability prior: 1 failure in 2 runs
+PRIOR_FAILURES = 1
+MAX_SAMPLES = 16  # run times kept for each test, for run time model calibration
+
+logger = logging.getLogger('ictester')
+
+
+# ------------------------------------------------------------------------
+class History:
+    # {part name: {test name: {"runs": N, "failures": N, "loops": N, "time": seconds,
+    #     "samples": [[loops, seconds, imeasure, trace], ...]}}}
+
+    def __init__(self, path=HISTORY_FILE):
+        self.path = path
+        if path is None:
+            self.data = {}
+            return
+        try:
+            with open(path) as f:
+                self.data = json.load(f)
+        except FileNotFoundError:
+            self.data = {}
+
+    def stats(self, part, test):
+        return self.data.get(part.name, {}).get(test.name)
+
+    def samples(self, part, test):
+        s = self.stats(part, test)
+        return s.get("samples", []) if s else []
+
+    def record(self, part, test, loops, failed, imeasure=True, trace=False):
+        s = self.data.setdefault(part.name, {}).setdefault(test.name, {"runs": 0, "failures": 0, "loops": 0, "time": 0})
+        s["runs"] += 1
+        s["failures"] += int(failed)
+        # failing tests stop early, only full runs count for run time
+        if not failed:
+            s["loops"] += loops
+            s["time"] += test.elapsed
+            samples = s.setdefault("samples", [])
+            samples.append([loops, test.elapsed, imeasure, trace])
+            del samples[:-MAX_SAMPLES]
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.data, f, indent=1)
+        os.replace(tmp, self.path)
+
+
+# ------------------------------------------------------------------------
+def failure_probability(history, part, test):
+    s = history.stats(part, test) or {"runs": 0, "failures": 0}
+    return (s["failures"] + PRIOR_FAILURES) / (s["runs"] + PRIOR_RUNS)
+
+
+def test_time(calibration, test, loops):
+    return calibration.estimate(test).time(loops)
+
+
+# ------------------------------------------------------------------------
+def dependent_tests(part):
+    # tests that need the DUT state left by the test before them, None if unknown
+    if not part.netlist:
+        return None
+    from ictester.sim import (Model, verify)
+    model = Model(part)
+    if not model.sequential:
+        return set()
+    return {
+        test for test in part.tests
+        if isinstance(test, TestLogic) and any(d.model is None for d in verify(model, test))
+    }
+
+
+def groups(tests, dependent):
+    # tests split into groups that are run together, in declaration order
+    result = []
+    for test in tests:
+        if result and test in dependent:
+            result[-1].append(test)
+        else:
+            result.append([test])
+    return result
+
+
+def config_blocks(groups):
+    # groups using the same pin configuration moved together, blocks in the order of their first group
+    blocks = {}
+    for group in groups:
+        blocks.setdefault(group[0].cfgnum, []).append(group)
+    return [group for block in blocks.values() for group in block]
+
+
+def config(part, tests):
+    # declaration order, with tests using the same pin configuration moved together
+    # where the part model shows that no test depends on the one run before it
+    dependent = dependent_tests(part)
+    if dependent is None:
+        logger.log(20, "Test order: %s has no model, keeping declaration order", part.name)
+        return list(tests)
+    return [test for group in config_blocks(groups(tests, dependent)) for test in group]
+
+
+# ------------------------------------------------------------------------
+def order(part, tests, history, loops=None):
+    # tests reordered for the fastest defect detection
+    dependent = dependent_tests(part)
+    if dependent is None:
+        logger.log(20, "Test order: %s has no model, keeping declaration order", part.name)
+        return list(tests)
+
+    calibration = Calibration(history, part, tests)
+    result = groups(tests, dependent)
+    # group starting with a dependent test relies on the power-up state and has to run first
+    pinned = result[:1] if result and result[0][0] in dependent else []
+    scored = []
+    for group in result[len(pinned):]:
+        passing = 1
+        duration = 0
+        for test in group:
+            passing *= 1 - failure_probability(history, part, test)
+            duration += test_time(calibration, test, loops or test.loops)
+        score = (1 - passing) / duration if duration else float("inf")
+        scored.append((score, group))
+        logger.log(20, "Test order: %s: P(fail) = %.3f, time = %.3fs, score = %.3f",
+            " + ".join(t.name for t in group), 1 - passing, duration, score)
+
+    scored.sort(key=lambda x: x[0], reverse=True)
+    return [test for group in config_blocks(pinned + [g for s, g in scored]) for test in group]
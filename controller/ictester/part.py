@@ -1,8 +1,12 @@
+import copy
 import inspect
 import logging
+import threading
 from enum import Enum
 from ictester.command import CmdType
 from ictester.response import (Response, RespType)
+from ictester.trace import (VBUS_TO_V, SHUNT_TO_MA)
+from ictester.tester import DEFAULT_MAX_VECTORS
 from struct import (iter_unpack, unpack)
 
 logger = logging.getLogger('ictester')
@@ -85,9 +89,18 @@ class Part:
     name = None
     tests = None
     missing_tests = None
+    max_vectors = DEFAULT_MAX_VECTORS
+    # gate-level model (see netlist.py), used to verify test vectors and to simulate faults
+    netlist = None
+    # test profiles (see profiles.py), in addition to the default ones
+    profiles = {}
+    # test vectors are compiled by the first copy(), one part at a time
+    _copy_lock = threading.Lock()
 
     def __init__(self):
         self.imeasurements = []
+        self.relay_switches = 0  # test setups that reconfigured the tester's analog switches
+        self.relay_skips = 0  # test setups with the pin configuration already active
         self.pins = {}
         self.pins.update(self.package_pins)
         self.pins.update(self.pin_cfg)
@@ -95,6 +108,16 @@ class Part:
         for t in self.tests:
             t.attach_part(self)
 
+    def copy(self):
+        # part instance for a single test session, with test copies sharing compiled vectors with this part's tests
+        part = copy.copy(self)
+        part.imeasurements = []
+        with self._copy_lock:
+            part.tests = [t.copy() for t in self.tests]
+        for t in part.tests:
+            t.attach_part(part)
+        return part
+
     @property
     def package_name(self):
         return f"{self.package_type.name}{self.pincount}"
@@ -130,7 +153,14 @@ class Part:
 
         return bytes(data)
 
-    def setup(self, tr):
+    def setup(self, tr, tester=None):
+        if tester:
+            self.max_vectors = tester.max_vectors(self.pincount)
+        self.relay_switches = 0
+        self.relay_skips = 0
+        # parts sharing a test list (subclasses) all attach its tests, make sure they belong to the tested one
+        for t in self.tests:
+            t.attach_part(self)
         logger.log(20, "---- DUT SETUP ------------------------------------")
         data = bytes([CmdType.DUT_SETUP.value]) + bytes(self)
         tr.send(data)
@@ -148,11 +178,10 @@ class Part:
         data = bytes([CmdType.DUT_DISCONNECT.value])
         tr.send(data)
         resp = Response(tr)
-        self.vbus = unpack("<h", resp.payload[0:2])[0] * 1.6 / 1000
+        self.vbus = unpack("<h", resp.payload[0:2])[0] * VBUS_TO_V
         for x in iter_unpack("<hh", resp.payload[2:]):
-            shunt_to_ma = 1000 * 0.0000025 / 0.200  # 1000 * 2.5uV / 200mohm
-            ivcc = x[0] * shunt_to_ma
-            ignd = x[1] * shunt_to_ma
+            ivcc = x[0] * SHUNT_TO_MA
+            ignd = x[1] * SHUNT_TO_MA
             idelta = abs(ivcc-ignd)
             self.imeasurements.append([ivcc, ignd, idelta])
 
@@ -1,5 +1,6 @@
 from ictester.part import (PackageDIP16_rotated, Pin, PinType)
 from ictester.test import (TestDRAM, DRAMType, DRAMTestType)
+from ictester.profiles import Profile
 
 class Part4164(PackageDIP16_rotated):
     name = "4164"
@@ -26,4 +27,10 @@ class Part4164(PackageDIP16_rotated):
         TestDRAM("MARCH C- Read+Write mode", DRAMType.DRAM_4164, DRAMTestType.MARCH_C_MINUS_RW),
         TestDRAM("MARCH C- Page access mode", DRAMType.DRAM_4164, DRAMTestType.MARCH_C_MINUS_PAGE),
         TestDRAM("CAS-Dout delay (use oscilloscope)", DRAMType.DRAM_4164, DRAMTestType.SPEED_CHECK),
+        TestDRAM("Access time (speed grade)", DRAMType.DRAM_4164, DRAMTestType.SPEED_BIN),
     ]
+
+    profiles = {
+        # a single march test finds most defective chips, other access modes are checked when qualifying
+        "screen": Profile("screen", imeasure=False, test_names=["MARCH C- Read+Write mode"]),
+    }
@@ -20,6 +20,10 @@ class Part7401(PackageDIP14):
         13: Pin("4Y", PinType.OC),
     }
 
+    netlist = """
+        {n}Y = NAND({n}A, {n}B) for n in 1 2 3 4
+    """
+
     tests = [
         TestLogic("Complete logic",
             read_delay_us=0.6,
@@ -20,6 +20,10 @@ class Part7402(PackageDIP14):
         13: Pin("4Y", PinType.OUT),
     }
 
+    netlist = """
+        {n}Y = NOR({n}A, {n}B) for n in 1 2 3 4
+    """
+
     tests = [
         TestLogic("Complete logic",
             inputs=[2, 3, 5, 6, 8, 9, 11, 12],
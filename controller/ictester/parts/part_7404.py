@@ -20,6 +20,10 @@ class Part7404(PackageDIP14):
         13: Pin("4A", PinType.IN),
     }
 
+    netlist = """
+        {n}Y = NOT({n}A) for n in 1 2 3 4 5 6
+    """
+
     tests = [
         TestLogic("Complete logic",
             inputs=[1, 3, 5, 9, 11, 13],
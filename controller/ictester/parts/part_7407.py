@@ -6,6 +6,10 @@ class Part7407(Part7405):
     name = "7407"
     desc = "Hex Buffers/Drivers With Open-Collector High-Voltage Outputs"
 
+    netlist = """
+        {n}Y = BUF({n}A) for n in 1 2 3 4 5 6
+    """
+
     tests = [
         TestLogic("Complete logic",
             inputs=[1, 3, 5, 9, 11, 13],
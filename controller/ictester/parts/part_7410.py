@@ -20,6 +20,10 @@ class Part7410(PackageDIP14):
         13: Pin("1C", PinType.IN),
     }
 
+    netlist = """
+        {n}Y = NAND({n}A, {n}B, {n}C) for n in 1 2 3
+    """
+
     tests = [
         TestLogic("Complete logic",
             inputs=[1, 2, 13, 3, 4, 5, 9, 10, 11],
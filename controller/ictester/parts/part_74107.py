@@ -19,6 +19,11 @@ class Part74107(PackageDIP14):
         13: Pin("~1CLR", PinType.IN),
     }
 
+    netlist = """
+        {n}Q = JKFF(NOT({n}CLK), {n}J, {n}K, 0, NOT(~{n}CLR)) for n in 1 2
+        ~{n}Q = NOT({n}Q) for n in 1 2
+    """
+
     test_all = TestLogic("Complete logic",
         inputs=[1, 4, 12, 13,  8, 11, 9, 10],
         outputs=[3, 2,  5, 6],
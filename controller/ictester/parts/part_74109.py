@@ -21,6 +21,11 @@ class Part74109(PackageDIP16):
         15: Pin("~2CLR", PinType.IN),
     }
 
+    netlist = """
+        {n}Q = JKFF({n}CLK, {n}J, NOT(~{n}K), NOT(~{n}PRE), NOT(~{n}CLR)) for n in 1 2
+        ~{n}Q = NOT({n}Q) for n in 1 2
+    """
+
     test_all = TestLogic("Complete logic",
         inputs=[4, 5, 1, 2, 3,  12, 11, 15, 14, 13],
         outputs=[6, 7,  10, 9],
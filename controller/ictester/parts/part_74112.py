@@ -21,6 +21,11 @@ class Part74112(PackageDIP16):
         15: Pin("~1CLR", PinType.IN),
     }
 
+    netlist = """
+        {n}Q = JKFF(NOT({n}CLK), {n}J, {n}K, NOT(~{n}PRE), NOT(~{n}CLR)) for n in 1 2
+        ~{n}Q = NOT({n}Q) for n in 1 2
+    """
+
     test_all = TestLogic("Complete logic",
         inputs=[1, 4, 15, 3, 2,  13, 10, 14, 11, 12],
         outputs=[5, 6,  9, 7],
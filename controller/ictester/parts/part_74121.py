@@ -23,6 +23,7 @@ class Part74121(PackageDIP14):
     tests = [
         TestUnivib("No trigger", UnivibType.UNI_74121, UnivibTestType.NO_TRIGGER),
         TestUnivib("Trigger", UnivibType.UNI_74121, UnivibTestType.TRIGGER),
+        TestUnivib("Pulse width", UnivibType.UNI_74121, UnivibTestType.PULSE_WIDTH, limits=(500, 1000)),
     ]
 
 
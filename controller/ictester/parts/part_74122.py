@@ -23,7 +23,9 @@ class Part74122(PackageDIP14):
     tests = [
         TestUnivib("No trigger", UnivibType.UNI_74122, UnivibTestType.NO_TRIGGER),
         TestUnivib("Trigger", UnivibType.UNI_74122, UnivibTestType.TRIGGER),
+        TestUnivib("Pulse width", UnivibType.UNI_74122, UnivibTestType.PULSE_WIDTH, limits=(1100, 2000)),
         TestUnivib("Retrigger", UnivibType.UNI_74122, UnivibTestType.RETRIGGER),
+        TestUnivib("Retriggered pulse width", UnivibType.UNI_74122, UnivibTestType.RETRIGGER_PULSE_WIDTH, limits=(1100, 2000)),
         TestUnivib("Clear", UnivibType.UNI_74122, UnivibTestType.CLEAR),
     ]
 
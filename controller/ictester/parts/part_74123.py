@@ -26,12 +26,16 @@ class Part74123(PackageDIP16):
         TestUnivib("Univibrator 1, no trigger", UnivibType.UNI_74123_1, UnivibTestType.NO_TRIGGER),
         TestUnivib("Univibrator 1, trigger", UnivibType.UNI_74123_1, UnivibTestType.TRIGGER),
         TestUnivib("Univibrator 1, retrigger", UnivibType.UNI_74123_1, UnivibTestType.RETRIGGER),
+        TestUnivib("Univibrator 1, pulse width", UnivibType.UNI_74123_1, UnivibTestType.PULSE_WIDTH, limits=(1000, 2000)),
+        TestUnivib("Univibrator 1, retriggered pulse width", UnivibType.UNI_74123_1, UnivibTestType.RETRIGGER_PULSE_WIDTH, limits=(1000, 2000)),
         TestUnivib("Univibrator 1, clear-trigger", UnivibType.UNI_74123_1, UnivibTestType.CLEAR_TRIGGER),
         TestUnivib("Univibrator 1, clear", UnivibType.UNI_74123_1, UnivibTestType.CLEAR),
         TestUnivib("Univibrator 1, no cross-trigger", UnivibType.UNI_74123_1, UnivibTestType.NO_CROSS_TRIGGER),
         TestUnivib("Univibrator 2, no trigger", UnivibType.UNI_74123_2, UnivibTestType.NO_TRIGGER),
         TestUnivib("Univibrator 2, trigger", UnivibType.UNI_74123_2, UnivibTestType.TRIGGER),
         TestUnivib("Univibrator 2, retrigger", UnivibType.UNI_74123_2, UnivibTestType.RETRIGGER),
+        TestUnivib("Univibrator 2, pulse width", UnivibType.UNI_74123_2, UnivibTestType.PULSE_WIDTH, limits=(1000, 2000)),
+        TestUnivib("Univibrator 2, retriggered pulse width", UnivibType.UNI_74123_2, UnivibTestType.RETRIGGER_PULSE_WIDTH, limits=(1000, 2000)),
         TestUnivib("Univibrator 2, clear-trigger", UnivibType.UNI_74123_2, UnivibTestType.CLEAR_TRIGGER),
         TestUnivib("Univibrator 2, clear", UnivibType.UNI_74123_2, UnivibTestType.CLEAR),
         TestUnivib("Univibrator 2, no cross-trigger", UnivibType.UNI_74123_2, UnivibTestType.NO_CROSS_TRIGGER),
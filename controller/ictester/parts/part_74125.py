@@ -22,6 +22,10 @@ class Part74125(PackageDIP14):
         13: Pin("~4G", PinType.IN),
     }
 
+    netlist = """
+        {n}Y = TRI(NOT(~{n}G), {n}A) for n in 1 2 3 4
+    """
+
     test_high = TestLogic("Switching outputs, ext. pulled high",
         cfgnum=1,
         loops=512,
@@ -20,6 +20,10 @@ class Part7413(PackageDIP14):
         13: Pin("2D", PinType.IN),
     }
 
+    netlist = """
+        {n}Y = NAND({n}A, {n}B, {n}C, {n}D) for n in 1 2
+    """
+
     tests = [
         TestLogic("Complete logic",
             inputs=[1, 2, 4, 5, 13, 12, 10, 9],
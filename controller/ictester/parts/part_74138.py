@@ -22,6 +22,18 @@ class Part74138(PackageDIP16):
         15: Pin("Y0", PinType.OUT),
     }
 
+    netlist = """
+        en = AND(G1, NOT(~G2A), NOT(~G2B))
+        Y0 = NAND(en, NOT(C), NOT(B), NOT(A))
+        Y1 = NAND(en, NOT(C), NOT(B), A)
+        Y2 = NAND(en, NOT(C), B, NOT(A))
+        Y3 = NAND(en, NOT(C), B, A)
+        Y4 = NAND(en, C, NOT(B), NOT(A))
+        Y5 = NAND(en, C, NOT(B), A)
+        Y6 = NAND(en, C, B, NOT(A))
+        Y7 = NAND(en, C, B, A)
+    """
+
     test_enabled = TestLogic("Enabled",
         inputs=[3, 2, 1,  6, 4, 5],
         outputs=[7, 9, 10, 11, 12, 13, 14, 15],
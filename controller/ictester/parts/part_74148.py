@@ -21,6 +21,16 @@ class Part74148(PackageDIP16):
         15: Pin("E0", PinType.OUT),
     }
 
+    netlist = """
+        # inputs 0-7: @10 @11 @12 @13 @1 @2 @3 @4
+        en = NOT(EI)
+        GS = NAND(en, NAND(@10, @11, @12, @13, @1, @2, @3, @4))
+        E0 = NAND(en, @10, @11, @12, @13, @1, @2, @3, @4)
+        A2 = NAND(en, NAND(@1, @2, @3, @4))
+        A1 = NAND(en, OR(NOT(@4), NOT(@3), AND(@1, @2, OR(NOT(@13), NOT(@12)))))
+        A0 = NAND(en, OR(NOT(@4), AND(NOT(@2), @3), AND(NOT(@13), @1, @3), AND(NOT(@11), @12, @1, @3)))
+    """
+
     test_all = TestLogic("Complete logic",
         inputs=[5,  10, 11, 12, 13, 1, 2, 3, 4],
         outputs=[6, 7, 9, 14, 15],
@@ -30,6 +30,10 @@ class Part74150(PackageDIP24):
         23: Pin("E8", PinType.IN),
     }
 
+    netlist = """
+        W = NAND(NOT(~G), MUX(D, MUX(C, MUX(B, MUX(A, E0, E1), MUX(A, E2, E3)), MUX(B, MUX(A, E4, E5), MUX(A, E6, E7))), MUX(C, MUX(B, MUX(A, E8, E9), MUX(A, E10, E11)), MUX(B, MUX(A, E12, E13), MUX(A, E14, E15)))))
+    """
+
     default_inputs = [11, 13, 14, 15,  9,  16, 17, 18, 19, 20, 21, 22, 23, 1, 2, 3, 4, 5, 6, 7, 8]
     default_outputs = [10]
 
@@ -22,6 +22,11 @@ class Part74151(PackageDIP16):
         15: Pin("D4", PinType.IN),
     }
 
+    netlist = """
+        Y = AND(NOT(~G), MUX(C, MUX(B, MUX(A, D0, D1), MUX(A, D2, D3)), MUX(B, MUX(A, D4, D5), MUX(A, D6, D7))))
+        W = NOT(Y)
+    """
+
     default_inputs = [12, 13, 14, 15, 1, 2, 3, 4,  9, 10, 11,  7]
     default_outputs = [5, 6]
 
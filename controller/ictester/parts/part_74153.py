@@ -22,6 +22,11 @@ class Part74153(PackageDIP16):
         15: Pin("~2G", PinType.IN),
     }
 
+    netlist = """
+        1Y = AND(NOT(~1G), MUX(B, MUX(A, 1C0, 1C1), MUX(A, 1C2, 1C3)))
+        2Y = AND(NOT(~2G), MUX(B, MUX(A, 2C0, 2C1), MUX(A, 2C2, 2C3)))
+    """
+
     default_inputs = [2, 14,  1,  3, 4, 5, 6,  15,  13, 12, 11, 10]
     default_outputs = [7, 9]
 
@@ -30,6 +30,26 @@ class Part74154(PackageDIP24):
         23: Pin("A", PinType.IN),
     }
 
+    netlist = """
+        en = NOR(G1, G2)
+        O0 = NAND(en, NOT(D), NOT(C), NOT(B), NOT(A))
+        O1 = NAND(en, NOT(D), NOT(C), NOT(B), A)
+        O2 = NAND(en, NOT(D), NOT(C), B, NOT(A))
+        O3 = NAND(en, NOT(D), NOT(C), B, A)
+        O4 = NAND(en, NOT(D), C, NOT(B), NOT(A))
+        O5 = NAND(en, NOT(D), C, NOT(B), A)
+        O6 = NAND(en, NOT(D), C, B, NOT(A))
+        O7 = NAND(en, NOT(D), C, B, A)
+        O8 = NAND(en, D, NOT(C), NOT(B), NOT(A))
+        O9 = NAND(en, D, NOT(C), NOT(B), A)
+        O10 = NAND(en, D, NOT(C), B, NOT(A))
+        O11 = NAND(en, D, NOT(C), B, A)
+        O12 = NAND(en, D, C, NOT(B), NOT(A))
+        O13 = NAND(en, D, C, NOT(B), A)
+        O14 = NAND(en, D, C, B, NOT(A))
+        O15 = NAND(en, D, C, B, A)
+    """
+
     default_inputs = [18, 19,  20, 21, 22, 23]
     default_outputs = [17, 16, 15, 14, 13, 11, 10, 9, 8, 7, 6, 5, 4, 3, 2, 1]
 
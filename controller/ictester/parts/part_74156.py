@@ -22,6 +22,19 @@ class Part74156(PackageDIP16):
         15: Pin("~2C", PinType.IN),
     }
 
+    netlist = """
+        en1 = AND(1C, NOT(~1G))
+        en2 = NOR(~2C, ~2G)
+        1Y0 = NAND(en1, NOT(B), NOT(A))
+        1Y1 = NAND(en1, NOT(B), A)
+        1Y2 = NAND(en1, B, NOT(A))
+        1Y3 = NAND(en1, B, A)
+        2Y0 = NAND(en2, NOT(B), NOT(A))
+        2Y1 = NAND(en2, NOT(B), A)
+        2Y2 = NAND(en2, B, NOT(A))
+        2Y3 = NAND(en2, B, A)
+    """
+
     # 74156 OC outputs are too slow to run full-speed with 5k pull-ups
     read_delay_us = 0.4
     default_inputs = [3, 13,  2, 1,  14, 15]
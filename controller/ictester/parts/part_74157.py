@@ -22,6 +22,10 @@ class Part74157(PackageDIP16):
         15: Pin("~G", PinType.IN),
     }
 
+    netlist = """
+        Y{n} = AND(NOT(~G), MUX(S, A{n}, B{n})) for n in 1 2 3 4
+    """
+
     default_inputs = [15, 1,  2, 3,  5, 6,  11, 10,  14, 13]
     default_outputs = [4, 7, 9, 12]
 
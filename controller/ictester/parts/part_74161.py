@@ -21,6 +21,15 @@ class Part74161(PackageDIP16):
         15: Pin("RCO", PinType.OUT),
     }
 
+    netlist = """
+        cnt = AND(ENP, ENT)
+        QA = DFF(CLK, MUX(~LOAD, A, XOR(QA, cnt)), 0, NOT(~CLR))
+        QB = DFF(CLK, MUX(~LOAD, B, XOR(QB, AND(cnt, QA))), 0, NOT(~CLR))
+        QC = DFF(CLK, MUX(~LOAD, C, XOR(QC, AND(cnt, QA, QB))), 0, NOT(~CLR))
+        QD = DFF(CLK, MUX(~LOAD, D, XOR(QD, AND(cnt, QA, QB, QC))), 0, NOT(~CLR))
+        RCO = AND(ENT, QA, QB, QC, QD)
+    """
+
     test_all = TestLogic("Complete logic",
         inputs=[1, 9, 2,  10, 7,  6, 5, 4, 3],
         outputs=[11, 12, 13, 14,  15],
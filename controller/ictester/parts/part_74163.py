@@ -21,6 +21,15 @@ class Part74163(PackageDIP16):
         15: Pin("RCO", PinType.OUT),
     }
 
+    netlist = """
+        cnt = AND(ENP, ENT)
+        QA = DFF(CLK, AND(~CLR, MUX(~LOAD, A, XOR(QA, cnt))))
+        QB = DFF(CLK, AND(~CLR, MUX(~LOAD, B, XOR(QB, AND(cnt, QA)))))
+        QC = DFF(CLK, AND(~CLR, MUX(~LOAD, C, XOR(QC, AND(cnt, QA, QB)))))
+        QD = DFF(CLK, AND(~CLR, MUX(~LOAD, D, XOR(QD, AND(cnt, QA, QB, QC)))))
+        RCO = AND(ENT, QA, QB, QC, QD)
+    """
+
     test_all = TestLogic("Complete logic",
         inputs=[1, 9, 2,  10, 7,  6, 5, 4, 3],
         outputs=[11, 12, 13, 14,  15],
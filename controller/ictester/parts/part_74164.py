@@ -19,6 +19,18 @@ class Part74164(PackageDIP14):
         13: Pin("QH", PinType.OUT),
     }
 
+    netlist = """
+        ser = AND(A, B)
+        QA = DFF(CLK, ser, 0, NOT(~CLR))
+        QB = DFF(CLK, QA, 0, NOT(~CLR))
+        QC = DFF(CLK, QB, 0, NOT(~CLR))
+        QD = DFF(CLK, QC, 0, NOT(~CLR))
+        QE = DFF(CLK, QD, 0, NOT(~CLR))
+        QF = DFF(CLK, QE, 0, NOT(~CLR))
+        QG = DFF(CLK, QF, 0, NOT(~CLR))
+        QH = DFF(CLK, QG, 0, NOT(~CLR))
+    """
+
     test_all = TestLogic("Complete logic",
         inputs=[9, 8,  1, 2],
         outputs=[3, 4, 5, 6, 10, 11, 12, 13],
@@ -21,6 +21,21 @@ class Part74165(PackageDIP16):
         15: Pin("CLK_INH", PinType.IN),
     }
 
+    netlist = """
+        clk = OR(CLK, CLK_INH)
+        ld = NOT(SH/~LD)
+        qa = DFF(clk, SER, AND(ld, A), AND(ld, NOT(A)))
+        qb = DFF(clk, qa, AND(ld, B), AND(ld, NOT(B)))
+        qc = DFF(clk, qb, AND(ld, C), AND(ld, NOT(C)))
+        qd = DFF(clk, qc, AND(ld, D), AND(ld, NOT(D)))
+        qe = DFF(clk, qd, AND(ld, E), AND(ld, NOT(E)))
+        qf = DFF(clk, qe, AND(ld, F), AND(ld, NOT(F)))
+        qg = DFF(clk, qf, AND(ld, G), AND(ld, NOT(G)))
+        qh = DFF(clk, qg, AND(ld, H), AND(ld, NOT(H)))
+        QH = BUF(qh)
+        ~QH = NOT(qh)
+    """
+
     test_load_shift = TestLogic(
         name="Parallel load, shift out",
         inputs=[1, 15, 2,  10,  11, 12, 13, 14, 3, 4, 5, 6],
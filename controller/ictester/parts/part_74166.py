@@ -21,6 +21,19 @@ class Part74166(PackageDIP16):
         15: Pin("SH/~LD", PinType.IN),
     }
 
+    netlist = """
+        clk = OR(CLK, CLK_INH)
+        qa = DFF(clk, MUX(SH/~LD, A, SER), 0, NOT(~CLR))
+        qb = DFF(clk, MUX(SH/~LD, B, qa), 0, NOT(~CLR))
+        qc = DFF(clk, MUX(SH/~LD, C, qb), 0, NOT(~CLR))
+        qd = DFF(clk, MUX(SH/~LD, D, qc), 0, NOT(~CLR))
+        qe = DFF(clk, MUX(SH/~LD, E, qd), 0, NOT(~CLR))
+        qf = DFF(clk, MUX(SH/~LD, F, qe), 0, NOT(~CLR))
+        qg = DFF(clk, MUX(SH/~LD, G, qf), 0, NOT(~CLR))
+        qh = DFF(clk, MUX(SH/~LD, H, qg), 0, NOT(~CLR))
+        QH = BUF(qh)
+    """
+
     # NOTE: clocked on rising edge
     # NOTE: clock inhibit should be changed on clock high
     # NOTE: clear overrides all inputs, including clock
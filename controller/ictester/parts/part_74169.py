@@ -21,6 +21,15 @@ class Part74169(PackageDIP16):
         15: Pin("~RCO", PinType.OUT),
     }
 
+    netlist = """
+        cnt = NOR(~ENP, ~ENT)
+        QA = DFF(CLK, MUX(~LOAD, A, XOR(QA, cnt)))
+        QB = DFF(CLK, MUX(~LOAD, B, XOR(QB, AND(cnt, OR(AND(U/~D, QA), AND(NOT(U/~D), NOT(QA)))))))
+        QC = DFF(CLK, MUX(~LOAD, C, XOR(QC, AND(cnt, OR(AND(U/~D, QA, QB), AND(NOT(U/~D), NOT(QA), NOT(QB)))))))
+        QD = DFF(CLK, MUX(~LOAD, D, XOR(QD, AND(cnt, OR(AND(U/~D, QA, QB, QC), AND(NOT(U/~D), NOT(QA), NOT(QB), NOT(QC)))))))
+        ~RCO = NAND(NOT(~ENT), OR(AND(U/~D, QA, QB, QC, QD), AND(NOT(U/~D), NOT(QA), NOT(QB), NOT(QC), NOT(QD))))
+    """
+
     # ~load, u/~d, ~ent, ~enp, clk, a-d
     default_inputs = [9,  1,  10, 7,  2,  3, 4, 5, 6]
     default_outputs = [14, 13, 12, 11,  15]
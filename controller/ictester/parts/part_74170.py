@@ -21,6 +21,22 @@ class Part74170(PackageDIP16):
         15: Pin("D1", PinType.IN),
     }
 
+    netlist = """
+        we = NOT(~GW)
+        w0 = AND(we, NOT(WB), NOT(WA))
+        w1 = AND(we, NOT(WB), WA)
+        w2 = AND(we, WB, NOT(WA))
+        w3 = AND(we, WB, WA)
+        m{n}_1 = LATCH(w{n}, D1) for n in 0 1 2 3
+        m{n}_2 = LATCH(w{n}, D2) for n in 0 1 2 3
+        m{n}_3 = LATCH(w{n}, D3) for n in 0 1 2 3
+        m{n}_4 = LATCH(w{n}, D4) for n in 0 1 2 3
+        Q1 = OR(~GR, MUX(RB, MUX(RA, m0_1, m1_1), MUX(RA, m2_1, m3_1)))
+        Q2 = OR(~GR, MUX(RB, MUX(RA, m0_2, m1_2), MUX(RA, m2_2, m3_2)))
+        Q3 = OR(~GR, MUX(RB, MUX(RA, m0_3, m1_3), MUX(RA, m2_3, m3_3)))
+        Q4 = OR(~GR, MUX(RB, MUX(RA, m0_4, m1_4), MUX(RA, m2_4, m3_4)))
+    """
+
     default_inputs = [13, 14, 12,  4, 5, 11,  15, 1, 2, 3]
     default_outputs = [10, 9, 7, 6]
 
@@ -23,6 +23,12 @@ class Part74173(PackageDIP16):
         15: Pin("CLR", PinType.IN),
     }
 
+    netlist = """
+        en = NOR(~G1, ~G2)
+        q{n} = DFF(CLK, MUX(en, q{n}, {n}D), 0, CLR) for n in 1 2 3 4
+        {n}Q = TRI(NOR(M, N), q{n}) for n in 1 2 3 4
+    """
+
     test_load = TestLogic("Loads, gated, clear",
         cfgnum=0,
         inputs=[15,  1, 2,  9, 10,  7,  14, 13, 12, 11],
@@ -21,6 +21,10 @@ class Part74174(PackageDIP16):
         15: Pin("6Q", PinType.OUT),
     }
 
+    netlist = """
+        {n}Q = DFF(CLK, {n}D, 0, NOT(~CLR)) for n in 1 2 3 4 5 6
+    """
+
     default_inputs = [1, 9,  3, 4, 6, 11, 13, 14]
     default_outputs = [2, 5, 7, 10, 12, 15]
 
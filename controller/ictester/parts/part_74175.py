@@ -21,6 +21,11 @@ class Part74175(PackageDIP16):
         15: Pin("4Q", PinType.OUT),
     }
 
+    netlist = """
+        {n}Q = DFF(CLK, {n}D, 0, NOT(~CLR)) for n in 1 2 3 4
+        ~{n}Q = NOT({n}Q) for n in 1 2 3 4
+    """
+
     default_inputs = [1, 9,  4, 5, 12, 13]
     default_outputs = [2, 3,  7, 6,  10, 11,  15, 14]
 
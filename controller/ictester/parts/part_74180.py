@@ -20,6 +20,12 @@ class Part74180(PackageDIP14):
         13: Pin("F", PinType.IN),
     }
 
+    netlist = """
+        p = XOR(A, B, C, D, E, F, G, H)
+        sumEVEN = NOR(AND(p, EVEN), AND(NOT(p), ODD))
+        sumODD = NOR(AND(NOT(p), EVEN), AND(p, ODD))
+    """
+
     default_inputs = [8, 9, 10, 11, 12, 13, 1, 2,  3, 4]
     default_outputs = [5, 6]
 
@@ -30,6 +30,21 @@ class Part74181(PackageDIP24):
         23: Pin("A1", PinType.IN),
     }
 
+    netlist = """
+        u{n} = NOR(A{n}, AND(B{n}, S0), AND(NOT(B{n}), S1)) for n in 0 1 2 3
+        l{n} = NOR(AND(A{n}, NOT(B{n}), S2), AND(A{n}, B{n}, S3)) for n in 0 1 2 3
+        c0 = NOT(~Cn)
+        c1 = OR(NOT(l0), AND(NOT(u0), c0))
+        c2 = OR(NOT(l1), AND(NOT(u1), c1))
+        c3 = OR(NOT(l2), AND(NOT(u2), c2))
+        c4 = OR(NOT(l3), AND(NOT(u3), c3))
+        F{n} = XOR(XNOR(u{n}, l{n}), AND(NOT(M), NOT(c{n}))) for n in 0 1 2 3
+        ~Cn+4 = NOT(c4)
+        @14 = AND(F0, F1, F2, F3)
+        X = OR(u0, u1, u2, u3)
+        Y = NOR(NOT(l3), AND(NOT(u3), NOT(l2)), AND(NOT(u3), NOT(u2), NOT(l1)), AND(NOT(u3), NOT(u2), NOT(u1), NOT(l0)))
+    """
+
     missing_tests = "outputs G, P are not tested"
 
     # ------------------------------------------------------------------------
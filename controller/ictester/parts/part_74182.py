@@ -22,6 +22,16 @@ class Part74182(PackageDIP16):
         15: Pin("~P2", PinType.IN),
     }
 
+    netlist = """
+        g{n} = NOT(~G{n}) for n in 0 1 2 3
+        p{n} = NOT(~P{n}) for n in 0 1 2 3
+        Cn+x = OR(g0, AND(p0, Cn))
+        Cn+y = OR(g1, AND(p1, g0), AND(p1, p0, Cn))
+        Cn+z = OR(g2, AND(p2, g1), AND(p2, p1, g0), AND(p2, p1, p0, Cn))
+        ~G = NOR(g3, AND(p3, g2), AND(p3, p2, g1), AND(p3, p2, p1, g0))
+        ~P = NAND(p0, p1, p2, p3)
+    """
+
     test_g = TestLogic("~G",
         inputs=[5, 14, 1, 3, 6, 15, 2],
         outputs=[10],
@@ -21,6 +21,18 @@ class Part74190(PackageDIP16):
         15: Pin("A", PinType.IN),
     }
 
+    netlist = """
+        ld = NOT(~LOAD)
+        min = NOR(QA, QB, QC, QD)
+        max = AND(QA, QD)
+        QA = DFF(CLK, MUX(~CTEN, NOT(QA), QA), AND(ld, A), AND(ld, NOT(A)))
+        QB = DFF(CLK, MUX(~CTEN, MUX(D/~U, AND(XOR(QB, QA), NOT(max)), AND(XOR(QB, NOT(QA)), NOT(min))), QB), AND(ld, B), AND(ld, NOT(B)))
+        QC = DFF(CLK, MUX(~CTEN, MUX(D/~U, AND(XOR(QC, AND(QA, QB)), NOT(max)), AND(XOR(QC, AND(NOT(QA), NOT(QB))), NOT(min))), QC), AND(ld, C), AND(ld, NOT(C)))
+        QD = DFF(CLK, MUX(~CTEN, MUX(D/~U, AND(XOR(QD, AND(QA, QB, QC)), NOT(max)), XOR(QD, AND(NOT(QA), NOT(QB), NOT(QC)))), QD), AND(ld, D), AND(ld, NOT(D)))
+        MAX/MIN = MUX(D/~U, max, min)
+        ~RCO = NAND(NOT(~CTEN), MAX/MIN, NOT(CLK))
+    """
+
     test_load = TestLogic("Load",
         inputs=[4, 5, 14, 11,  9, 10, 1, 15],
         outputs=[7, 6, 2, 3,  12, 13],
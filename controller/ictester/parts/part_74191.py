@@ -21,6 +21,18 @@ class Part74191(PackageDIP16):
         15: Pin("A", PinType.IN),
     }
 
+    netlist = """
+        ld = NOT(~LOAD)
+        min = NOR(QA, QB, QC, QD)
+        max = AND(QA, QB, QC, QD)
+        QA = DFF(CLK, MUX(~CTEN, NOT(QA), QA), AND(ld, A), AND(ld, NOT(A)))
+        QB = DFF(CLK, MUX(~CTEN, MUX(D/~U, XOR(QB, QA), XOR(QB, NOT(QA))), QB), AND(ld, B), AND(ld, NOT(B)))
+        QC = DFF(CLK, MUX(~CTEN, MUX(D/~U, XOR(QC, AND(QA, QB)), XOR(QC, AND(NOT(QA), NOT(QB)))), QC), AND(ld, C), AND(ld, NOT(C)))
+        QD = DFF(CLK, MUX(~CTEN, MUX(D/~U, XOR(QD, AND(QA, QB, QC)), XOR(QD, AND(NOT(QA), NOT(QB), NOT(QC)))), QD), AND(ld, D), AND(ld, NOT(D)))
+        MAX/MIN = MUX(D/~U, max, min)
+        ~RCO = NAND(NOT(~CTEN), MAX/MIN, NOT(CLK))
+    """
+
     test_load = TestLogic("Load",
         inputs=[4, 5, 14, 11,  9, 10, 1, 15],
         outputs=[7, 6, 2, 3,  12, 13],
@@ -21,6 +21,19 @@ class Part74193(PackageDIP16):
         15: Pin("A", PinType.IN),
     }
 
+    netlist = """
+        ld = NOT(~LOAD)
+        clk = AND(UP, DOWN)
+        # count direction is set by the clock input held low
+        up = LATCH(NOT(clk), NOT(UP))
+        QA = DFF(clk, NOT(QA), AND(NOT(CLR), ld, A), OR(CLR, AND(ld, NOT(A))))
+        QB = DFF(clk, MUX(up, XOR(QB, NOT(QA)), XOR(QB, QA)), AND(NOT(CLR), ld, B), OR(CLR, AND(ld, NOT(B))))
+        QC = DFF(clk, MUX(up, XOR(QC, AND(NOT(QA), NOT(QB))), XOR(QC, AND(QA, QB))), AND(NOT(CLR), ld, C), OR(CLR, AND(ld, NOT(C))))
+        QD = DFF(clk, MUX(up, XOR(QD, AND(NOT(QA), NOT(QB), NOT(QC))), XOR(QD, AND(QA, QB, QC))), AND(NOT(CLR), ld, D), OR(CLR, AND(ld, NOT(D))))
+        ~CO = NAND(NOT(UP), QA, QB, QC, QD)
+        ~BO = NAND(NOT(DOWN), NOT(QA), NOT(QB), NOT(QC), NOT(QD))
+    """
+
     test_all = TestLogic("Complete logic",
         inputs=[14, 11,  5, 4,  9, 10, 1, 15],
         outputs=[7, 6, 2, 3,  12, 13],
@@ -21,6 +21,13 @@ class Part74194(PackageDIP16):
         15: Pin("QA", PinType.OUT),
     }
 
+    netlist = """
+        QA = DFF(CLK, MUX(S1, MUX(S0, QA, SR_SER), MUX(S0, QB, A)), 0, NOT(~CLR))
+        QB = DFF(CLK, MUX(S1, MUX(S0, QB, QA), MUX(S0, QC, B)), 0, NOT(~CLR))
+        QC = DFF(CLK, MUX(S1, MUX(S0, QC, QB), MUX(S0, QD, C)), 0, NOT(~CLR))
+        QD = DFF(CLK, MUX(S1, MUX(S0, QD, QC), MUX(S0, SL_SER, D)), 0, NOT(~CLR))
+    """
+
     default_inputs = [1,  10, 9,  11,  7, 2,  3, 4, 5, 6]
     default_outputs = [15, 14, 13, 12]
 
@@ -29,6 +29,17 @@ class Part74198(PackageDIP24):
         23: Pin("S1", PinType.IN),
     }
 
+    netlist = """
+        QA = DFF(CLK, MUX(S1, MUX(S0, QA, SR_SER), MUX(S0, QB, A)), 0, NOT(~CLR))
+        QB = DFF(CLK, MUX(S1, MUX(S0, QB, QA), MUX(S0, QC, B)), 0, NOT(~CLR))
+        QC = DFF(CLK, MUX(S1, MUX(S0, QC, QB), MUX(S0, QD, C)), 0, NOT(~CLR))
+        QD = DFF(CLK, MUX(S1, MUX(S0, QD, QC), MUX(S0, QE, D)), 0, NOT(~CLR))
+        QE = DFF(CLK, MUX(S1, MUX(S0, QE, QD), MUX(S0, QF, E)), 0, NOT(~CLR))
+        QF = DFF(CLK, MUX(S1, MUX(S0, QF, QE), MUX(S0, QG, F)), 0, NOT(~CLR))
+        QG = DFF(CLK, MUX(S1, MUX(S0, QG, QF), MUX(S0, QH, G)), 0, NOT(~CLR))
+        QH = DFF(CLK, MUX(S1, MUX(S0, QH, QG), MUX(S0, SL_SER, H)), 0, NOT(~CLR))
+    """
+
     default_inputs = [13,  23, 1,  11,  22, 2,  3, 5, 7, 9, 15, 17, 19, 21]
     default_outputs = [4, 6, 8, 10, 14, 16, 18, 20]
 
@@ -20,6 +20,10 @@ class Part7430(PackageDIP14):
         13: Pin("NC", PinType.NC),
     }
 
+    netlist = """
+        Y = NAND(A, B, C, D, E, F, G, H)
+    """
+
     tests = [
         TestLogic("Complete logic",
             inputs=[1, 2, 3, 4, 5, 6, 11, 12],
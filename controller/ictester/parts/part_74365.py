@@ -24,6 +24,12 @@ class Part74365(PackageDIP16):
         15: Pin("~2G", PinType.IN),
     }
 
+    netlist = """
+        en = NOR(~1G, ~2G)
+        1Y{n} = TRI(en, 1A{n}) for n in 1 2 3 4
+        2Y{n} = TRI(en, 2A{n}) for n in 1 2
+    """
+
     test_high = TestLogic("Switching outputs, ext. pulled high",
         cfgnum=1,
         read_delay_us=2,
@@ -24,6 +24,11 @@ class Part74368(PackageDIP16):
         15: Pin("~2G", PinType.IN),
     }
 
+    netlist = """
+        1Y{n} = TRI(NOT(~1G), NOT(1A{n})) for n in 1 2 3 4
+        2Y{n} = TRI(NOT(~2G), NOT(2A{n})) for n in 1 2
+    """
+
     test_high = TestLogic("Switching outputs, ext. pulled high",
         cfgnum=1,
         read_delay_us=2,
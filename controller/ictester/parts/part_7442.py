@@ -22,6 +22,19 @@ class Part7442(PackageDIP16):
         15: Pin("A", PinType.IN),
     }
 
+    netlist = """
+        @1 = NAND(NOT(D), NOT(C), NOT(B), NOT(A))
+        @2 = NAND(NOT(D), NOT(C), NOT(B), A)
+        @3 = NAND(NOT(D), NOT(C), B, NOT(A))
+        @4 = NAND(NOT(D), NOT(C), B, A)
+        @5 = NAND(NOT(D), C, NOT(B), NOT(A))
+        @6 = NAND(NOT(D), C, NOT(B), A)
+        @7 = NAND(NOT(D), C, B, NOT(A))
+        @9 = NAND(NOT(D), C, B, A)
+        @10 = NAND(D, NOT(C), NOT(B), NOT(A))
+        @11 = NAND(D, NOT(C), NOT(B), A)
+    """
+
     test_async = TestLogic("Asynchronous operation",
         inputs=[12, 13, 14, 15],
         outputs=[11, 10, 9, 7, 6, 5, 4, 3, 2, 1],
@@ -21,6 +21,34 @@ class Part7447(PackageDIP16):
         15: Pin("f", PinType.OC),
     }
 
+    netlist = """
+        m0 = AND(NOT(D), NOT(C), NOT(B), NOT(A))
+        m1 = AND(NOT(D), NOT(C), NOT(B), A)
+        m2 = AND(NOT(D), NOT(C), B, NOT(A))
+        m3 = AND(NOT(D), NOT(C), B, A)
+        m4 = AND(NOT(D), C, NOT(B), NOT(A))
+        m5 = AND(NOT(D), C, NOT(B), A)
+        m6 = AND(NOT(D), C, B, NOT(A))
+        m7 = AND(NOT(D), C, B, A)
+        m8 = AND(D, NOT(C), NOT(B), NOT(A))
+        m9 = AND(D, NOT(C), NOT(B), A)
+        m10 = AND(D, NOT(C), B, NOT(A))
+        m11 = AND(D, NOT(C), B, A)
+        m12 = AND(D, C, NOT(B), NOT(A))
+        m13 = AND(D, C, NOT(B), A)
+        m14 = AND(D, C, B, NOT(A))
+        m15 = AND(D, C, B, A)
+        blank = OR(NOT(~BI/~RBO), AND(NOT(~RBI), m0))
+        lamp = AND(NOT(~LT), ~BI/~RBO)
+        a = NOR(lamp, AND(NOT(blank), OR(m0, m2, m3, m5, m7, m8, m9, m13)))
+        b = NOR(lamp, AND(NOT(blank), OR(m0, m1, m2, m3, m4, m7, m8, m9, m12)))
+        c = NOR(lamp, AND(NOT(blank), OR(m0, m1, m3, m4, m5, m6, m7, m8, m9, m11)))
+        d = NOR(lamp, AND(NOT(blank), OR(m0, m2, m3, m5, m6, m8, m10, m11, m13, m14)))
+        e = NOR(lamp, AND(NOT(blank), OR(m0, m2, m6, m8, m10, m14)))
+        f = NOR(lamp, AND(NOT(blank), OR(m0, m4, m5, m6, m8, m9, m12, m13, m14)))
+        g = NOR(lamp, AND(NOT(blank), OR(m2, m3, m4, m5, m6, m8, m9, m10, m11, m12, m13, m14)))
+    """
+
     # TODO: full coverage
     test_async = TestLogic("Asynchronous operation",
         read_delay_us=2,  # 7447 outputs are very slow, signal rise is ~5us
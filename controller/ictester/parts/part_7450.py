@@ -20,6 +20,10 @@ class Part7450(PackageDIP14):
         13: Pin("1B", PinType.IN),
     }
 
+    netlist = """
+        {n}Y = NOR(AND({n}A, {n}B), AND({n}C, {n}D)) for n in 1 2
+    """
+
     missing_tests = "Gate expansion is not tested"
 
     test_async = TestLogic("Asynchronous operation",
@@ -20,6 +20,10 @@ class Part7454(PackageDIP14):
         13: Pin("B", PinType.IN),
     }
 
+    netlist = """
+        Y = NOR(AND(A, B), AND(C, D), AND(E, F), AND(G, H))
+    """
+
     test_async = TestLogic("Asynchronous operation",
         inputs=[1, 13, 2, 3, 4, 5, 9, 10],
         outputs=[8],
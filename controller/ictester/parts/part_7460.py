@@ -29,6 +29,10 @@ class Part7460(PackageDIP14):
         13: Pin("1D", PinType.IN),
     }
 
+    netlist = """
+        ~{n}X = NAND({n}A, {n}B, {n}C, {n}D) for n in 1 2
+    """
+
     test_async = TestLogic("Asynchronous operation",
         inputs=[11, 10,  1, 2, 3, 13,  4, 5, 6, 8],
         outputs=[12, 9],
@@ -19,6 +19,11 @@ class Part7472(PackageDIP14):
         13: Pin("~PRE", PinType.IN),
     }
 
+    netlist = """
+        Q = JKFF(NOT(CLK), AND(J1, J2, J3), AND(K1, K2, K3), NOT(~PRE), NOT(~CLR))
+        ~Q = NOT(Q)
+    """
+
     default_inputs = [3, 4, 5,  9, 10, 11,  13, 2, 12]
     default_outputs = [8, 6]
 
@@ -19,6 +19,11 @@ class Part7473(PackageDIP14_vcc4):
         14: Pin("1J", PinType.IN),
     }
 
+    netlist = """
+        {n}Q = JKFF(NOT({n}CLK), {n}J, {n}K, 0, NOT(~{n}CLR)) for n in 1 2
+        ~{n}Q = NOT({n}Q) for n in 1 2
+    """
+
     test_all = TestLogic("Sync/Async operation",
         inputs=[14, 3, 2, 1,  7, 10, 6, 5],
         outputs=[12, 13, 9, 8],
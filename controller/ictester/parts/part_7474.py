@@ -19,6 +19,11 @@ class Part7474(PackageDIP14):
         13: Pin("~2CLR", PinType.IN),
     }
 
+    netlist = """
+        {n}Q = DFF({n}CLK, {n}D, NOT(~{n}PRE), NOT(~{n}CLR)) for n in 1 2
+        ~{n}Q = NOT({n}Q) for n in 1 2
+    """
+
     default_inputs = [1, 4, 2, 3, 13, 10, 12, 11]
     default_outputs = [5, 6, 9, 8]
 
@@ -21,6 +21,15 @@ class Part7475(PackageDIP16_vcc5):
         16: Pin("1Q", PinType.OUT),
     }
 
+    netlist = """
+        # enable inputs: @13 1C,2C, @4 3C,4C
+        1Q = LATCH(@13, 1D)
+        2Q = LATCH(@13, 2D)
+        3Q = LATCH(@4, 3D)
+        4Q = LATCH(@4, 4D)
+        ~{n}Q = NOT({n}Q) for n in 1 2 3 4
+    """
+
     test_follow = TestLogic("Follow",
         inputs=[2, 3, 13,  6, 7, 4],
         outputs=[16, 1,  15, 14,  10, 11,  9, 8],
@@ -22,6 +22,17 @@ class Part7483(PackageDIP16_vcc5):
         16: Pin("B4", PinType.IN),
     }
 
+    netlist = """
+        c1 = OR(AND(A1, B1), AND(A1, C0), AND(B1, C0))
+        c2 = OR(AND(A2, B2), AND(A2, c1), AND(B2, c1))
+        c3 = OR(AND(A3, B3), AND(A3, c2), AND(B3, c2))
+        C4 = OR(AND(A4, B4), AND(A4, c3), AND(B4, c3))
+        S1 = XOR(A1, B1, C0)
+        S2 = XOR(A2, B2, c1)
+        S3 = XOR(A3, B3, c2)
+        S4 = XOR(A4, B4, c3)
+    """
+
     test_all = TestLogic("Complete logic",
         inputs=[13,  1, 3, 8, 10,  16, 4, 7, 11],
         outputs=[15, 2, 6, 9,  14],
@@ -22,6 +22,18 @@ class Part7485(PackageDIP16):
         15: Pin("A3", PinType.IN),
     }
 
+    netlist = """
+        # cascade inputs: @2 A<Bin, @3 A=Bin, @4 A>Bin
+        # outputs: @5 A>Bout, @6 A=Bout, @7 A<Bout
+        e{n} = XNOR(A{n}, B{n}) for n in 0 1 2 3
+        eq = AND(e3, e2, e1, e0)
+        gt = OR(AND(A3, NOT(B3)), AND(e3, A2, NOT(B2)), AND(e3, e2, A1, NOT(B1)), AND(e3, e2, e1, A0, NOT(B0)))
+        lt = OR(AND(NOT(A3), B3), AND(e3, NOT(A2), B2), AND(e3, e2, NOT(A1), B1), AND(e3, e2, e1, NOT(A0), B0))
+        @5 = OR(gt, AND(eq, NOT(@2), NOT(@3)))
+        @6 = AND(eq, @3)
+        @7 = OR(lt, AND(eq, NOT(@4), NOT(@3)))
+    """
+
     test_all_0 = TestLogic("Full logic (A=B = 0)",
         inputs=[2, 3, 4,  15, 13, 12, 10,  1, 14, 11, 9],
         outputs=[7, 6, 5],
@@ -20,6 +20,10 @@ class Part7486(PackageDIP14):
         13: Pin("4B", PinType.IN),
     }
 
+    netlist = """
+        {n}Y = XOR({n}A, {n}B) for n in 1 2 3 4
+    """
+
     tests = [
         TestLogic("Complete logic",
             inputs=[1, 2, 4, 5, 10, 9, 13, 12],
@@ -19,6 +19,16 @@ class Part7490(PackageDIP14_vcc5):
         14: Pin("CKA", PinType.IN),
     }
 
+    netlist = """
+        # @2 R0(1), @3 R0(2), @6 R9(1), @7 R9(2)
+        r0 = AND(@2, @3)
+        r9 = AND(@6, @7)
+        QA = JKFF(NOT(CKA), 1, 1, r9, r0)
+        QB = JKFF(NOT(CKB), NOT(QD), 1, 0, OR(r0, r9))
+        QC = JKFF(NOT(QB), 1, 1, 0, OR(r0, r9))
+        QD = JKFF(NOT(CKB), AND(QB, QC), QD, r9, r0)
+    """
+
     # R0(1), R0(2), R9(1), R9(2), CKA, CKB
     default_inputs = [2, 3,  6, 7,  14, 1]
     default_outputs = [11, 8, 9, 12]
@@ -19,6 +19,15 @@ class Part7492(PackageDIP14_vcc5):
         14: Pin("CKA", PinType.IN),
     }
 
+    netlist = """
+        # @6 R0(1), @7 R0(2)
+        r0 = AND(@6, @7)
+        QA = JKFF(NOT(CKA), 1, 1, 0, r0)
+        QB = JKFF(NOT(CKB), NOT(QC), 1, 0, r0)
+        QC = JKFF(NOT(CKB), QB, 1, 0, r0)
+        QD = JKFF(NOT(QC), 1, 1, 0, r0)
+    """
+
     test_count = TestLogic("Count",
         inputs=[6, 7,  14, 1],
         outputs=[12, 11, 9, 8],
@@ -19,6 +19,15 @@ class Part7493(PackageDIP14_vcc5):
         14: Pin("CKA", PinType.IN),
     }
 
+    netlist = """
+        # @2 R0(1), @3 R0(2)
+        r0 = AND(@2, @3)
+        QA = JKFF(NOT(CKA), 1, 1, 0, r0)
+        QB = JKFF(NOT(CKB), 1, 1, 0, r0)
+        QC = JKFF(NOT(QB), 1, 1, 0, r0)
+        QD = JKFF(NOT(QC), 1, 1, 0, r0)
+    """
+
     test_count = TestLogic("Count",
         inputs=[2, 3,  14, 1],
         outputs=[12, 9, 8, 11],
@@ -19,6 +19,14 @@ class Part7495(PackageDIP14):
         13: Pin("QA", PinType.OUT),
     }
 
+    netlist = """
+        clk = MUX(MODE, CLK1, CLK2)
+        QA = DFF(NOT(clk), MUX(MODE, SER, A))
+        QB = DFF(NOT(clk), MUX(MODE, QA, B))
+        QC = DFF(NOT(clk), MUX(MODE, QB, C))
+        QD = DFF(NOT(clk), MUX(MODE, QC, D))
+    """
+
     default_inputs = [6, 8, 9, 1, 2, 3, 4, 5]
     default_outputs = [13, 12, 11, 10]
 
@@ -21,6 +21,14 @@ class Part7496(PackageDIP16_vcc5):
         16: Pin("CLR", PinType.IN),
     }
 
+    netlist = """
+        QA = DFF(CLK, SER, AND(PRE, A), NOT(CLR))
+        QB = DFF(CLK, QA, AND(PRE, B), NOT(CLR))
+        QC = DFF(CLK, QB, AND(PRE, C), NOT(CLR))
+        QD = DFF(CLK, QC, AND(PRE, D), NOT(CLR))
+        QE = DFF(CLK, QD, AND(PRE, E), NOT(CLR))
+    """
+
     default_inputs = [16, 8,  2, 3, 4, 6, 7,  1, 9]
     default_outputs = [15, 14, 13, 11, 10]
 
@@ -21,6 +21,11 @@ class Part74H106(PackageDIP16_vcc5_gnd13):
         16: Pin("1K", PinType.IN),
     }
 
+    netlist = """
+        {n}Q = JKFF(NOT({n}CLK), {n}J, {n}K, NOT(~{n}PRE), NOT(~{n}CLR)) for n in 1 2
+        ~{n}Q = NOT({n}Q) for n in 1 2
+    """
+
     test_all = TestLogic("Complete logic",
         inputs=[1, 2, 3, 4, 16,  6, 7, 8, 9, 12],
         outputs=[15, 14,  11, 10],
@@ -20,6 +20,10 @@ class Part74H52(PackageDIP14):
         13: Pin("I", PinType.IN),
     }
 
+    netlist = """
+        Y = OR(AND(A, B), AND(C, D, E), AND(F, G), AND(H, I))
+    """
+
     missing_tests = "Gate expansion is not tested"
 
     test_async = TestLogic("Asynchronous operation",
@@ -20,6 +20,10 @@ class Part74H53(PackageDIP14):
         13: Pin("A2", PinType.IN),
     }
 
+    netlist = """
+        ~Y = NOR(AND(A1, A2), AND(B1, B2), AND(C1, C2, C3), AND(D1, D2))
+    """
+
     missing_tests = "Gate expansion is not tested"
 
     test_async = TestLogic("Asynchronous operation",
@@ -20,6 +20,10 @@ class Part74H61(PackageDIP14):
         13: Pin("3C", PinType.IN),
     }
 
+    netlist = """
+        {n}X = NAND({n}A, {n}B, {n}C) for n in 1 2 3
+    """
+
     test_async = TestLogic("Asynchronous operation",
         inputs=[1, 2, 3,  4, 5, 6,  11, 12, 13],
         outputs=[9, 8, 10],
@@ -29,6 +29,10 @@ class Part74H62(PackageDIP14):
         13: Pin("J", PinType.IN),
     }
 
+    netlist = """
+        ~X = NOR(AND(A, B), AND(C, D, E), AND(F, G, H), AND(I, J))
+    """
+
     test_async = TestLogic("Asynchronous operation",
         inputs=[8,  1, 2,  3, 4, 5,  9, 10, 11,  12, 13],
         outputs=[6],
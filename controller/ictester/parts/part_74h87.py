@@ -20,6 +20,10 @@ class Part74H87(PackageDIP14):
         13: Pin("A4", PinType.IN),
     }
 
+    netlist = """
+        Y{n} = MUX(B, XNOR(A{n}, C), NOT(C)) for n in 1 2 3 4
+    """
+
     default_inputs = [8, 1,  2, 5, 10, 13]
     default_outputs = [3, 6, 9, 12]
 
@@ -20,6 +20,11 @@ class Part74LS51(PackageDIP14):
         13: Pin("1C", PinType.IN),
     }
 
+    netlist = """
+        1Y = NOR(AND(1A, 1B, 1C), AND(1D, 1E, 1F))
+        2Y = NOR(AND(2A, 2B), AND(2C, 2D))
+    """
+
     test_gate1 = TestLogic("Gate 1",
         inputs=[1, 12, 13,  9, 10, 11],
         outputs=[8],
@@ -20,6 +20,10 @@ class Part74LS54(PackageDIP14):
         13: Pin("J", PinType.IN),
     }
 
+    netlist = """
+        Y = NOR(AND(A, B), AND(C, D, E), AND(F, G, H), AND(I, J))
+    """
+
     test_async = TestLogic("Asynchronous operation",
         inputs=[1, 2,  3, 4, 5,  9, 10, 11,  12, 13],
         outputs=[6],
@@ -26,6 +26,11 @@ class Part74S244(PackageDIP20):
         19: Pin("~2G", PinType.IN),
     }
 
+    netlist = """
+        1Y{n} = TRI(NOT(~1G), 1A{n}) for n in 1 2 3 4
+        2Y{n} = TRI(NOT(~2G), 2A{n}) for n in 1 2 3 4
+    """
+
     default_inputs = [1,  2, 4, 6, 8,  19,  11, 13, 15, 17]
     default_outputs = [18, 16, 14, 12,  9, 7, 5, 3]
 
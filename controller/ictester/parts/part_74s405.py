@@ -22,6 +22,18 @@ class Part74S405(PackageDIP16):
         15: Pin("O0", PinType.OUT),
     }
 
+    netlist = """
+        en = AND(E3, NOT(~E1), NOT(~E2))
+        O0 = NAND(en, NOT(A2), NOT(A1), NOT(A0))
+        O1 = NAND(en, NOT(A2), NOT(A1), A0)
+        O2 = NAND(en, NOT(A2), A1, NOT(A0))
+        O3 = NAND(en, NOT(A2), A1, A0)
+        O4 = NAND(en, A2, NOT(A1), NOT(A0))
+        O5 = NAND(en, A2, NOT(A1), A0)
+        O6 = NAND(en, A2, A1, NOT(A0))
+        O7 = NAND(en, A2, A1, A0)
+    """
+
     default_inputs = [4, 5, 6,  3, 2, 1]
     default_outputs = [7, 9, 10, 11, 12, 13, 14, 15]
 
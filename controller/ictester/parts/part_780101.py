@@ -10,6 +10,34 @@ class Part780101(Part7489):
      * outputs are always high when CS is high
     '''
 
+    netlist = """
+        we = NOR(~ME, ~WE)
+        w0 = AND(we, NOT(A3), NOT(A2), NOT(A1), NOT(A0))
+        w1 = AND(we, NOT(A3), NOT(A2), NOT(A1), A0)
+        w2 = AND(we, NOT(A3), NOT(A2), A1, NOT(A0))
+        w3 = AND(we, NOT(A3), NOT(A2), A1, A0)
+        w4 = AND(we, NOT(A3), A2, NOT(A1), NOT(A0))
+        w5 = AND(we, NOT(A3), A2, NOT(A1), A0)
+        w6 = AND(we, NOT(A3), A2, A1, NOT(A0))
+        w7 = AND(we, NOT(A3), A2, A1, A0)
+        w8 = AND(we, A3, NOT(A2), NOT(A1), NOT(A0))
+        w9 = AND(we, A3, NOT(A2), NOT(A1), A0)
+        w10 = AND(we, A3, NOT(A2), A1, NOT(A0))
+        w11 = AND(we, A3, NOT(A2), A1, A0)
+        w12 = AND(we, A3, A2, NOT(A1), NOT(A0))
+        w13 = AND(we, A3, A2, NOT(A1), A0)
+        w14 = AND(we, A3, A2, A1, NOT(A0))
+        w15 = AND(we, A3, A2, A1, A0)
+        m{n}_1 = LATCH(w{n}, D1) for n in 0 1 2 3 4 5 6 7 8 9 10 11 12 13 14 15
+        m{n}_2 = LATCH(w{n}, D2) for n in 0 1 2 3 4 5 6 7 8 9 10 11 12 13 14 15
+        m{n}_3 = LATCH(w{n}, D3) for n in 0 1 2 3 4 5 6 7 8 9 10 11 12 13 14 15
+        m{n}_4 = LATCH(w{n}, D4) for n in 0 1 2 3 4 5 6 7 8 9 10 11 12 13 14 15
+        ~Q1 = NAND(NOT(~ME), ~WE, MUX(A3, MUX(A2, MUX(A1, MUX(A0, m0_1, m1_1), MUX(A0, m2_1, m3_1)), MUX(A1, MUX(A0, m4_1, m5_1), MUX(A0, m6_1, m7_1))), MUX(A2, MUX(A1, MUX(A0, m8_1, m9_1), MUX(A0, m10_1, m11_1)), MUX(A1, MUX(A0, m12_1, m13_1), MUX(A0, m14_1, m15_1)))))
+        ~Q2 = NAND(NOT(~ME), ~WE, MUX(A3, MUX(A2, MUX(A1, MUX(A0, m0_2, m1_2), MUX(A0, m2_2, m3_2)), MUX(A1, MUX(A0, m4_2, m5_2), MUX(A0, m6_2, m7_2))), MUX(A2, MUX(A1, MUX(A0, m8_2, m9_2), MUX(A0, m10_2, m11_2)), MUX(A1, MUX(A0, m12_2, m13_2), MUX(A0, m14_2, m15_2)))))
+        ~Q3 = NAND(NOT(~ME), ~WE, MUX(A3, MUX(A2, MUX(A1, MUX(A0, m0_3, m1_3), MUX(A0, m2_3, m3_3)), MUX(A1, MUX(A0, m4_3, m5_3), MUX(A0, m6_3, m7_3))), MUX(A2, MUX(A1, MUX(A0, m8_3, m9_3), MUX(A0, m10_3, m11_3)), MUX(A1, MUX(A0, m12_3, m13_3), MUX(A0, m14_3, m15_3)))))
+        ~Q4 = NAND(NOT(~ME), ~WE, MUX(A3, MUX(A2, MUX(A1, MUX(A0, m0_4, m1_4), MUX(A0, m2_4, m3_4)), MUX(A1, MUX(A0, m4_4, m5_4), MUX(A0, m6_4, m7_4))), MUX(A2, MUX(A1, MUX(A0, m8_4, m9_4), MUX(A0, m10_4, m11_4)), MUX(A1, MUX(A0, m12_4, m13_4), MUX(A0, m14_4, m15_4)))))
+    """
+
     # ------------------------------------------------------------------------
     def mem_rw_test_gen():
         # --------------------------------------------------------------------
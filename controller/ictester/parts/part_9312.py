@@ -24,6 +24,11 @@ class Part9312(PackageDIP16):
         15: Pin("Y", PinType.OUT),
     }
 
+    netlist = """
+        Y = AND(NOT(~G), MUX(C, MUX(B, MUX(A, D0, D1), MUX(A, D2, D3)), MUX(B, MUX(A, D4, D5), MUX(A, D6, D7))))
+        W = NOT(Y)
+    """
+
     default_inputs = [9, 7, 6, 5, 4, 3, 2, 1,  13, 12, 11,  10]
     default_outputs = [15, 14]
 
@@ -0,0 +1,33 @@
+from concurrent.futures import ThreadPoolExecutor
+
+'''
+Test data prefetching.
+
+Compiling test vectors and encoding them for the tester is done in a background thread
+for the next test, while the tester runs the current one. This way vector upload for the
+next test starts as soon as the current test finishes. Only one test is prepared ahead,
+so at most one (window of) encoded test vectors is kept in memory in addition to the running test.
+'''
+
+
+# ------------------------------------------------------------------------
+class Prefetcher:
+    def __init__(self, tests):
+        self.tests = tests
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+        self.pending = {}  # test index: future
+        if tests:
+            self.pending[0] = self.executor.submit(tests[0].prepare)
+
+    def ready(self, index):
+        # wait until test at index is prepared (if it was scheduled), start preparing the next one
+        future = self.pending.pop(index, None)
+        if future:
+            future.result()
+        nxt = index + 1
+        # the same test run twice in a row can't be prepared while it's running
+        if nxt < len(self.tests) and self.tests[nxt] is not self.tests[index]:
+            self.pending[nxt] = self.executor.submit(self.tests[nxt].prepare)
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,108 @@
+import os
+import json
+import hashlib
+import logging
+from ictester.test import TestLogic
+
+'''
+Test profiles.
+
+A profile selects how part tests are run: loop count, supply current measurements
+and tests (or their vectors) used. Parts may declare their own profiles in the `profiles`
+dictionary, profiles not declared by a part fall back to the defaults:
+
+    screen - quick screening: 1 loop, no supply current measurements,
+             logic tests replaced by the compacted ones (same stuck-at fault coverage
+             of the part model, with much less vectors) for parts with a model,
+             if compacted tests keep the coverage and their expected outputs match the model
+    qualify - full qualification: test loop counts, supply current traces
+
+Compacted tests (or the decision not to use them) are cached, so that the part model
+is only simulated when part tests change.
+'''
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".ictester", "cache")
+CACHE_VERSION = 2  # compaction results of earlier versions are not used
+
+logger = logging.getLogger('ictester')
+
+
+# ------------------------------------------------------------------------
+class Profile:
+    def __init__(self, name, loops=None, imeasure=True, trace=False, compact=False, test_names=None):
+        self.name = name
+        self.loops = loops  # None: test's own loop count
+        self.imeasure = imeasure  # supply current measurements during the test run
+        self.trace = trace  # supply current trace for each vector
+        self.compact = compact  # replace logic tests with compacted ones (parts with a model only)
+        self.test_names = test_names  # None: all part tests
+
+    def tests(self, part, tests):
+        # tests to be run in this profile, out of the selected part tests
+        if self.test_names is not None:
+            tests = [t for t in tests if t.name in self.test_names]
+        if self.compact and part.netlist and tests == part.tests:
+            compacted = compacted_tests(part)
+            if compacted:
+                tests = compacted + [t for t in tests if not isinstance(t, TestLogic)]
+        return tests
+
+
+DEFAULT_PROFILES = {
+    "screen": Profile("screen", loops=1, imeasure=False, compact=True),
+    "qualify": Profile("qualify", trace=True),
+}
+
+
+# ------------------------------------------------------------------------
+def get_profile(part, name):
+    try:
+        return part.profiles.get(name) or DEFAULT_PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown test profile: {name}, available profiles: {', '.join(profile_names(part))}")
+
+
+def profile_names(part):
+    return sorted(set(DEFAULT_PROFILES) | set(part.profiles))
+
+
+# ------------------------------------------------------------------------
+def _tests_key(part):
+    h = hashlib.sha1(str(CACHE_VERSION).encode())
+    for t in part.tests:
+        if isinstance(t, TestLogic):
+            h.update(repr((t.name, t.inputs, t.outputs, t.loops, t.cfgnum, t.read_delay_us)).encode())
+            for v in t.iter_vectors():
+                h.update(repr((list(map(int, v.input)), list(map(int, v.output)))).encode())
+    return h.hexdigest()[:16]
+
+
+def compacted_tests(part):
+    # compacted part logic tests, from cache if possible. None if compaction doesn't keep fault coverage
+    # or compacted tests would fail good parts (expected outputs not matching the model).
+    from ictester.compact import (Compaction, tests_from_specs)
+    from ictester.sim import (Model, SimulationError)
+    from ictester.netlist import NetlistError
+
+    path = os.path.join(CACHE_DIR, f"{part.name}-compact-{_tests_key(part)}.json")
+    try:
+        with open(path) as f:
+            specs = json.load(f)
+    except (OSError, ValueError):
+        logger.log(20, "Compacting %s tests", part.name)
+        try:
+            c = Compaction(Model(part))
+        except (NetlistError, SimulationError) as e:
+            logger.log(20, "Could not compact %s tests: %s", part.name, e)
+            return None
+        if not c.valid:
+            logger.log(20, "Compacted %s tests not used: %s faults lost, %s expected outputs not matching the model", part.name, c.lost, c.mismatches)
+        specs = c.specs if c.valid else None
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(path, "w") as f:
+                json.dump(specs, f)
+        except OSError as e:
+            logger.log(20, "Could not cache compacted tests: %s", e)
+
+    return tests_from_specs(part, specs) if specs else None
@@ -0,0 +1,36 @@
+import math
+from struct import unpack
+
+CPU_CYCLE_NS = 50  # 20MHz
+# Q output sampling period (single pulse resolution), sampling start is shifted by 0..3 cycles
+# for consecutive pulses, so mean pulse width is resolved to a single cycle
+SAMPLE_CYCLES = 4
+# trigger edge to the first sample (estimated)
+SAMPLE_OFFSET = 5
+PULSE_TIMEOUT = 0xffff
+
+
+# ------------------------------------------------------------------------
+class PulseStats:
+    def __init__(self, count, min_width, max_width, width_sum, width_sum_sq, retrig_offset):
+        self.count = count
+        self.min = min_width * CPU_CYCLE_NS
+        self.max = max_width * CPU_CYCLE_NS
+        self.mean = width_sum / count * CPU_CYCLE_NS if count else 0
+        variance = width_sum_sq / count - (width_sum / count) ** 2 if count else 0
+        self.stddev = math.sqrt(max(variance, 0)) * CPU_CYCLE_NS
+        self.retrig_offset = retrig_offset * CPU_CYCLE_NS
+        self.timeout = max_width == PULSE_TIMEOUT
+
+    @classmethod
+    def unpack(cls, payload):
+        return cls(*unpack("<HHHIQH", payload))
+
+    @property
+    def extended(self):
+        # total (retriggered) pulse width, from the first trigger
+        return self.retrig_offset + self.mean
+
+    def within(self, limits):
+        low, high = limits
+        return not self.timeout and self.min >= low and self.max <= high
@@ -0,0 +1,154 @@
+import re
+import sys
+import json
+from datetime import datetime
+from ictester.test import (TestType, DRAMTestType)
+from ictester.response import RespType
+from ictester import speedgrade
+
+'''
+Machine-readable test results.
+
+Results are reported as records, each one a JSON object with a "record" field:
+
+    part - tested part, tester and session start time
+    detect - chip autodetection candidates
+    powerup - DUT power up result and idle bus voltage
+    test - single test result, with failure details
+    summary - bus voltage and current measurements, transport stats, test counts, overall result
+    error - session aborted, with the reason
+
+In "ndjson" format each record is written on its own line as soon as it's available,
+"json" format writes a single object after the session ends: records by their type,
+with test records collected in the "tests" list. In "text" format records are not written,
+only passed to listeners (eg. the results database).
+'''
+
+FORMATS = ["text", "json", "ndjson"]
+
+ANSI_ESCAPE = re.compile(r'\x1b\[[0-9;]*m')
+
+
+# ------------------------------------------------------------------------
+class Report:
+    def __init__(self, fmt, stream=None, listeners=[]):
+        self.format = fmt
+        self.stream = stream or sys.stdout
+        self.listeners = listeners  # called with each record
+        self.records = []
+
+    def emit(self, record, **fields):
+        data = {"record": record, **fields}
+        for listener in self.listeners:
+            listener(data)
+        if self.format == "text":
+            return
+        if self.format == "ndjson":
+            self.stream.write(json.dumps(data) + "\n")
+            self.stream.flush()
+        else:
+            self.records.append(data)
+
+    def error(self, text):
+        # session aborted, text is the regular (colored) program output explaining why
+        lines = [l.strip() for l in plain(text).splitlines() if l.strip()]
+        self.emit("error", message=" ".join(lines))
+
+    def close(self):
+        if self.format != "json":
+            return
+        doc = {}
+        for r in self.records:
+            r = dict(r)
+            record = r.pop("record")
+            if record == "test":
+                doc.setdefault("tests", []).append(r)
+            else:
+                doc[record] = r
+        self.stream.write(json.dumps(doc, indent=1) + "\n")
+        self.stream.flush()
+
+
+# ------------------------------------------------------------------------
+def plain(text):
+    # text without terminal colors
+    return ANSI_ESCAPE.sub("", text)
+
+
+def timestamp():
+    return datetime.now().astimezone().isoformat(timespec="seconds")
+
+
+def pin_diff(part, test):
+    # DUT pins with a state different than expected on the failed vector
+    num, vector = test.failed_context[-1]
+    expected = dict(zip(test.inputs + test.outputs, [*vector.input, *vector.output]))
+    return [
+        {"pin": pin, "name": part.pins[pin].name, "expected": int(value), "actual": int(test.failed_pin_vector[pin-1])}
+        for pin, value in expected.items()
+        if int(value) != int(test.failed_pin_vector[pin-1])
+    ]
+
+
+def test_record(part, test, number, profile, loops, response, baseline=None, upload_time=None):
+    data = {
+        "number": number,
+        "name": test.name,
+        "profile": profile.name if profile else None,
+        "type": test.type.name,
+        "vectors": test.vector_count,
+        "loops": loops,
+        "result": response.name if response else "SKIP",
+        "elapsed": test.elapsed if response in (RespType.PASS, RespType.FAIL) else None,
+        "upload_time": upload_time,
+    }
+
+    if test.itrace is not None:
+        try:
+            outliers = len(test.itrace.outliers(baseline))
+        except ValueError:
+            outliers = None
+        data["itrace"] = {"points": len(test.itrace), "outliers": outliers}
+
+    if response == RespType.FAIL and test.type == TestType.LOGIC:
+        data["failed_loop"] = test.failed_loop
+        data["failed_vector_num"] = test.failed_vector_num
+        data["pin_diff"] = pin_diff(part, test)
+    elif response == RespType.FAIL and test.type == TestType.DRAM:
+        data["failed_row"] = test.failed_row
+        data["failed_column"] = test.failed_column
+        if test.chip_test_type != DRAMTestType.SPEED_BIN:
+            data["failed_march_step"] = test.algorithm.step_name(test.failed_march_step)
+        data["failed_reads"] = test.failed_reads
+        if test.failmap is not None:
+            data["failing_cells"] = len(test.failmap.cells)
+            data["failmap_overflow"] = test.failmap.overflow
+
+    if test.type == TestType.DRAM and test.speed_bin:
+        sb = test.speed_bin
+        data["speed_bin"] = {
+            "failed_reads": sb.failed_reads,
+            "access_time": sb.access_time,
+            "access_time_min": sb.access_time_min,
+            "grade": f"{sb.device}{sb.grade}" if sb.grade and sb.grade != speedgrade.UNRESOLVABLE else sb.grade,
+            "stable": sb.stable,
+        }
+    if test.type == TestType.UNIVIB and test.pulse:
+        p = test.pulse
+        data["pulse"] = {
+            "count": p.count, "min": p.min, "max": p.max, "mean": p.mean, "stddev": p.stddev,
+            "limits": list(test.limits) if test.limits else None,
+            "timeout": p.timeout,
+        }
+        if p.retrig_offset:
+            data["pulse"]["extended"] = p.extended
+
+    return data
+
+
+def currents(part):
+    names = ["max_ivcc", "max_ignd", "min_ivcc", "min_ignd"]
+    return {
+        name: {"ivcc": m[0], "ignd": m[1], "idelta": m[2]}
+        for name, m in zip(names, part.imeasurements)
+    }
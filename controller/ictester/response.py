@@ -11,6 +11,14 @@ RespType = Enum("Response",
         ("FAIL", 131),
         ("ERR", 132),
         ("TIMING_ERROR", 133),
+        ("DATA", 134),
+    ]
+)
+
+DataType = Enum("DataType",
+    names=[
+        ("ITRACE", 1),
+        ("DRAM_FAILMAP", 2),
     ]
 )
 
@@ -36,6 +44,8 @@ error_message = {
     18: "Selected chip type is unknown",
     19: "No such test for selected chip",
     20: "Overcurrent when connecting the DUT",
+    21: "Invalid test program",
+    22: "Receive buffer overflow",
 }
 
 class Response:
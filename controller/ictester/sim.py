@@ -0,0 +1,358 @@
+from itertools import (count, islice, tee)
+from ictester.netlist import (Netlist, NetlistError, CONSTANTS)
+from ictester.part import ZIFFunc
+
+'''
+Bit-parallel logic simulator.
+
+Each net value is a pair of Python ints (one, zero): bit n of 'one' is set if the net is 1
+in lane n, bit n of 'zero' is set if it's 0. Neither bit set means unknown (X).
+Lanes are independent copies of the circuit: different vectors for combinational models,
+or different (faulty) machines running the same vector sequence.
+
+Netlists are compiled to Python functions evaluating all elements in topological order.
+'''
+
+
+# ------------------------------------------------------------------------
+class SimulationError(Exception):
+    pass
+
+
+# ------------------------------------------------------------------------
+def _gate(op, ins, tmp, pull=1):
+    # code computing (one, zero) of a gate, using temporary variables.
+    # pull is the value read from a disabled 3-state output
+    code = []
+    o = [i[0] for i in ins]
+    z = [i[1] for i in ins]
+    if op in ("AND", "NAND"):
+        res = (" & ".join(o), " | ".join(z))
+    elif op in ("OR", "NOR"):
+        res = (" | ".join(o), " & ".join(z))
+    elif op in ("XOR", "XNOR"):
+        ao, az = o[0], z[0]
+        for bo, bz in zip(o[1:], z[1:]):
+            t = next(tmp)
+            code.append(f"{t}o = ({ao} & {bz}) | ({az} & {bo}); {t}z = ({ao} & {bo}) | ({az} & {bz})")
+            ao, az = f"{t}o", f"{t}z"
+        res = (ao, az)
+    elif op in ("NOT", "BUF"):
+        res = (o[0], z[0])
+    elif op == "MUX":
+        (so, sz), (ao, az), (bo, bz) = ins
+        res = (f"({sz} & {ao}) | ({so} & {bo}) | ({ao} & {bo})", f"({sz} & {az}) | ({so} & {bz}) | ({az} & {bz})")
+    elif op == "TRI":
+        (eo, ez), (do, dz) = ins
+        if pull:
+            res = (f"{ez} | {do}", f"{eo} & {dz}")
+        else:
+            res = (f"{eo} & {do}", f"{ez} | {dz}")
+    if op in ("NAND", "NOR", "XNOR", "NOT"):
+        res = (res[1], res[0])
+    return code, res
+
+
+# ------------------------------------------------------------------------
+class Model:
+    def __init__(self, part):
+        self.part = part
+        netlist = part.netlist if isinstance(part.netlist, Netlist) else Netlist(part.netlist)
+        try:
+            self.elements = netlist.bind(part)
+        except NetlistError as e:
+            raise NetlistError(f"{part.name} model: {e}")
+        self.sequential = any(e.storage for e in self.elements)
+
+    @property
+    def nets(self):
+        nets = set(n for e in self.elements for n in [e.output, *e.inputs] if n not in CONSTANTS)
+        return sorted(nets, key=str)
+
+    def simulator(self, inputs, outputs, lanes=1, faults=None, cfgnum=0):
+        return Simulator(self, inputs, outputs, lanes, faults, cfgnum)
+
+
+# ------------------------------------------------------------------------
+class Simulator:
+    # Model compiled for a set of tester-driven pins and checked outputs.
+    # faults: {net: (stuck-at-0 lanes, stuck-at-1 lanes)}
+    # cfgnum: DUT pin configuration, disabled 3-state outputs read low on pins without pull-ups
+
+    def __init__(self, model, inputs, outputs, lanes=1, faults=None, cfgnum=0):
+        self.model = model
+        self.inputs = inputs
+        self.outputs = outputs
+        self.lanes = lanes
+        self.all = (1 << lanes) - 1
+        self.faults = faults if faults else {}
+        self.pulls = {}
+        for num, pin in model.part.pins.items():
+            func = pin.zif_func[cfgnum] if cfgnum < len(pin.zif_func) else pin.zif_func[0]
+            self.pulls[num] = 0 if func == ZIFFunc.IN_HIZ else 1
+
+        # elements driving pins set by the tester are disconnected
+        elements = [e for e in model.elements if e.output not in inputs]
+        drivers = {e.output: e for e in elements}
+        for pin in outputs:
+            if pin not in drivers:
+                raise SimulationError(f"{model.part.name} model doesn't drive output pin {pin}")
+
+        self.nets = sorted(set(n for e in elements for n in [e.output, *e.inputs] if n not in CONSTANTS) | set(inputs) | set(outputs), key=str)
+        self.index = {n: i for i, n in enumerate(self.nets)}
+        self.drivers = drivers
+        self.storage = [e for e in elements if e.storage]
+        self.comb = self._order([e for e in elements if not e.storage], drivers)
+
+        self._ns = {"ALL": self.all}
+        self._comb = self._compile_comb(self.comb, drivers)
+        self._update = self._compile_update()
+        self.reset()
+
+    def _order(self, comb, drivers):
+        order = []
+        done = set()
+        visiting = set()
+
+        def visit(e):
+            if e.output in done:
+                return
+            if e.output in visiting:
+                raise SimulationError(f"{self.model.part.name} model has a combinational loop through {e.output}")
+            visiting.add(e.output)
+            for i in e.inputs:
+                d = drivers.get(i)
+                if d and not d.storage:
+                    visit(d)
+            visiting.discard(e.output)
+            done.add(e.output)
+            order.append(e)
+
+        for e in comb:
+            visit(e)
+        return order
+
+    def _fault(self, net, var):
+        # code forcing faulty lanes of a net
+        if net not in self.faults:
+            return []
+        self._set_fault(net, *self.faults[net])
+        n = self.index[net]
+        return [f"{var}o = ({var}o & K0_{n}) | S1_{n}; {var}z = ({var}z & K1_{n}) | S0_{n}"]
+
+    def _set_fault(self, net, s0, s1):
+        n = self.index[net]
+        self._ns[f"K0_{n}"] = ~s0
+        self._ns[f"K1_{n}"] = ~s1
+        self._ns[f"S0_{n}"] = s0
+        self._ns[f"S1_{n}"] = s1
+
+    def set_faults(self, faults):
+        # change faulty lanes without recompiling the model.
+        # Only nets that had faults (possibly with empty lane masks) when the simulator was created can be faulty.
+        for net in self.faults:
+            if net in self.index:
+                self._set_fault(net, *faults.get(net, (0, 0)))
+
+    def _var(self, net):
+        if net == "0":
+            return ("0", "ALL")
+        if net == "1":
+            return ("ALL", "0")
+        n = self.index[net]
+        return (f"n{n}o", f"n{n}z")
+
+    def _compile_comb(self, comb, drivers):
+        # O/Z hold net values as seen by the circuit (with faults applied),
+        # QO/QZ hold storage elements state
+        lines = ["def comb(O, Z, QO, QZ):"]
+        tmp = (f"t{i}" for i in count())
+        # sources: tester-driven pins, undriven pins (tester sets them to 0) and storage outputs
+        for net in self.nets:
+            n = self.index[net]
+            if net in drivers:
+                if not drivers[net].storage:
+                    continue
+                num = self.storage.index(drivers[net])
+                lines.append(f"    n{n}o = QO[{num}]; n{n}z = QZ[{num}]")
+            elif net in self.inputs:
+                lines.append(f"    n{n}o = O[{n}]; n{n}z = Z[{n}]")
+            else:
+                lines.append(f"    n{n}o = 0; n{n}z = ALL")
+            lines += ["    " + c for c in self._fault(net, f"n{n}")]
+        for e in comb:
+            code, (o, z) = _gate(e.op, [self._var(i) for i in e.inputs], tmp, self.pulls.get(e.output, 1))
+            n = self.index[e.output]
+            lines += ["    " + c for c in code]
+            lines.append(f"    n{n}o = {o}; n{n}z = {z}")
+            lines += ["    " + c for c in self._fault(e.output, f"n{n}")]
+        lines += [f"    O[{n}] = n{n}o; Z[{n}] = n{n}z" for n in range(len(self.nets))]
+        return self._exec(lines, "comb")
+
+    def _compile_update(self):
+        # all storage elements sample their inputs first, then the new state is stored
+        lines = ["def update(O, Z, QO, QZ, PO, PZ):"]
+        for num, e in enumerate(self.storage):
+            co, cz = self._src(e.inputs[0])
+            if e.op == "LATCH":
+                lines.append(f"    load = {co}; maybe = ~({co} | {cz}) & ALL")
+            else:
+                lines.append(f"    load = PZ[{num}] & {co}; maybe = ~(PO[{num}] | {cz} | load) & ALL")
+            lines.append(f"    PO[{num}] = {co}; PZ[{num}] = {cz}")
+            lines.append(f"    qo = QO[{num}]; qz = QZ[{num}]")
+            if e.op == "JKFF":
+                jo, jz = self._src(e.inputs[1])
+                ko, kz = self._src(e.inputs[2])
+                # J if Q=0, ~K if Q=1
+                lines.append(f"    do = (qz & {jo}) | (qo & {kz}) | ({jo} & {kz}); dz = (qz & {jz}) | (qo & {ko}) | ({jz} & {ko})")
+                rest = e.inputs[3:]
+            else:
+                do, dz = self._src(e.inputs[1])
+                lines.append(f"    do = {do}; dz = {dz}")
+                rest = e.inputs[2:]
+            # uncertain load keeps only the bits on which the old and new state agree
+            lines += [
+                f"    q{num}o = ((qo & ~load) | (do & load)) & (~maybe | do)",
+                f"    q{num}z = ((qz & ~load) | (dz & load)) & (~maybe | dz)",
+            ]
+            if rest:
+                so, sz = self._src(rest[0])
+                lines.append(f"    q{num}o |= {so}; q{num}z &= {sz}")
+            if len(rest) > 1:
+                ro, rz = self._src(rest[1])
+                lines.append(f"    q{num}z |= {ro} & {sz}; q{num}o &= {rz} | {so}")
+        lines.append("    changed = False")
+        for num in range(len(self.storage)):
+            lines += [
+                f"    if q{num}o != QO[{num}] or q{num}z != QZ[{num}]:",
+                f"        QO[{num}] = q{num}o; QZ[{num}] = q{num}z; changed = True",
+            ]
+        lines.append("    return changed")
+        return self._exec(lines, "update")
+
+    def _src(self, net):
+        if net == "0":
+            return ("0", "ALL")
+        if net == "1":
+            return ("ALL", "0")
+        n = self.index[net]
+        return (f"O[{n}]", f"Z[{n}]")
+
+    def _exec(self, lines, name):
+        exec("\n".join(lines), self._ns)
+        return self._ns[name]
+
+    def reset(self):
+        # all nets unknown, storage elements in unknown state
+        self.O = [0] * len(self.nets)
+        self.Z = [0] * len(self.nets)
+        self.QO = [0] * len(self.storage)
+        self.QZ = [0] * len(self.storage)
+        self.PO = [0] * len(self.storage)
+        self.PZ = [0] * len(self.storage)
+
+    def save(self):
+        return [list(a) for a in (self.O, self.Z, self.QO, self.QZ, self.PO, self.PZ)]
+
+    def restore(self, state):
+        self.O, self.Z, self.QO, self.QZ, self.PO, self.PZ = [list(a) for a in state]
+
+    def set_inputs(self, values):
+        # values: (one, zero) for each input pin
+        for pin, (o, z) in zip(self.inputs, values):
+            n = self.index[pin]
+            self.O[n] = o
+            self.Z[n] = z
+
+    def step(self, values):
+        # apply inputs and let the circuit settle (storage elements may clock each other)
+        self.set_inputs(values)
+        for i in range(2 * len(self.storage) + 2):
+            self._comb(self.O, self.Z, self.QO, self.QZ)
+            if not self.storage or not self._update(self.O, self.Z, self.QO, self.QZ, self.PO, self.PZ):
+                break
+        else:
+            raise SimulationError(f"{self.model.part.name} model doesn't settle")
+        return self.read(self.outputs)
+
+    def read(self, nets):
+        return [(self.O[self.index[n]], self.Z[self.index[n]]) for n in nets]
+
+
+# ------------------------------------------------------------------------
+def lane_values(rows):
+    # per-position (one, zero) values for a list of 0/1 rows, row n in lane n
+    values = []
+    for pos in range(len(rows[0]) if rows else 0):
+        one = 0
+        for n, row in enumerate(rows):
+            if row[pos]:
+                one |= 1 << n
+        values.append(one)
+    full = (1 << len(rows)) - 1
+    return [(one, full & ~one) for one in values]
+
+
+def lane_bit(value, lane):
+    # 1, 0 or None (unknown) in a given lane
+    o, z = value
+    if (o >> lane) & 1:
+        return 1
+    if (z >> lane) & 1:
+        return 0
+    return None
+
+
+# ------------------------------------------------------------------------
+def simulate(model, test, vectors=None, lanes=4096):
+    # Model outputs (1, 0 or None for unknown) for each test vector
+    vectors = iter(vectors if vectors is not None else test.iter_vectors())
+    if not model.sequential:
+        # combinational: vectors evaluated in batches, one vector per lane
+        sim = model.simulator(test.inputs, test.outputs, lanes=lanes, cfgnum=test.cfgnum)
+        while batch := list(islice(vectors, lanes)):
+            outputs = sim.step(lane_values([v.input for v in batch]))
+            for n in range(len(batch)):
+                yield [lane_bit(o, n) for o in outputs]
+        return
+
+    sim = model.simulator(test.inputs, test.outputs, lanes=1, cfgnum=test.cfgnum)
+    for v in vectors:
+        outputs = sim.step([(1, 0) if x else (0, 1) for x in v.input])
+        yield [lane_bit(o, 0) for o in outputs]
+
+
+# ------------------------------------------------------------------------
+def expected(model, test):
+    # test rows with outputs computed by the model, vectors with unknown outputs are not checked
+    vectors, sim_vectors = tee(test.iter_vectors())
+    for v, out in zip(vectors, simulate(model, test, sim_vectors)):
+        yield [v.input, None if None in out else out]
+
+
+# ------------------------------------------------------------------------
+class Discrepancy:
+    def __init__(self, test, vector_num, pin, expected, model):
+        self.test = test
+        self.vector_num = vector_num
+        self.pin = pin
+        self.expected = expected
+        self.model = model
+
+    def __str__(self):
+        model = "X" if self.model is None else self.model
+        name = self.test.part.pins[self.pin].name
+        return f"{self.test.name}: vector {self.vector_num}: {name} (pin {self.pin}) is {int(self.expected)} in the test, {model} in the model"
+
+
+def verify(model, test):
+    # Compare test vectors expected outputs against the model
+    result = []
+    vectors, sim_vectors = tee(test.iter_vectors())
+    for num, (v, out) in enumerate(zip(vectors, simulate(model, test, sim_vectors))):
+        if not v.output:
+            continue
+        for pin, expected, m in zip(test.outputs, v.output, out):
+            if m is None or m != bool(expected):
+                result.append(Discrepancy(test, num, pin, expected, m))
+    return result
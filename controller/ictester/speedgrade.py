@@ -0,0 +1,84 @@
+from struct import unpack
+
+CPU_CYCLE_NS = 50  # 20MHz
+# Dout is read (IN) step+1 CPU cycles after ~CAS falls (end of CBI). IN returns the pin value
+# latched half a cycle earlier (AVR pin synchronizer), so Dout is sampled step+0.5 cycles after ~CAS.
+SAMPLE_LATCH_CYCLES = 0.5
+# step closest to the march tests read (3 NOPs after ~CAS)
+MARCH_READ_STEP = 2
+
+STEPS = 8
+
+# reported when the part passes at the shortest sampling time, too fast for the tester to grade
+UNRESOLVABLE = "unresolvable"
+
+# speed grade: (name, tRAC [ns], tCAC [ns])
+GRADES = {
+    "4164": [("-10", 100, 50), ("-12", 120, 60), ("-15", 150, 75), ("-20", 200, 100), ("-25", 250, 125)],
+    "41256": [("-80", 80, 40), ("-10", 100, 50), ("-12", 120, 60), ("-15", 150, 75), ("-20", 200, 100)],
+}
+
+
+# ------------------------------------------------------------------------
+def sample_time(step):
+    # ~CAS to Dout sampling time [ns] for the given step
+    return round((step + 1 - SAMPLE_LATCH_CYCLES) * CPU_CYCLE_NS)
+
+
+# ------------------------------------------------------------------------
+class SpeedBin:
+    # Tester runs with RAS-to-CAS delay longer than tRCD(max), so the access is CAS-limited:
+    # actual tCAC is longer than the last failing sampling time, and not longer than the first passing one.
+    # Resolution is one CPU cycle, sampling times fall on the 75ns and 125ns grade boundaries.
+
+    def __init__(self, device, payload):
+        self.device = device
+        self.failed_reads = list(unpack(f"<{STEPS}I", payload))
+
+    @property
+    def fastest_delay(self):
+        for step, fails in enumerate(self.failed_reads):
+            if not fails:
+                return step
+        return None
+
+    @property
+    def access_time(self):
+        # upper bound of tCAC [ns]
+        step = self.fastest_delay
+        return None if step is None else sample_time(step)
+
+    @property
+    def access_time_min(self):
+        # lower bound of tCAC [ns] (exclusive)
+        step = self.fastest_delay
+        return None if not step else sample_time(step - 1)
+
+    @property
+    def stable(self):
+        # memory passing at some delay should pass at all longer delays too
+        step = self.fastest_delay
+        return step is not None and not any(self.failed_reads[step:])
+
+    @property
+    def grade(self):
+        # Fastest grade this part is sure to meet (it may meet a faster one), None if it's slower than any grade.
+        # UNRESOLVABLE if the measurement can't tell: part passes at the shortest sampling time,
+        # or its access time range spans the slowest grade limit.
+        if self.resolution_limited:
+            return UNRESOLVABLE
+        t = self.access_time
+        if t is None:
+            return None
+        grades = GRADES[self.device]
+        for name, t_rac, t_cac in grades:
+            if t <= t_cac:
+                return name
+        if self.access_time_min < grades[-1][2]:
+            return UNRESOLVABLE
+        return None
+
+    @property
+    def resolution_limited(self):
+        # part passes even at the shortest sampling time, it may be faster than reported
+        return self.fastest_delay == 0
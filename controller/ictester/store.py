@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import queue
+import sqlite3
+import argparse
+import threading
+import statistics
+
+'''
+Test results database.
+
+Result records of each test session (see report.py) are stored in a local SQLite database:
+one row in "runs" for each session, a row in "tests" for each test run, and "currents"
+with supply current measurements of the session. Records are written by a background thread
+in batches (WAL journal, one transaction per batch), so storing results never holds up testing.
+
+ictester-db queries the database: recent runs, yield, failure Pareto, supply current distributions
+and tester throughput.
+'''
+
+DB_FILE = os.path.join(os.path.expanduser("~"), ".ictester", "results.db")
+BATCH_SIZE = 64  # records written in a single transaction...
+FLUSH_INTERVAL = 1.0  # ...or after this many seconds without new records
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    part TEXT NOT NULL,
+    lot TEXT,
+    tester TEXT,
+    firmware INTEGER,
+    started TEXT,
+    finished TEXT,
+    result TEXT,
+    exit_code INTEGER,
+    vbus_idle REAL,
+    vbus_min REAL,
+    bytes_sent INTEGER,
+    bytes_received INTEGER
+);
+CREATE TABLE IF NOT EXISTS tests (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    seq INTEGER NOT NULL,
+    number INTEGER,
+    name TEXT NOT NULL,
+    profile TEXT,
+    type TEXT,
+    vectors INTEGER,
+    loops INTEGER,
+    result TEXT,
+    elapsed REAL,
+    failed_loop INTEGER,
+    failed_vector INTEGER,
+    failed_row INTEGER,
+    failed_column INTEGER,
+    failed_step TEXT
+);
+CREATE TABLE IF NOT EXISTS currents (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    kind TEXT NOT NULL,
+    ivcc REAL,
+    ignd REAL,
+    idelta REAL
+);
+CREATE INDEX IF NOT EXISTS runs_part ON runs(part, lot);
+CREATE INDEX IF NOT EXISTS tests_run ON tests(run_id);
+CREATE INDEX IF NOT EXISTS currents_run ON currents(run_id);
+"""
+
+
+# ------------------------------------------------------------------------
+def connect(path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.executescript(SCHEMA)
+    return db
+
+
+# ------------------------------------------------------------------------
+class Store:
+    # result records sink (a Report listener), writing to the database in a background thread
+
+    def __init__(self, path=DB_FILE, lot=None):
+        self.path = path
+        self.lot = lot
+        self.queue = queue.Queue()
+        self.error = None
+        self.run_id = None
+        self.seq = 0
+        # connect here, so that a database that can't be opened is reported right away
+        connect(path).close()
+        self.thread = threading.Thread(target=self.writer, name="results-db", daemon=True)
+        self.thread.start()
+
+    def __call__(self, record):
+        self.queue.put(record)
+
+    def close(self):
+        # write all pending records, returns an error that stopped the writer (if any)
+        self.queue.put(None)
+        self.thread.join()
+        return self.error
+
+    def writer(self):
+        db = connect(self.path)
+        pending = 0
+        try:
+            while True:
+                try:
+                    record = self.queue.get(timeout=FLUSH_INTERVAL if pending else None)
+                except queue.Empty:
+                    db.commit()
+                    pending = 0
+                    continue
+                if record is None:
+                    break
+                self.write(db, record)
+                pending += 1
+                if pending >= BATCH_SIZE:
+                    db.commit()
+                    pending = 0
+            db.commit()
+        except sqlite3.Error as e:
+            self.error = e
+        finally:
+            db.close()
+
+    def write(self, db, r):
+        kind = r["record"]
+        if kind == "part":
+            tester = r["tester"]
+            cur = db.execute(
+                "INSERT INTO runs (part, lot, tester, firmware, started) VALUES (?, ?, ?, ?, ?)",
+                (r["part"], self.lot, tester["device"], tester["firmware_version"], r["start"]))
+            self.run_id = cur.lastrowid
+            self.seq = 0
+        elif self.run_id is None:
+            return  # session without a tested part (autodetection only)
+        elif kind == "powerup":
+            db.execute("UPDATE runs SET vbus_idle = ?, result = ? WHERE id = ?",
+                (r["vbus"], None if r["result"] == "OK" else "OVERCURRENT", self.run_id))
+        elif kind == "test":
+            self.seq += 1
+            db.execute(
+                "INSERT INTO tests VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.run_id, self.seq, r["number"], r["name"], r["profile"], r["type"], r["vectors"], r["loops"],
+                r["result"], r["elapsed"], r.get("failed_loop"), r.get("failed_vector_num"),
+                r.get("failed_row"), r.get("failed_column"), r.get("failed_march_step")))
+        elif kind == "summary":
+            db.execute(
+                "UPDATE runs SET finished = ?, result = ?, exit_code = ?, vbus_min = ?, bytes_sent = ?, bytes_received = ? WHERE id = ?",
+                (r["end"], r["result"], r["exit_code"], r["vbus_min"],
+                r["transport"]["bytes_sent"], r["transport"]["bytes_received"], self.run_id))
+            db.executemany("INSERT INTO currents VALUES (?, ?, ?, ?, ?)", [
+                (self.run_id, name, m["ivcc"], m["ignd"], m["idelta"]) for name, m in r["currents"].items()
+            ])
+        elif kind == "error":
+            db.execute("UPDATE runs SET result = ? WHERE id = ? AND result IS NULL", ("ERROR: " + r["message"], self.run_id))
+
+
+# ------------------------------------------------------------------------
+def where(args, table="runs"):
+    # SQL condition and parameters for common query filters
+    cond = []
+    params = []
+    if args.part:
+        cond.append(f"{table}.part = ?")
+        params.append(args.part.upper())
+    if args.lot:
+        cond.append(f"{table}.lot = ?")
+        params.append(args.lot)
+    if args.since:
+        cond.append(f"{table}.started >= ?")
+        params.append(args.since)
+    return (" WHERE " + " AND ".join(cond) if cond else ""), params
+
+
+def print_table(header, rows):
+    rows = [[("" if v is None else f"{v:.2f}" if isinstance(v, float) else str(v)) for v in row] for row in rows]
+    widths = [max(len(h), *(len(r[i]) for r in rows)) if rows else len(h) for i, h in enumerate(header)]
+    print("  ".join(f"{h:<{w}}" for h, w in zip(header, widths)))
+    for row in rows:
+        print("  ".join(f"{v:<{w}}" for v, w in zip(row, widths)))
+
+
+# ------------------------------------------------------------------------
+def cmd_runs(db, args):
+    cond, params = where(args)
+    rows = db.execute(
+        f"SELECT id, started, part, lot, tester, result, vbus_min FROM runs{cond} ORDER BY id DESC LIMIT ?",
+        params + [args.count]).fetchall()
+    print_table(["Run", "Start", "Part", "Lot", "Tester", "Result", "Vbus min"], rows)
+
+
+def cmd_yield(db, args):
+    cond, params = where(args)
+    group = "part, lot" if args.by_lot else "part"
+    rows = db.execute(
+        f"SELECT {group}, COUNT(*), SUM(exit_code = 0), SUM(exit_code = 1), SUM(exit_code NOT IN (0, 1) OR exit_code IS NULL) "
+        f"FROM runs{cond} GROUP BY {group} ORDER BY {group}", params).fetchall()
+    result = []
+    for row in rows:
+        total, passed = row[-4], row[-3]
+        result.append([*row, 100 * passed / total if total else None])
+    header = ["Part", "Lot"] if args.by_lot else ["Part"]
+    print_table(header + ["Runs", "Passed", "Failed", "Other", "Yield %"], result)
+
+
+def cmd_pareto(db, args):
+    cond, params = where(args)
+    columns = "runs.part, tests.name" + (", tests.failed_vector" if args.vectors else "")
+    rows = db.execute(
+        f"SELECT {columns}, COUNT(*) FROM tests JOIN runs ON runs.id = tests.run_id{cond}"
+        f"{' AND' if cond else ' WHERE'} tests.result = 'FAIL' "
+        f"GROUP BY {columns} ORDER BY COUNT(*) DESC", params).fetchall()
+    total = sum(r[-1] for r in rows)
+    cumulative = 0
+    result = []
+    for row in rows:
+        cumulative += row[-1]
+        result.append([*row, 100 * row[-1] / total, 100 * cumulative / total])
+    header = ["Part", "Test"] + (["Vector"] if args.vectors else []) + ["Failures", "%", "Cumulative %"]
+    print_table(header, result)
+
+
+def cmd_currents(db, args):
+    cond, params = where(args)
+    rows = db.execute(
+        f"SELECT runs.part, currents.kind, currents.ivcc, currents.ignd FROM currents JOIN runs ON runs.id = currents.run_id{cond} "
+        f"ORDER BY runs.part, currents.kind", params).fetchall()
+    values = {}
+    for part, kind, ivcc, ignd in rows:
+        # the measurement a point was selected by: Ivcc for *_ivcc, Ignd for *_ignd
+        values.setdefault((part, kind), []).append(ivcc if kind.endswith("ivcc") else ignd)
+    result = []
+    for (part, kind), v in values.items():
+        q = statistics.quantiles(v, n=10) if len(v) > 1 else [v[0]] * 9
+        result.append([part, kind, len(v), min(v), q[0], statistics.median(v), q[-1], max(v), statistics.fmean(v)])
+    print_table(["Part", "Measurement [mA]", "Runs", "Min", "P10", "Median", "P90", "Max", "Mean"], result)
+
+
+def cmd_throughput(db, args):
+    cond, params = where(args)
+    bucket = {"hour": "%Y-%m-%d %H:00", "day": "%Y-%m-%d"}[args.by]
+    rows = db.execute(
+        f"SELECT strftime('{bucket}', started) AS period, tester, COUNT(*), "
+        f"AVG((julianday(finished) - julianday(started)) * 86400), SUM(exit_code = 0) "
+        f"FROM runs{cond} GROUP BY period, tester ORDER BY period, tester", params).fetchall()
+    print_table(["Period", "Tester", "Chips", "Avg session [s]", "Passed"], rows)
+
+
+# ------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description='Query ictester results database')
+    parser.add_argument('--db', default=DB_FILE, help=f'Results database (default: {DB_FILE})')
+    parser.add_argument('-p', '--part', help='Only runs of the given part')
+    parser.add_argument('--lot', help='Only runs of the given lot')
+    parser.add_argument('--since', metavar='DATE', help='Only runs started at or after DATE (YYYY-MM-DD[THH:MM:SS])')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('runs', help='List recent test sessions')
+    p.add_argument('-n', '--count', type=int, default=20, help='Number of sessions (default: 20)')
+    p.set_defaults(func=cmd_runs)
+
+    p = sub.add_parser('yield', help='Yield (parts passing all tests) per part')
+    p.add_argument('--by-lot', action="store_true", help='Yield per part and lot')
+    p.set_defaults(func=cmd_yield)
+
+    p = sub.add_parser('pareto', help='Failure Pareto: failing tests, most frequent first')
+    p.add_argument('--vectors', action="store_true", help='Break failures down by the failing vector')
+    p.set_defaults(func=cmd_pareto)
+
+    p = sub.add_parser('currents', help='Supply current measurement distributions per part')
+    p.set_defaults(func=cmd_currents)
+
+    p = sub.add_parser('throughput', help='Chips tested per period and tester')
+    p.add_argument('--by', choices=["hour", "day"], default="day", help='Period (default: day)')
+    p.set_defaults(func=cmd_throughput)
+
+    args = parser.parse_args()
+    if not os.path.exists(args.db):
+        print(f"Results database {args.db} does not exist")
+        return 1
+    try:
+        db = connect(args.db)
+        args.func(db, args)
+    except sqlite3.Error as e:
+        print(f"Database error: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,18 @@
+import copy
 import time
 import math
 import logging
 from enum import Enum
+from itertools import islice
 from struct import (pack, unpack)
 from ictester.binvec import BV
 from ictester.command import CmdType
-from ictester.response import (Response, RespType)
+from ictester.response import (Response, RespType, DataType, ICTesterException)
+from ictester.trace import CurrentTrace
+from ictester.failmap import FailMap
+from ictester.march import MARCH_C_MINUS
+from ictester.speedgrade import SpeedBin
+from ictester.pulse import PulseStats
 
 logger = logging.getLogger('ictester')
 
@@ -16,6 +23,11 @@ TestType = Enum("TestType", names=[
         ("UNIVIB", 3),
     ]
 )
+RunFlag = Enum("RunFlag", names=[
+        ("ITRACE", 1),
+        ("NO_IMEASURE", 2),
+    ]
+)
 DRAMType = Enum("DRAMType", names=[
         ("DRAM_4164", 1),
         ("DRAM_41256", 2),
@@ -26,6 +38,11 @@ DRAMTestType = Enum("DRAMTestType", names=[
         ("MARCH_C_MINUS_RMW", 1),
         ("MARCH_C_MINUS_RW", 2),
         ("MARCH_C_MINUS_PAGE", 3),
+        ("SPEED_BIN", 4),
+    ]
+)
+DRAMFlag = Enum("DRAMFlag", names=[
+        ("FAILMAP", 1),
     ]
 )
 UnivibType = Enum("UnivibType", names=[
@@ -42,6 +59,8 @@ UnivibTestType = Enum("UnivibTestType", names=[
         ("CLEAR", 3),
         ("NO_CROSS_TRIGGER", 4),
         ("CLEAR_TRIGGER", 5),
+        ("PULSE_WIDTH", 6),
+        ("RETRIGGER_PULSE_WIDTH", 7),
     ]
 )
 
@@ -89,6 +108,7 @@ class Test:
         self.part = None
         self.elapsed = None
         self.read_delay_us = read_delay_us
+        self.itrace = None
 
     def attach_part(self, part):
         self.part = part
@@ -96,6 +116,14 @@ class Test:
     def set_delay(self, read_delay_us):
         self.read_delay_us = read_delay_us
 
+    def copy(self):
+        # test instance for a single session: own settings and results, test data shared with this one
+        return copy.copy(self)
+
+    @property
+    def vector_count(self):
+        return len(self.vectors)
+
     def __bytes__(self):
         data = bytes([self.cfgnum, self.type.value])
 
@@ -104,31 +132,66 @@ class Test:
 
         return data
 
+    def prepare(self):
+        # compile and encode test data ahead of setup(), may be called from another thread
+        pass
+
     def setup(self, tr):
         logger.log(20, "---- TEST SETUP -----------------------------------")
         data = bytes([CmdType.TEST_SETUP.value]) + bytes(self)
         tr.send(data)
         resp = Response(tr)
+        if resp.response == RespType.OK and self.part:
+            if resp.payload[0]:
+                self.part.relay_switches += 1
+            else:
+                self.part.relay_skips += 1
 
-    def run(self, tr, loops):
+    def handle_data(self, payload):
+        data_type = DataType(payload[0])
+        if data_type == DataType.ITRACE:
+            self.itrace.add_frame(payload[1:])
+
+    def run(self, tr, loops, trace=False, imeasure=True):
         logger.log(20, "---- RUN ------------------------------------------")
         assert 1 <= loops <= 0xffff
 
-        data = bytes([CmdType.RUN.value]) + pack("<H", loops)
+        flags = 0
+        self.itrace = None
+        if trace:
+            flags |= RunFlag.ITRACE.value
+            self.itrace = CurrentTrace()
+        elif not imeasure:
+            flags |= RunFlag.NO_IMEASURE.value
+
+        data = bytes([CmdType.RUN.value]) + pack("<HB", loops, flags)
         tr.send(data)
 
         start = time.time()
         resp = Response(tr)
+        while resp.response == RespType.DATA:
+            self.handle_data(resp.payload)
+            resp = Response(tr)
         self.elapsed = time.time() - start
 
         return resp
 
 # ------------------------------------------------------------------------
 class TestDRAM(Test):
-    def __init__(self, name, chip_type, chip_test_type, loops=1, cfgnum=0):
+
+    ADDRESS_SPACE = {
+        DRAMType.DRAM_4164: 256,
+        DRAMType.DRAM_41256: 512,
+    }
+
+    def __init__(self, name, chip_type, chip_test_type, loops=1, cfgnum=0, failmap=False, algorithm=MARCH_C_MINUS):
         super(TestDRAM, self).__init__(TestType.DRAM, name, loops, cfgnum)
         self.chip_test_type = chip_test_type
         self.chip_type = chip_type
+        self.algorithm = algorithm
+        self.failmap_enabled = failmap
+        self.failmap = None
+        self.speed_bin = None
         self.vectors = []
 
     @property
@@ -137,26 +200,48 @@ class TestDRAM(Test):
 
     def __bytes__(self):
         data = super().__bytes__()
-        data += bytes([self.chip_type.value, self.chip_test_type.value])
+        flags = DRAMFlag.FAILMAP.value if self.failmap_enabled else 0
+        data += bytes([self.chip_type.value, self.chip_test_type.value, flags])
+        data += bytes(self.algorithm)
 
         logger.log(20, "DRAM chip: %s, test: %s", self.chip_type.name, self.chip_test_type.name)
+        logger.log(20, "Failure map: %s", self.failmap_enabled)
+        logger.log(20, "March algorithm: %s: %s", self.algorithm.name, self.algorithm)
 
         return data
 
-    def run(self, tr, loops):
-        resp = super().run(tr, loops)
+    def handle_data(self, payload):
+        if DataType(payload[0]) == DataType.DRAM_FAILMAP:
+            self.failmap.add_frame(payload[1:])
+        else:
+            super().handle_data(payload)
+
+    def run(self, tr, loops, trace=False, imeasure=True):
+        self.failmap = None
+        self.speed_bin = None
+        if self.failmap_enabled:
+            page_mode = self.chip_test_type == DRAMTestType.MARCH_C_MINUS_PAGE
+            self.failmap = FailMap(self.ADDRESS_SPACE[self.chip_type], page_mode, self.algorithm)
+
+        resp = super().run(tr, loops, trace, imeasure)
 
         if resp.response == RespType.FAIL:
-            self.failed_row, self.failed_column, self.failed_march_step = unpack("<HHB", resp.payload)
+            self.failed_row, self.failed_column, self.failed_march_step, self.failed_reads, overflow = unpack("<HHBIB", resp.payload)
+            if self.failmap:
+                self.failmap.overflow = bool(overflow)
+        elif resp.response == RespType.PASS and self.chip_test_type == DRAMTestType.SPEED_BIN:
+            self.speed_bin = SpeedBin(self.chip_type.name.removeprefix("DRAM_"), resp.payload)
 
         return resp
 
 # ------------------------------------------------------------------------
 class TestUnivib(Test):
-    def __init__(self, name, chip_type, chip_test_type, loops=1024, cfgnum=0):
+    def __init__(self, name, chip_type, chip_test_type, loops=1024, cfgnum=0, limits=None):
         super(TestUnivib, self).__init__(TestType.UNIVIB, name, loops, cfgnum)
         self.chip_type = chip_type
         self.chip_test_type = chip_test_type
+        self.limits = limits  # (min, max) acceptable pulse width [ns]
+        self.pulse = None
         self.vectors = []
 
     @property
@@ -171,20 +256,44 @@ class TestUnivib(Test):
 
         return data
 
+    def run(self, tr, loops, trace=False, imeasure=True):
+        self.pulse = None
+        resp = super().run(tr, loops, trace, imeasure)
+
+        if resp.response == RespType.PASS and self.chip_test_type in (UnivibTestType.PULSE_WIDTH, UnivibTestType.RETRIGGER_PULSE_WIDTH):
+            self.pulse = PulseStats.unpack(resp.payload)
+            # tester only measures, pulse width limits are checked here
+            if self.limits and not self.pulse.within(self.limits):
+                resp.response = RespType.FAIL
+
+        return resp
+
 
 # ------------------------------------------------------------------------
 class TestLogic(Test):
 
     MAX_TEST_PARAMS = 2
-    MAX_VECTORS = 1024
+    FAIL_CONTEXT = 3  # vectors preceding the failed one kept for reporting
 
-    def __init__(self, name, inputs, outputs, params=[], body=[], loops=1024, cfgnum=0, read_delay_us=0):
+    def __init__(self, name, inputs, outputs, params=[], body=[], loops=1024, cfgnum=0, read_delay_us=0, window_prefix=None, window_size=None, vector_file=None):
         super(TestLogic, self).__init__(TestType.LOGIC, name, loops, cfgnum, read_delay_us)
         self.params = params + [0] * (self.MAX_TEST_PARAMS - len(params))
         self.inputs = inputs
         self.outputs = outputs
         self._body = body
         self._vectors = None
+        self._vector_count = None
+        # Vectors that don't fit in the tester memory are run in windows.
+        # Each window after the first one starts with window_prefix, which restores DUT state:
+        # body-like list of vectors, or a callable returning one for the previous window's vectors
+        self.window_prefix = window_prefix
+        self.window_size = window_size
+        self._windows = None
+        self._prepared = None
+        # vectors from a binary vector file are sent to the tester without decoding
+        self.vector_file = vector_file
+        if vector_file:
+            self._body = vector_file.rows
 
     @property
     def pins(self):
@@ -199,7 +308,11 @@ class TestLogic(Test):
 
     @property
     def body(self):
-        for v in self._body_data:
+        return self.expand(self._body_data)
+
+    @staticmethod
+    def expand(rows):
+        for v in rows:
             i = v[0]
             o = v[1]
             if set(['+', '-']).intersection(i):
@@ -218,6 +331,65 @@ class TestLogic(Test):
             self._vectors = [TestVector(v, self) for v in self.body]
         return self._vectors
 
+    @property
+    def vector_count(self):
+        if self._vector_count is None:
+            if self.vector_file:
+                self._vector_count = self.vector_file.count
+            elif callable(self._body):
+                # don't keep vectors from a body generator around, they may not fit in memory
+                self._vector_count = sum(1 for v in self.body)
+            else:
+                self._vector_count = len(self.vectors)
+        return self._vector_count
+
+    def copy(self):
+        # compile vectors here, so that all copies share them
+        if not callable(self._body):
+            self.vectors
+        self.vector_count
+        return super().copy()
+
+    def iter_vectors(self):
+        if callable(self._body):
+            return (TestVector(v, self) for v in self.body)
+        else:
+            return iter(self.vectors)
+
+    @property
+    def windowed(self):
+        return self.vector_count > (self.window_size or self.part.max_vectors)
+
+    def prefix(self, previous):
+        rows = self.window_prefix(previous) if callable(self.window_prefix) else self.window_prefix
+        # prefix vectors only restore DUT state, outputs are not checked
+        return [TestVector([v[0], None], self) for v in self.expand(rows or [])]
+
+    def windows(self):
+        # yield (first vector number, prefix vectors, window vectors), vectors are generated lazily.
+        # Windows of file-based tests are VectorBlocks read straight from the file.
+        size = self.window_size or self.part.max_vectors
+        reader = self.vector_file.reader() if self.vector_file else None
+        vectors = self.iter_vectors() if not reader else None
+        start = 0
+        window = None
+        while True:
+            prefix = self.prefix(self.window_list(window)) if window else []
+            assert len(prefix) < size
+            if reader:
+                window = reader.read(size - len(prefix))
+            else:
+                window = list(islice(vectors, size - len(prefix)))
+            if not len(window):
+                return
+            yield start, prefix, window
+            start += len(window)
+
+    def window_list(self, window):
+        if isinstance(window, list):
+            return window
+        return [TestVector(v, self) for v in window.rows()]
+
     def __bytes__(self):
         data = super().__bytes__()
         data += round(self.read_delay_us/0.2).to_bytes(2, 'little')
@@ -234,43 +406,98 @@ class TestLogic(Test):
 
         return data
 
+    def prepare(self):
+        self._windows = self.windows()
+        self._prepared = self.encode_window()
+
+    def encode_window(self):
+        # (first vector number, prefix vectors, window vectors, vector data) of the next window, None if there are no more
+        try:
+            start, prefix, window = next(self._windows)
+        except StopIteration:
+            return None
+        if isinstance(window, list):
+            data = b''.join(bytes(v) for v in prefix + window)
+        else:
+            data = b''.join(bytes(v) for v in prefix) + bytes(window)
+        return start, prefix, window, data
+
     def setup(self, tr):
+        if self._windows is None:
+            self.prepare()
+        self.load_window(tr)
+
+    def load_window(self, tr):
+        # returns False if there are no more windows to run
+        prepared, self._prepared = self._prepared, None
+        if prepared is None:
+            prepared = self.encode_window()
+        if prepared is None:
+            return False
+        self.window_start, self.window_prefix_vectors, self.window_vectors, data = prepared
+
         super().setup(tr)
 
+        prefix = self.window_prefix_vectors
+        window = self.window_vectors
         if logger.isEnabledFor(20):
             logger.log(20, "---- VECTORS LOAD ---------------------------------")
-            logger.log(20, "Test vectors (%s)", len(self.vectors))
-            for v in self.vectors:
-                logger.log(19, v)
-
-        assert len(self.vectors) <= TestLogic.MAX_VECTORS
+            logger.log(20, "Test vectors (%s) from: %s, state restore prefix: %s", len(prefix) + len(window), self.window_start, len(prefix))
+            if isinstance(window, list):
+                for v in prefix + window:
+                    logger.log(19, v)
 
-        # split vectors into chunks that fit in tester's buffer
-        buf_size = 2048
-        v_per_chunk = buf_size // math.ceil(self.part.pincount/8) - 2
-        vector_chunks = [self.vectors[i:i+v_per_chunk] for i in range(0, len(self.vectors), v_per_chunk)]
+        count = len(prefix) + len(window)
+        assert count <= self.part.max_vectors
 
-        for vc in vector_chunks:
-            logger.log(20, "Binary vectors chunk sent (%s)", len(vc))
-            data = bytes([CmdType.VECTORS_LOAD.value]) + pack("<H", len(vc))
-            for v in vc:
-                data += bytes(v)
+        # tester decodes vectors while receiving them, so they're not limited by its buffer size
+        vector_size = math.ceil(self.part.pincount/8)
+        v_per_chunk = (0xffff - 3) // vector_size
 
-            tr.send(data)
+        for first in range(0, count, v_per_chunk):
+            chunk = data[first*vector_size:(first+v_per_chunk)*vector_size]
+            logger.log(20, "Binary vectors chunk sent (%s)", len(chunk) // vector_size)
+            tr.send(bytes([CmdType.VECTORS_LOAD.value]) + pack("<H", len(chunk) // vector_size) + chunk)
 
             resp = Response(tr)
-
-    def run(self, tr, loops):
-        resp = super().run(tr, loops)
+            if resp.response != RespType.OK:
+                raise ICTesterException(f"Tester did not accept test vectors, got: {resp.response.name}")
+
+        return True
+
+    def run(self, tr, loops, trace=False, imeasure=True):
+        # windows are run back-to-back, each for all loops, as one test
+        elapsed = 0
+        vectors_run = 0
+        itrace = CurrentTrace() if trace else None
+        while True:
+            resp = super().run(tr, loops, trace, imeasure)
+            elapsed += self.elapsed
+            vectors_run += len(self.window_prefix_vectors) + len(self.window_vectors)
+            if itrace:
+                itrace.points.extend(self.itrace.points)
+            if resp.response != RespType.PASS or not self.load_window(tr):
+                break
+        # next setup() starts from the first window again
+        self._windows = None
+        self.elapsed = elapsed
+        self.itrace = itrace
 
         if resp.response == RespType.FAIL:
             self.failed_loop = unpack("<H", resp.payload[0:2])[0]
-            self.failed_vector_num = unpack("<H", resp.payload[2:4])[0]
+            # prefix vectors are never checked, so tester can't fail on them
+            failed_num = unpack("<H", resp.payload[2:4])[0] - len(self.window_prefix_vectors)
+            self.failed_vector_num = self.window_start + failed_num
+            first = max(failed_num - self.FAIL_CONTEXT, 0)
+            self.failed_context = [
+                (self.window_start + i, self.window_vectors[i] if isinstance(self.window_vectors, list) else TestVector(self.window_vectors[i], self))
+                for i in range(first, failed_num+1)
+            ]
             self.failed_pin_vector = [*BV.int(resp.payload[4], 8).reversed()]
             self.failed_pin_vector.extend([*BV.int(resp.payload[5], 8).reversed()])
             if self.part.pincount > 16:
                 self.failed_pin_vector.extend([*BV.int(resp.payload[6], 8).reversed()])
+        elif resp.response == RespType.PASS and self.elapsed:
+            logger.log(20, "Vector rate: %.0f vectors/s", vectors_run * loops / self.elapsed)
 
         return resp
-
-
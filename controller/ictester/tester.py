@@ -0,0 +1,37 @@
+import logging
+from struct import unpack
+from ictester.command import CmdType
+from ictester.response import (Response, RespType, ICTesterException)
+
+logger = logging.getLogger('ictester')
+
+PROTOCOL_VERSION = 1
+# logic test vector capacity of firmware that doesn't report it
+DEFAULT_MAX_VECTORS = 1024
+
+
+# ------------------------------------------------------------------------
+class TesterInfo:
+    def __init__(self, payload):
+        self.protocol_version, self.firmware_version, max_vectors_16, max_vectors_24 = unpack("<BBHH", payload[0:6])
+        self._max_vectors = {16: max_vectors_16, 24: max_vectors_24}
+
+    def max_vectors(self, pincount):
+        # logic test vector capacity, depends on the number of MCU ports used by the DUT
+        return self._max_vectors[16 if pincount <= 16 else 24]
+
+
+# ------------------------------------------------------------------------
+def hello(tr):
+    logger.log(20, "---- HELLO ----------------------------------------")
+    tr.send(bytes([CmdType.HELLO.value]))
+    resp = Response(tr)
+    if resp.response != RespType.HELLO:
+        raise ICTesterException(f"Tester did not respond to hello, got: {resp.response.name}")
+
+    info = TesterInfo(resp.payload)
+    logger.log(20, "Protocol version: %s, firmware version: %s", info.protocol_version, info.firmware_version)
+    if info.protocol_version != PROTOCOL_VERSION:
+        raise ICTesterException(f"Unsupported tester protocol version {info.protocol_version}, expected {PROTOCOL_VERSION}")
+
+    return info
@@ -0,0 +1,240 @@
+import math
+from ictester.test import (TestType, DRAMTestType)
+from ictester.speedgrade import STEPS
+
+'''
+Test run time model.
+
+Predicts how long a test takes on the tester, split into:
+
+    upload - test setup and vector upload over the serial link (plus command round trips)
+    fixed - part of the test run that doesn't depend on the loop count:
+            supply current measurements (one point per vector) and current trace transfer
+    per loop - firmware run loop time for all vectors: port writes, read delay
+               and output checks (unchecked vectors skip both), 2- or 3-port loop variant
+
+Model constants come from the firmware code (20MHz CPU, cycle counts of the run loop,
+INA219 conversion wait + I2C reads for each current measurement). Measured test run times
+recorded in the test history calibrate the model: fixed and per-loop parts are scaled
+with factors fitted to all recorded runs, and each test with its own history
+is additionally scaled to match its measured run times.
+'''
+
+CPU_HZ = 20e6
+LINK_SPEED = 500000  # tester serial link speed
+BYTE_BITS = 10  # 8N1
+COMMAND_LATENCY = 0.002  # host <-> tester round trip of a single command
+VECTORS_LOAD_MAX = 0xffff - 3  # vectors upload chunk size (bytes)
+
+LOOP_CYCLES = 12  # run loop overhead for each vector
+PORT_WRITE_CYCLES = 7  # DUT input port write
+PORT_CHECK_CYCLES = 8  # DUT output port check
+CHECK_BITMAP_CYCLES = 8  # checked vector lookup (tests with unchecked vectors only)
+DELAY_LOOP_CYCLES = 4  # read delay is a 4-cycle loop (0.2us units)
+
+IMEASURE_POINT_US = 580  # 280us conversion wait + 3 I2C register reads
+ITRACE_POINT_BYTES = 6
+ITRACE_CHUNK = 128  # current trace points in a single DATA frame
+DRAM_OP_US = 1.0  # single DRAM read or write in march tests
+DRAM_IMEASURE_POINTS = 20
+UNIVIB_LOOP_US = 50  # trigger, wait for the pulse and measure it
+UNIVIB_IMEASURE_POINTS = 8
+RELAY_SWITCH_US = 1500  # analog switches reconfiguration: 5 switches over ~100kHz I2C + turn-on delay
+
+TIMEOUT_FACTOR = 3  # transport deadline: estimated time multiplied by...
+TIMEOUT_MARGIN = 2.0  # ...plus a margin for the host side
+UNCALIBRATED_TIMEOUT_FACTOR = 10  # deadline for tests without recorded run times: estimated time multiplied by...
+UNCALIBRATED_TIMEOUT_MIN = 60.0  # ...but at least
+COMMAND_TIMEOUT = 5.0  # deadline for commands without a time estimate
+
+
+# ------------------------------------------------------------------------
+class Estimate:
+    def __init__(self, upload=0, fixed=0, per_loop=0):
+        self.upload = upload
+        self.fixed = fixed
+        self.per_loop = per_loop
+
+    def run_time(self, loops):
+        # test run only, as measured by Test.run()
+        return self.fixed + loops * self.per_loop
+
+    def time(self, loops):
+        return self.upload + self.run_time(loops)
+
+    def scaled(self, fixed, per_loop):
+        return Estimate(self.upload, self.fixed * fixed, self.per_loop * per_loop)
+
+
+# ------------------------------------------------------------------------
+def link_time(size):
+    return size * BYTE_BITS / LINK_SPEED
+
+
+def imeasure_time(points, trace=False, imeasure=True):
+    if not (trace or imeasure):
+        return 0
+    t = points * IMEASURE_POINT_US / 1e6
+    if trace:
+        frames = math.ceil(points / ITRACE_CHUNK)
+        t += link_time(points * ITRACE_POINT_BYTES + frames * 6) + frames * COMMAND_LATENCY
+    return t
+
+
+def _logic_vectors(test):
+    # (vector count, checked vector count)
+    count = checked = 0
+    for v in test.iter_vectors():
+        count += 1
+        checked += bool(v.output)
+    return count, checked
+
+
+def logic_loop_time(pincount, count, checked, delay):
+    # single loop of the firmware logic test run, delay in 0.2us units
+    ports = 2 if pincount <= 16 else 3
+    cycles = count * (LOOP_CYCLES + ports * PORT_WRITE_CYCLES)
+    cycles += checked * (ports * PORT_CHECK_CYCLES + delay * DELAY_LOOP_CYCLES)
+    if checked != count:
+        cycles += count * CHECK_BITMAP_CYCLES
+    return cycles / CPU_HZ
+
+
+def _logic(test, trace, imeasure):
+    part = test.part
+    vector_size = math.ceil(part.pincount / 8)
+    count, checked = _logic_vectors(test)
+    windows = max(1, math.ceil(count / part.max_vectors))
+
+    chunks = math.ceil(count * vector_size / VECTORS_LOAD_MAX) + windows
+    upload = link_time(count * vector_size + chunks * 5) + (windows + chunks) * COMMAND_LATENCY
+
+    per_loop = logic_loop_time(part.pincount, count, checked, round(test.read_delay_us / 0.2))
+    fixed = imeasure_time(count, trace, imeasure) + windows * COMMAND_LATENCY
+    return Estimate(upload, fixed, per_loop)
+
+
+def _dram(test, trace, imeasure):
+    cells = test.ADDRESS_SPACE[test.chip_type] ** 2
+    per_loop = cells * len(test.algorithm) * DRAM_OP_US / 1e6
+    if test.chip_test_type == DRAMTestType.SPEED_BIN:
+        per_loop *= STEPS
+    elif test.chip_test_type == DRAMTestType.SPEED_CHECK:
+        per_loop = cells * DRAM_OP_US / 1e6
+    fixed = imeasure_time(DRAM_IMEASURE_POINTS, trace, imeasure) + COMMAND_LATENCY
+    return Estimate(COMMAND_LATENCY, fixed, per_loop)
+
+
+def _univib(test, trace, imeasure):
+    fixed = imeasure_time(UNIVIB_IMEASURE_POINTS, trace, imeasure) + COMMAND_LATENCY
+    return Estimate(COMMAND_LATENCY, fixed, UNIVIB_LOOP_US / 1e6)
+
+
+def model_estimate(test, trace=False, imeasure=True):
+    # uncalibrated estimate
+    if test.type == TestType.LOGIC:
+        return _logic(test, trace, imeasure)
+    if test.type == TestType.DRAM:
+        return _dram(test, trace, imeasure)
+    return _univib(test, trace, imeasure)
+
+
+# ------------------------------------------------------------------------
+class Calibration:
+    # model correction fitted to run times recorded in the test history
+
+    def __init__(self, history=None, part=None, tests=()):
+        # part: the tested part, its tests and session tests (part copies, vector files, compacted tests)
+        # are used instead of the catalog ones
+        self.history = history
+        self.part = part
+        self.tests = {}
+        if part:
+            self.tests = {t.name: t for t in part.tests}
+            self.tests.update((t.name, t) for t in tests)
+        self.fixed = 1.0
+        self.per_loop = 1.0
+        if history:
+            self.fit()
+
+    def _samples(self, part, test):
+        for loops, elapsed, imeasure, trace in self.history.samples(part, test):
+            yield loops, elapsed, model_estimate(test, trace, imeasure), imeasure, trace
+
+    def _recorded_tests(self):
+        from ictester.parts import catalog
+        for part_name, tests in self.history.data.items():
+            if self.part and part_name == self.part.name:
+                part, candidates = self.part, self.tests.values()
+            else:
+                part = catalog.get(part_name)
+                if not part:
+                    continue
+                candidates = part.tests
+            for test in candidates:
+                if test.name in tests:
+                    yield part, test
+
+    def fit(self):
+        # least squares fit of: elapsed = a * fixed + b * loops * per_loop
+        sff = sfl = sll = sef = sel = 0
+        for part, test in self._recorded_tests():
+            for loops, elapsed, e, imeasure, trace in self._samples(part, test):
+                f, l = e.fixed, loops * e.per_loop
+                sff += f * f
+                sfl += f * l
+                sll += l * l
+                sef += elapsed * f
+                sel += elapsed * l
+        det = sff * sll - sfl * sfl
+        if det > 1e-12 * sff * sll and det > 0:
+            a = (sef * sll - sel * sfl) / det
+            b = (sel * sff - sef * sfl) / det
+            if a > 0 and b > 0:
+                self.fixed, self.per_loop = a, b
+                return
+        # not enough distinct runs for both factors: single factor for the whole run
+        total = sff + 2 * sfl + sll
+        if total > 0:
+            self.fixed = self.per_loop = (sef + sel) / total
+
+    def calibrated(self, test):
+        # test has its own recorded run times, its estimate is checked against measurements
+        part = test.part or self.part
+        return bool(self.history and part and self.history.samples(part, test))
+
+    def estimate(self, test, trace=False, imeasure=True):
+        e = model_estimate(test, trace, imeasure).scaled(self.fixed, self.per_loop)
+        part = test.part or self.part
+        if not self.history or not part:
+            return e
+        measured = predicted = 0
+        for loops, elapsed, m, i, t in self._samples(part, test):
+            measured += elapsed
+            predicted += m.scaled(self.fixed, self.per_loop).run_time(loops)
+        if measured and predicted:
+            ratio = measured / predicted
+            e = e.scaled(ratio, ratio)
+        return e
+
+
+# ------------------------------------------------------------------------
+def fit_loops(plan, budget):
+    # loop counts for [(estimate, loops), ...] so that the whole plan fits the time budget.
+    # Each test keeps at least one full pass, loop counts above it are scaled down evenly.
+    minimum = sum(e.time(1) for e, loops in plan)
+    extra = sum((loops - 1) * e.per_loop for e, loops in plan)
+    if minimum + extra <= budget:
+        return [loops for e, loops in plan]
+    if minimum >= budget or extra <= 0:
+        return [1 for e, loops in plan]
+    scale = (budget - minimum) / extra
+    return [1 + int((loops - 1) * scale) for e, loops in plan]
+
+
+def timeout(seconds, calibrated=True):
+    # transport deadline for an operation estimated to take 'seconds'.
+    # Uncalibrated estimates come from the model alone, these get a generous deadline.
+    if calibrated:
+        return TIMEOUT_FACTOR * seconds + TIMEOUT_MARGIN
+    return max(UNCALIBRATED_TIMEOUT_FACTOR * seconds, UNCALIBRATED_TIMEOUT_MIN)
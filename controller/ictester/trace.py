@@ -0,0 +1,129 @@
+import csv
+import statistics
+from struct import (iter_unpack, unpack)
+
+VBUS_TO_V = 1.6 / 1000  # 1.6mV per bit
+SHUNT_TO_MA = 1000 * 0.0000025 / 0.200  # 1000 * 2.5uV / 200mohm
+
+CSV_FIELDS = ["test", "point", "vbus", "ivcc", "ignd", "idelta"]
+
+
+# ------------------------------------------------------------------------
+class TracePoint:
+    def __init__(self, vbus, ivcc, ignd):
+        self.vbus = vbus
+        self.ivcc = ivcc
+        self.ignd = ignd
+
+    @classmethod
+    def raw(cls, vbus, ivcc, ignd):
+        return cls(vbus * VBUS_TO_V, ivcc * SHUNT_TO_MA, ignd * SHUNT_TO_MA)
+
+    @property
+    def idelta(self):
+        return abs(self.ivcc - self.ignd)
+
+
+# ------------------------------------------------------------------------
+class CurrentTrace:
+
+    # outliers are points deviating from the reference more than:
+    ABS_TOLERANCE_MA = 2.0  # absolute minimum (INA noise and quiescent current drift)
+    REL_TOLERANCE = 0.2  # when compared to baseline: relative to the baseline value
+    MAD_FACTOR = 5  # when compared to the trace itself: robust z-score
+
+    def __init__(self, points=None):
+        self.points = points if points else []
+
+    def __len__(self):
+        return len(self.points)
+
+    def __getitem__(self, i):
+        return self.points[i]
+
+    def __iter__(self):
+        return iter(self.points)
+
+    def add_frame(self, payload):
+        first_point = unpack("<H", payload[0:2])[0]
+        if first_point != len(self.points):
+            raise ValueError(f"Current trace frame out of order: got point {first_point}, expected {len(self.points)}")
+        for x in iter_unpack("<Hhh", payload[2:]):
+            self.points.append(TracePoint.raw(*x))
+
+    def _reference(self, values):
+        median = statistics.median(values)
+        mad = statistics.median(abs(v - median) for v in values)
+        tolerance = max(self.MAD_FACTOR * 1.4826 * mad, self.ABS_TOLERANCE_MA)
+        return [(median, tolerance)] * len(values)
+
+    def _baseline_reference(self, values):
+        return [(v, max(abs(v) * self.REL_TOLERANCE, self.ABS_TOLERANCE_MA)) for v in values]
+
+    def outliers(self, baseline=None):
+        # Without the baseline (trace recorded for a known-good part),
+        # points are compared against the median of the trace itself.
+        if not self.points:
+            return []
+
+        if baseline:
+            if len(baseline) != len(self.points):
+                raise ValueError(f"Baseline has {len(baseline)} points, trace has {len(self.points)}")
+            ref_vcc = self._baseline_reference([p.ivcc for p in baseline])
+            ref_gnd = self._baseline_reference([p.ignd for p in baseline])
+        else:
+            ref_vcc = self._reference([p.ivcc for p in self.points])
+            ref_gnd = self._reference([p.ignd for p in self.points])
+
+        return [
+            i for i, p in enumerate(self.points)
+            if abs(p.ivcc - ref_vcc[i][0]) > ref_vcc[i][1] or abs(p.ignd - ref_gnd[i][0]) > ref_gnd[i][1]
+        ]
+
+
+# ------------------------------------------------------------------------
+def save_csv(traces, filename):
+    with open(filename, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(CSV_FIELDS)
+        for name, trace in traces:
+            for num, p in enumerate(trace):
+                w.writerow([name, num, f"{p.vbus:.4f}", f"{p.ivcc:.4f}", f"{p.ignd:.4f}", f"{p.idelta:.4f}"])
+
+
+# ------------------------------------------------------------------------
+def to_numpy(traces):
+    try:
+        import numpy
+    except ImportError:
+        raise RuntimeError("NumPy is required for NumPy export")
+
+    dtype = [("test", "U64"), ("point", "u4"), ("vbus", "f4"), ("ivcc", "f4"), ("ignd", "f4"), ("idelta", "f4")]
+    return numpy.array(
+        [
+            (name, num, p.vbus, p.ivcc, p.ignd, p.idelta)
+            for name, trace in traces
+            for num, p in enumerate(trace)
+        ],
+        dtype=dtype
+    )
+
+
+# ------------------------------------------------------------------------
+def save(traces, filename):
+    if filename.endswith(".npy"):
+        data = to_numpy(traces)
+        import numpy
+        numpy.save(filename, data)
+    else:
+        save_csv(traces, filename)
+
+
+# ------------------------------------------------------------------------
+def load_baseline(filename):
+    traces = {}
+    with open(filename, newline="") as f:
+        for row in csv.DictReader(f):
+            trace = traces.setdefault(row["test"], CurrentTrace())
+            trace.points.append(TracePoint(float(row["vbus"]), float(row["ivcc"]), float(row["ignd"])))
+    return traces
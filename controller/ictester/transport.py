@@ -1,6 +1,8 @@
 import logging
 import serial
 from ictester.binvec import BV
+from ictester.response import ICTesterException
+from ictester.timing import COMMAND_TIMEOUT
 from struct import (pack, unpack)
 
 logger = logging.getLogger('ictester')
@@ -19,12 +21,22 @@ class Transport:
             bytesize=serial.EIGHTBITS,
             parity=serial.PARITY_NONE,
             stopbits=serial.STOPBITS_ONE,
-            timeout=None,
+            timeout=COMMAND_TIMEOUT,
             xonxoff=False,
             rtscts=False,
             dsrdtr=False
         )
 
+    def set_timeout(self, seconds):
+        # deadline for each response, None waits forever
+        self.s.timeout = seconds
+
+    def _read(self, size):
+        data = self.s.read(size)
+        if len(data) != size:
+            raise ICTesterException(f"no response from the tester within {self.s.timeout:.1f} s")
+        return data
+
     def send(self, b):
         b = bytes(b)
         self.bytes_sent += len(b)
@@ -33,8 +45,11 @@ class Transport:
         self.s.write(b)
 
     def recv(self):
-        size = unpack("<H", self.s.read(2))[0]
-        payload = self.s.read(size)
+        size = unpack("<H", self._read(2))[0]
+        payload = self._read(size)
         logger.log(18, "-> (%s bytes) %s", size, payload.hex(" "))
         self.bytes_received += 2 + len(payload)
         return payload
+
+    def close(self):
+        self.s.close()
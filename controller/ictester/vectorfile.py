@@ -0,0 +1,500 @@
+import sys
+import csv
+import math
+import mmap
+import zlib
+import argparse
+from struct import (pack, unpack, calcsize)
+
+from ictester.part import PinType
+from ictester.test import TestLogic
+
+'''
+Vector files hold test vectors for a single logic test, produced outside of ictester/parts/.
+
+Binary format (all values little-endian):
+    4 BYTES: magic "ICTV"
+    BYTE: format version (1)
+    BYTE: flags (bit 0: vector data is zlib-compressed)
+    BYTE: DUT pin count
+    BYTE: number of VCC pins
+    BYTE: number of inputs
+    BYTE: number of outputs
+    DWORD: number of vectors
+    BYTES: VCC pins, then inputs, then outputs (pin numbers)
+    vector data: vectors in CMD_VECTORS_LOAD format (1 bit per DUT pin, "don't check" marked on VCC pins)
+
+Text format:
+    # comment
+    pins 14
+    vcc 14
+    inputs 1 2 4 5
+    outputs 3 6
+    0101 10
+    01+1 1-     <- '+', '-', '/', '\\' on inputs: clock pulses, as in test bodies
+    0000 -      <- single '-' for outputs: outputs are not checked
+'''
+
+MAGIC = b"ICTV"
+VERSION = 1
+FLAG_ZLIB = 1
+HEADER = "<4sBBBBBBI"
+
+READ_CHUNK = 64 * 1024
+NO_CHECK = ("x", "X", "z", "Z", "-", "")
+
+
+# ------------------------------------------------------------------------
+class VectorCodec:
+    # Converts [inputs, outputs] rows to and from the binary (tester) vector format
+
+    def __init__(self, pincount, vcc, inputs, outputs):
+        self.pincount = pincount
+        self.vcc = vcc
+        self.inputs = inputs
+        self.outputs = outputs
+        self.size = math.ceil(pincount / 8)
+        self.no_check = sum(1 << (pin - 1) for pin in vcc)
+
+    def encode(self, row):
+        i, o = row
+        bits = 0
+        for pin, v in zip(self.inputs, i):
+            bits |= bool(v) << (pin - 1)
+        if o:
+            for pin, v in zip(self.outputs, o):
+                bits |= bool(v) << (pin - 1)
+        else:
+            bits |= self.no_check
+        return bits.to_bytes(self.size, "little")
+
+    def decode(self, data):
+        bits = int.from_bytes(data, "little")
+        i = [(bits >> (pin - 1)) & 1 for pin in self.inputs]
+        o = None if bits & self.no_check else [(bits >> (pin - 1)) & 1 for pin in self.outputs]
+        return [i, o]
+
+
+# ------------------------------------------------------------------------
+class VectorBlock:
+    # Consecutive vectors in the binary format, sent to the tester as they are
+
+    def __init__(self, data, codec):
+        self.data = data
+        self.codec = codec
+
+    def __len__(self):
+        return len(self.data) // self.codec.size
+
+    def __bytes__(self):
+        return bytes(self.data)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("vector number out of range")
+        return self.codec.decode(self.data[i * self.codec.size:(i + 1) * self.codec.size])
+
+    def rows(self):
+        return (self[i] for i in range(len(self)))
+
+
+# ------------------------------------------------------------------------
+class VectorFile:
+    # Binary vector file. Uncompressed vector data is memory-mapped,
+    # compressed data is decompressed as it is read.
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._f = open(filename, "rb")
+        try:
+            header = self._f.read(calcsize(HEADER))
+            if len(header) < calcsize(HEADER) or header[0:4] != MAGIC:
+                raise ValueError(f"{filename}: not a binary vector file")
+            magic, version, flags, pincount, vcc_count, input_count, output_count, self.count = unpack(HEADER, header)
+            if version != VERSION:
+                raise ValueError(f"{filename}: unsupported vector file version {version}")
+            pins = list(self._f.read(vcc_count + input_count + output_count))
+            vcc = pins[0:vcc_count]
+            inputs = pins[vcc_count:vcc_count + input_count]
+            outputs = pins[vcc_count + input_count:]
+        except Exception:
+            self._f.close()
+            raise
+
+        self.codec = VectorCodec(pincount, vcc, inputs, outputs)
+        self.compressed = bool(flags & FLAG_ZLIB)
+        self.data_offset = self._f.tell()
+        self._mm = None if self.compressed else mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @property
+    def pincount(self):
+        return self.codec.pincount
+
+    @property
+    def vcc(self):
+        return self.codec.vcc
+
+    @property
+    def inputs(self):
+        return self.codec.inputs
+
+    @property
+    def outputs(self):
+        return self.codec.outputs
+
+    def reader(self):
+        return VectorReader(self)
+
+    def rows(self):
+        reader = self.reader()
+        while True:
+            block = reader.read(READ_CHUNK // self.codec.size)
+            if not len(block):
+                return
+            yield from block.rows()
+
+    def close(self):
+        if self._mm:
+            self._mm.close()
+        self._f.close()
+
+
+# ------------------------------------------------------------------------
+class VectorReader:
+    # Sequential reader of vectors from a binary vector file
+
+    def __init__(self, vf):
+        self.vf = vf
+        self.left = vf.count
+        self.pos = vf.data_offset
+        if vf.compressed:
+            self._f = open(vf.filename, "rb")
+            self._f.seek(vf.data_offset)
+            self._z = zlib.decompressobj()
+            self._buf = b''
+
+    def read(self, count):
+        # next (up to) count vectors, as a VectorBlock
+        count = min(count, self.left)
+        size = count * self.vf.codec.size
+        if self.vf.compressed:
+            while len(self._buf) < size:
+                chunk = self._f.read(READ_CHUNK)
+                self._buf += self._z.decompress(chunk) if chunk else self._z.flush()
+                if not chunk:
+                    break
+            data, self._buf = self._buf[:size], self._buf[size:]
+            if not self.left - count:
+                self._f.close()
+        else:
+            data = self.vf._mm[self.pos:self.pos + size]
+            self.pos += len(data)
+        if len(data) != size:
+            raise ValueError(f"{self.vf.filename}: vector data is truncated")
+        self.left -= count
+        return VectorBlock(data, self.vf.codec)
+
+
+# ------------------------------------------------------------------------
+def write(filename, codec, rows, compress=False):
+    with open(filename, "wb") as f:
+        pins = bytes(codec.vcc + codec.inputs + codec.outputs)
+        header = lambda count: pack(HEADER, MAGIC, VERSION, FLAG_ZLIB if compress else 0, codec.pincount,
+            len(codec.vcc), len(codec.inputs), len(codec.outputs), count)
+        f.write(header(0))
+        f.write(pins)
+        z = zlib.compressobj() if compress else None
+        count = 0
+        for row in TestLogic.expand(rows):
+            data = codec.encode(row)
+            f.write(z.compress(data) if z else data)
+            count += 1
+        if z:
+            f.write(z.flush())
+        # vector count is known only after all vectors are written
+        f.seek(0)
+        f.write(header(count))
+    return count
+
+
+# ------------------------------------------------------------------------
+class TextVectorFile:
+    # Text vector file, read line by line
+
+    def __init__(self, filename):
+        self.filename = filename
+        header = {}
+        with open(filename) as f:
+            for line in f:
+                fields = line.split("#")[0].split()
+                if not fields:
+                    continue
+                if fields[0] not in ("pins", "vcc", "inputs", "outputs"):
+                    break
+                header[fields[0]] = [int(x) for x in fields[1:]]
+        try:
+            self.codec = VectorCodec(header["pins"][0], header["vcc"], header["inputs"], header["outputs"])
+        except (KeyError, IndexError):
+            raise ValueError(f"{filename}: incomplete vector file header, needs: pins, vcc, inputs, outputs")
+
+    @property
+    def pincount(self):
+        return self.codec.pincount
+
+    @property
+    def vcc(self):
+        return self.codec.vcc
+
+    @property
+    def inputs(self):
+        return self.codec.inputs
+
+    @property
+    def outputs(self):
+        return self.codec.outputs
+
+    def rows(self):
+        # rows may use clock notation on inputs, just like test bodies
+        with open(self.filename) as f:
+            for num, line in enumerate(f, 1):
+                fields = line.split("#")[0].split()
+                if not fields or fields[0] in ("pins", "vcc", "inputs", "outputs"):
+                    continue
+                i = fields[0]
+                o = fields[1] if len(fields) > 1 else "-"
+                if len(i) != len(self.inputs) or (o != "-" and len(o) != len(self.outputs)):
+                    raise ValueError(f"{self.filename}:{num}: wrong number of pin values")
+                yield [
+                    [int(x) if x in "01" else x for x in i],
+                    None if o == "-" else [int(x) for x in o],
+                ]
+
+
+# ------------------------------------------------------------------------
+def write_text(filename, codec, rows):
+    count = 0
+    with open(filename, "w") as f:
+        f.write(f"# ictester test vectors\npins {codec.pincount}\nvcc {' '.join(map(str, codec.vcc))}\n")
+        f.write(f"inputs {' '.join(map(str, codec.inputs))}\noutputs {' '.join(map(str, codec.outputs))}\n")
+        for i, o in rows:
+            i = ''.join(x if x in ('+', '-', '/', '\\') else str(int(x)) for x in i)
+            o = ''.join(str(int(x)) for x in o) if o else "-"
+            f.write(f"{i} {o}\n")
+            count += 1
+    return count
+
+
+# ------------------------------------------------------------------------
+def open_vectors(filename):
+    with open(filename, "rb") as f:
+        binary = f.read(len(MAGIC)) == MAGIC
+    return VectorFile(filename) if binary else TextVectorFile(filename)
+
+
+# ------------------------------------------------------------------------
+def load(filename, part, name=None, loops=1):
+    # Logic test running vectors from a file
+    vf = open_vectors(filename)
+    if vf.pincount != part.pincount or sorted(vf.vcc) != sorted(part.vcc):
+        raise ValueError(f"{filename}: vectors are for a {vf.pincount}-pin part with VCC on pin(s) {vf.vcc}")
+    for pin in vf.inputs + vf.outputs:
+        if pin not in part.pins or part.pins[pin].role in (PinType.VCC, PinType.GND):
+            raise ValueError(f"{filename}: pin {pin} is not an I/O pin of {part.name}")
+
+    name = name if name else f"Vectors: {filename}"
+    if isinstance(vf, VectorFile):
+        test = TestLogic(name, vf.inputs, vf.outputs, loops=loops, vector_file=vf)
+    else:
+        test = TestLogic(name, vf.inputs, vf.outputs, loops=loops, body=vf.rows)
+    test.attach_part(part)
+    return test
+
+
+# ------------------------------------------------------------------------
+def pin_number(part, name):
+    if name.strip().isdigit():
+        return int(name)
+    names = {p.name.upper(): num for num, p in part.pins.items()}
+    for n in (name.strip().upper(), "~" + name.strip().upper()):
+        if n in names:
+            return names[n]
+    raise ValueError(f"{part.name} has no pin named: {name}")
+
+
+def pin_roles(part, pins):
+    # default inputs and outputs for a set of part pins
+    inputs = [p for p in pins if part.pins[p].role in (PinType.IN,)]
+    outputs = [p for p in pins if part.pins[p].role in (PinType.OUT, PinType.OC, PinType.ST3)]
+    other = [part.pins[p].name for p in pins if p not in inputs + outputs]
+    if other:
+        raise ValueError(f"Can't tell if pins are inputs or outputs, set them explicitly: {', '.join(other)}")
+    return inputs, outputs
+
+
+# ------------------------------------------------------------------------
+def import_csv(filename, part, inputs=None, outputs=None):
+    # CSV with a header row naming the pins (by number or name), one vector per row.
+    # Empty, 'x', 'z' or '-' output value means outputs are not checked for the vector.
+    with open(filename, newline="") as f:
+        header = next(csv.reader(f))
+    columns = [pin_number(part, name) for name in header]
+    if inputs is None or outputs is None:
+        inputs, outputs = pin_roles(part, columns)
+    for pin in inputs + outputs:
+        if pin not in columns:
+            raise ValueError(f"{filename}: no column for pin {pin}")
+
+    def rows():
+        with open(filename, newline="") as f:
+            reader = csv.reader(f)
+            next(reader)
+            for line in reader:
+                if not line:
+                    continue
+                values = dict(zip(columns, (v.strip() for v in line)))
+                o = [values[pin] for pin in outputs]
+                yield [
+                    [int(values[pin]) for pin in inputs],
+                    None if any(v in NO_CHECK for v in o) else [int(v) for v in o],
+                ]
+
+    return inputs, outputs, rows
+
+
+# ------------------------------------------------------------------------
+def import_vcd(filename, part, inputs=None, outputs=None):
+    # Value Change Dump from a simulation. Signals are matched with part pins by name
+    # (buses by name and bit number: bus A[3:0] drives pins A3..A0).
+    # Each time inputs change, a vector is made of inputs set before the change
+    # and outputs sampled right before the change. Unknown outputs are not checked.
+    signals = {}
+    with open(filename) as f:
+        for line in f:
+            if "$enddefinitions" in line:
+                break
+            fields = line.split()
+            if len(fields) >= 5 and fields[0] == "$var":
+                width, code, name = int(fields[2]), fields[3], fields[4]
+                index = fields[5] if len(fields) >= 6 and fields[5].startswith("[") else None
+                if index is None:
+                    names = [name] if width == 1 else [f"{name}{bit}" for bit in reversed(range(width))]
+                else:
+                    lsb = int(index.strip("[]").split(":")[-1])
+                    names = [f"{name}{lsb + bit}" for bit in reversed(range(width))]
+                pins = []
+                for n in names:
+                    try:
+                        pins.append(pin_number(part, n))
+                    except ValueError:
+                        pins.append(None)
+                if any(p is not None for p in pins):
+                    signals.setdefault(code, []).append(pins)
+
+    mapped = sorted({p for lists in signals.values() for pins in lists for p in pins if p is not None})
+    if not mapped:
+        raise ValueError(f"{filename}: no signals match {part.name} pin names")
+    if inputs is None or outputs is None:
+        inputs, outputs = pin_roles(part, mapped)
+    for pin in inputs + outputs:
+        if pin not in mapped:
+            raise ValueError(f"{filename}: no signal for pin {part.pins[pin].name}")
+
+    def rows():
+        state = {}
+        last = None
+
+        def vector(s):
+            o = [s.get(pin) for pin in outputs]
+            return [
+                [int(s[pin]) for pin in inputs],
+                None if any(v not in ("0", "1") for v in o) else [int(v) for v in o],
+            ]
+
+        def set_value(code, value):
+            for pins in signals.get(code, []):
+                value = value.rjust(len(pins), "0" if value[0] in "01" else value[0])
+                for pin, v in zip(pins, value[-len(pins):]):
+                    if pin is not None:
+                        state[pin] = v.lower()
+
+        with open(filename) as f:
+            for line in f:
+                if "$enddefinitions" in line:
+                    break
+            tokens = (t for line in f for t in line.split())
+            for t in tokens:
+                if t.startswith("#"):
+                    # state before the new timestamp's changes is the end of previous interval
+                    if all(state.get(pin) in ("0", "1") for pin in inputs):
+                        if last is not None and [state[pin] for pin in inputs] != [last[pin] for pin in inputs]:
+                            yield vector(last)
+                        last = dict(state)
+                elif t[0] in "bBrR":
+                    set_value(next(tokens), t[1:])
+                elif t[0] in "01xXzZ":
+                    set_value(t[1:], t[0])
+            if last is not None and all(state.get(pin) in ("0", "1") for pin in inputs):
+                if [state[pin] for pin in inputs] != [last[pin] for pin in inputs]:
+                    yield vector(last)
+                yield vector(state)
+
+    return inputs, outputs, rows
+
+
+# ------------------------------------------------------------------------
+def pin_list(part, text):
+    return [pin_number(part, x) for x in text.split(",")] if text else None
+
+
+def main():
+    from ictester.parts import catalog
+
+    parser = argparse.ArgumentParser(description='Convert test vectors to ictester vector files')
+    parser.add_argument('-i', '--inputs', default=None, help='Comma-separated DUT input pins (numbers or names), default: all part inputs found in the source')
+    parser.add_argument('-o', '--outputs', default=None, help='Comma-separated DUT output pins (numbers or names), default: all part outputs found in the source')
+    parser.add_argument('-t', '--test', type=int, default=None, help='Use vectors of the given part test as the source')
+    parser.add_argument('-z', '--compress', action="store_true", help='Compress vector data (binary files only)')
+    parser.add_argument('part', help='Part symbol')
+    parser.add_argument('source', nargs='?', help='Source file: .csv, .vcd, ictester text or binary vector file')
+    parser.add_argument('destination', help='Destination file: .vec for a text file, binary vector file otherwise')
+    args = parser.parse_args()
+
+    try:
+        part = catalog[args.part.upper()]
+    except KeyError:
+        parser.error(f"Unknown part: {args.part}")
+
+    try:
+        inputs, outputs = pin_list(part, args.inputs), pin_list(part, args.outputs)
+        if args.test is not None:
+            if args.source:
+                parser.error("Use either a source file or a part test, not both")
+            test = part.tests[args.test-1]
+            inputs, outputs, rows = test.inputs, test.outputs, lambda: test.body
+        elif not args.source:
+            parser.error("Source file or part test is required")
+        elif args.source.lower().endswith(".csv"):
+            inputs, outputs, rows = import_csv(args.source, part, inputs, outputs)
+        elif args.source.lower().endswith(".vcd"):
+            inputs, outputs, rows = import_vcd(args.source, part, inputs, outputs)
+        else:
+            vf = open_vectors(args.source)
+            inputs, outputs, rows = vf.inputs, vf.outputs, vf.rows
+
+        codec = VectorCodec(part.pincount, part.vcc, inputs, outputs)
+        if args.destination.lower().endswith(".vec"):
+            count = write_text(args.destination, codec, rows())
+        else:
+            count = write(args.destination, codec, rows(), args.compress)
+    except (OSError, ValueError, IndexError) as e:
+        print(f"Conversion failed: {e}")
+        return 1
+
+    print(f"{count} vectors written to {args.destination}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
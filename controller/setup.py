@@ -12,6 +12,14 @@ setup(
     install_requires=['pyserial', 'colorama'],
 
     entry_points={
-        'console_scripts': ['ictester = ictester.ictester:main'],
+        'console_scripts': [
+            'ictester = ictester.ictester:main',
+            'ictester-vectors = ictester.vectorfile:main',
+            'ictester-model = ictester.modeltool:main',
+            'ictester-db = ictester.store:main',
+            'ictester-metrics = ictester.metrics:main',
+            'ictesterd = ictester.daemon:main',
+            'ictester-client = ictester.client:main',
+        ],
     },
 )
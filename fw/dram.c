@@ -1,12 +1,14 @@
 #include <inttypes.h>
 #include <stdlib.h>
 #include <stdbool.h>
+#include <string.h>
 #include <avr/io.h>
 #include <avr/interrupt.h>
 #include <avr/cpufunc.h>
 #include <util/delay.h>
 
 #include "protocol.h"
+#include "serial.h"
 #include "zif.h"
 #include "isense.h"
 
@@ -65,32 +67,114 @@ enum dram_test_type {
 	DRAM_TEST_MARCH_RMW		= 1,
 	DRAM_TEST_MARCH_RW		= 2,
 	DRAM_TEST_MARCH_PAGE	= 3,
-	DRAM_TEST_MAX			= DRAM_TEST_MARCH_PAGE
+	DRAM_TEST_SPEED_BIN		= 4,
+	DRAM_TEST_MAX			= DRAM_TEST_SPEED_BIN
 };
 
-struct march {
-	uint8_t dir;
+// march program element header
+#define MARCH_EL_DOWN	0x80
+#define MARCH_EL_BG		0x30
+#define MARCH_EL_OPS	0x0f
+// march program operation
+#define MARCH_OP_WRITE	0b10
+#define MARCH_OP_VALUE	0b01
+
+#define MARCH_MAX_ELEMENTS 16
+#define MARCH_MAX_OPS 8
+
+enum march_background {
+	BG_SOLID		= 0,
+	BG_CHECKERBOARD	= 1,
+	BG_ROW_STRIPES	= 2,
+	BG_COL_STRIPES	= 3,
+};
+
+// single memory access cycle: read and/or write
+struct march_cycle {
 	uint8_t read;
 	uint8_t write;
+	uint8_t step;	// element number, read operation number and direction (for failure reporting)
 };
 
-#define MARCH_STEPS 6
-static const struct march march_cm[MARCH_STEPS] = {
-	{ DIR_UP,   READ_NONE, WRITE_ZERO }, // any(w0)
-	{ DIR_UP,   READ_ZERO, WRITE_ONE  }, // up(r0,w1)
-	{ DIR_UP,   READ_ONE,  WRITE_ZERO }, // up(r1,w0)
-	{ DIR_DOWN, READ_ZERO, WRITE_ONE  }, // down(r0,w1)
-	{ DIR_DOWN, READ_ONE,  WRITE_ZERO }, // down(r1,w0)
-	{ DIR_UP,   READ_ZERO, WRITE_NONE }, // up(r0)
-};
+static struct march_element {
+	uint8_t dir;
+	uint8_t background;
+	uint8_t cycle_count;
+	struct march_cycle cycle[MARCH_MAX_OPS];
+} march[MARCH_MAX_ELEMENTS];
+static uint8_t march_elements;
 
-typedef uint8_t (*march_fun)(uint8_t dir, uint8_t r, uint8_t w, uint16_t addr_space);
+typedef uint8_t (*march_fun)(const struct march_element *e, uint16_t addr_space);
 
 static uint8_t dram_device;
 static uint8_t dram_test_type;
+static bool failmap_enabled;
 
 static uint16_t failing_row, failing_col;
 static uint8_t failing_step;
+static uint32_t failed_reads;
+static struct resp_dram_speed_bin speed_bin;
+
+// failing cells map, sent to the host in chunks
+#define FAILMAP_CHUNK 64
+
+static struct failmap_frame {
+	uint8_t resp;
+	uint8_t data_type;
+	struct resp_dram_failrun run[FAILMAP_CHUNK];
+} failmap;
+static uint8_t failmap_count;
+static bool failmap_overflow;
+static uint16_t failmap_addr_space;
+static uint8_t run_step;
+static uint16_t run_row, run_col, run_len; // pending run of failing cells, in loop address order
+
+// -----------------------------------------------------------------------
+// Translate march program elements into memory access cycles.
+// In read-modify-write mode a write following a read is done in the same access cycle.
+static uint8_t march_compile(uint8_t *program, bool rmw)
+{
+	march_elements = *(program++);
+	if ((march_elements < 1) || (march_elements > MARCH_MAX_ELEMENTS)) {
+		return error(ERR_PROGRAM);
+	}
+
+	for (uint8_t i=0 ; i<march_elements ; i++) {
+		struct march_element *e = march + i;
+		struct march_cycle *c = NULL;
+		uint8_t header = *(program++);
+		uint8_t op_count = header & MARCH_EL_OPS;
+
+		if ((op_count < 1) || (op_count > MARCH_MAX_OPS)) {
+			return error(ERR_PROGRAM);
+		}
+
+		e->dir = (header & MARCH_EL_DOWN) ? DIR_DOWN : DIR_UP;
+		e->background = (header & MARCH_EL_BG) >> 4;
+		e->cycle_count = 0;
+
+		for (uint8_t op_num=0 ; op_num<op_count ; op_num++) {
+			uint8_t op = *(program++);
+			if (op & MARCH_OP_WRITE) {
+				uint8_t w = (op & MARCH_OP_VALUE) ? WRITE_ONE : WRITE_ZERO;
+				if (rmw && c && (c->read != READ_NONE) && (c->write == WRITE_NONE)) {
+					c->write = w;
+					continue;
+				}
+				c = e->cycle + e->cycle_count++;
+				c->read = READ_NONE;
+				c->write = w;
+			} else {
+				c = e->cycle + e->cycle_count++;
+				c->read = (op & MARCH_OP_VALUE) ? READ_ONE : READ_ZERO;
+				c->write = WRITE_NONE;
+			}
+			c->step = i | (op_num << 4) | (header & MARCH_EL_DOWN ? DRAM_FAILRUN_DIR_DOWN : 0);
+		}
+	}
+
+	return RESP_OK;
+}
 
 // -----------------------------------------------------------------------
 uint8_t dram_test_setup(struct dram_params *params)
@@ -104,8 +188,13 @@ uint8_t dram_test_setup(struct dram_params *params)
 
 	dram_device = params->device;
 	dram_test_type = params->test_type;
+	failmap_enabled = params->flags & DRAM_FLAG_FAILMAP;
 
-	return RESP_OK;
+	if ((dram_test_type == DRAM_TEST_SPEED) || (dram_test_type == DRAM_TEST_SPEED_BIN)) {
+		return RESP_OK;
+	}
+
+	return march_compile(params->program, dram_test_type == DRAM_TEST_MARCH_RMW);
 }
 
 // -----------------------------------------------------------------------
@@ -179,55 +268,54 @@ static inline void write_data(uint8_t data)
 }
 
 // -----------------------------------------------------------------------
-// MARCH using read-write cycle
-static uint8_t march_step_rmw(uint8_t dir, uint8_t r, uint8_t w, uint16_t addr_space)
+static inline uint16_t phys_addr(uint16_t addr, uint8_t step)
 {
-	for (uint16_t addr_col=0 ; addr_col < addr_space; addr_col++) {
-		for (uint16_t addr_row=0 ; addr_row < addr_space; addr_row++) {
-			set_row_addr(addr_row, dir);
-			set_col_addr(addr_col, dir);
-			if ((r != READ_NONE) && (read_data() != r)) {
-				failing_row = addr_row;
-				failing_col = addr_col;
-				return RESP_FAIL;
-			}
-			if (w != WRITE_NONE) write_data(w);
-			CAS_OFF;
-			RAS_OFF;
-		}
+	if (step & DRAM_FAILRUN_DIR_DOWN) addr = ~addr;
+	return addr & (failmap_addr_space - 1);
+}
+
+// -----------------------------------------------------------------------
+static void failmap_store_run()
+{
+	if (!run_len) return;
+
+	if (failmap_count < FAILMAP_CHUNK) {
+		struct resp_dram_failrun *run = failmap.run + failmap_count;
+		run->march_step = run_step;
+		run->row_address = phys_addr(run_row, run_step);
+		run->column_address = phys_addr(run_col, run_step);
+		run->length = run_len;
+		failmap_count++;
+	} else {
+		failmap_overflow = true;
 	}
-	return RESP_PASS;
+
+	run_len = 0;
 }
 
 // -----------------------------------------------------------------------
-// MARCH using read cycle + write cycle
-static uint8_t march_step_rw(uint8_t dir, uint8_t r, uint8_t w, uint16_t addr_space)
+static void failmap_add(uint16_t addr_row, uint16_t addr_col, uint8_t step)
 {
-	for (uint16_t addr_col=0 ; addr_col < addr_space; addr_col++) {
-		for (uint16_t addr_row=0 ; addr_row < addr_space; addr_row++) {
-			if (r != READ_NONE) {
-				set_row_addr(addr_row, dir);
-				set_col_addr(addr_col, dir);
-				if (read_data() != r) {
-					failing_row = addr_row;
-					failing_col = addr_col;
-					return RESP_FAIL;
-				}
-				CAS_OFF;
-				RAS_OFF;
+	if (run_len && (step == run_step)) {
+		// extend the pending run if the cell is next in the loop address order
+		if (dram_test_type == DRAM_TEST_MARCH_PAGE) {
+			if ((addr_row == run_row) && (addr_col == run_col + run_len)) {
+				run_len++;
+				return;
 			}
-
-			if (w != WRITE_NONE) {
-				set_row_addr(addr_row, dir);
-				set_col_addr(addr_col, dir);
-				write_data(w);
-				CAS_OFF;
-				RAS_OFF;
+		} else {
+			if ((addr_col == run_col) && (addr_row == run_row + run_len)) {
+				run_len++;
+				return;
 			}
 		}
 	}
 
-	return RESP_PASS;
+	failmap_store_run();
+	run_step = step;
+	run_row = addr_row;
+	run_col = addr_col;
+	run_len = 1;
 }
 
 // -----------------------------------------------------------------------
@@ -240,40 +328,160 @@ static inline void full_refresh(uint16_t addr_space)
 }
 
 // -----------------------------------------------------------------------
-// MARCH using full page reads and writes + refresh (treats one page as a single "memory cell")
-static uint8_t march_step_page(uint8_t dir, uint8_t r, uint8_t w, uint16_t addr_space)
+// Sending a byte takes 20us at 500kbps, a frame takes several ms, longer than the refresh period
+// (4ms, 2ms for 128-row refresh), so all rows are refreshed every FAILMAP_REFRESH_BYTES bytes sent (1.28ms)
+// and when the frame is sent.
+#define FAILMAP_REFRESH_BYTES 64
+
+static void failmap_flush()
+{
+	if (!failmap_count) return;
+
+	uint16_t len = 2 + failmap_count * sizeof(struct resp_dram_failrun);
+	uint8_t *data = (uint8_t*) &failmap;
+
+	serial_tx_16le(len);
+	for (uint16_t i=0 ; i<len ; i++) {
+		if (!(i % FAILMAP_REFRESH_BYTES)) full_refresh(failmap_addr_space);
+		serial_tx_char(data[i]);
+	}
+	full_refresh(failmap_addr_space);
+
+	failmap_count = 0;
+}
+
+// -----------------------------------------------------------------------
+// Flush collected failures when the buffer is half full.
+// Called only between access cycles, so there is room for failures
+// in the next row (column in page mode) without holding RAS active too long.
+static inline void failmap_check()
+{
+	if (failmap_count >= FAILMAP_CHUNK/2) failmap_flush();
+}
+
+// -----------------------------------------------------------------------
+// Returns true if the test should stop on the failure
+static inline bool cell_failed(uint16_t addr_row, uint16_t addr_col, uint8_t step)
+{
+	failing_row = addr_row;
+	failing_col = addr_col;
+	failing_step = step & ~DRAM_FAILRUN_DIR_DOWN;
+	failed_reads++;
+
+	if (failmap_enabled) {
+		failmap_add(addr_row, addr_col, step);
+		return false;
+	}
+
+	return true;
+}
+
+// -----------------------------------------------------------------------
+// Returns 1 if data background inverts the cell value (physical address is used)
+static inline uint8_t bg_flip(uint8_t background, uint16_t addr_row, uint16_t addr_col, uint8_t dir)
+{
+	switch (background) {
+		case BG_CHECKERBOARD: return (addr_row ^ addr_col) & 1;
+		case BG_ROW_STRIPES: return (addr_row ^ dir) & 1;
+		case BG_COL_STRIPES: return (addr_col ^ dir) & 1;
+		default: return 0;
+	}
+}
+
+// -----------------------------------------------------------------------
+// MARCH element using read-modify-write cycles
+static uint8_t march_element_rmw(const struct march_element *e, uint16_t addr_space)
 {
-	if (r != READ_NONE) {
+	uint8_t res = RESP_PASS;
+	const uint8_t dir = e->dir;
+	const struct march_cycle *last = e->cycle + e->cycle_count;
+
+	for (uint16_t addr_col=0 ; addr_col < addr_space; addr_col++) {
 		for (uint16_t addr_row=0 ; addr_row < addr_space; addr_row++) {
-			set_row_addr(addr_row, dir);
-			for (uint16_t addr_col=0 ; addr_col < addr_space; addr_col++) {
+			uint8_t flip = bg_flip(e->background, addr_row, addr_col, dir);
+			for (const struct march_cycle *c=e->cycle ; c<last ; c++) {
+				set_row_addr(addr_row, dir);
 				set_col_addr(addr_col, dir);
-				if (read_data() != r) {
-					failing_row = addr_row;
-					failing_col = addr_col;
-					return RESP_FAIL;
+				if ((c->read != READ_NONE) && (read_data() != (c->read ^ (flip ? VAL_DO : 0)))) {
+					res = RESP_FAIL;
+					if (cell_failed(addr_row, addr_col, c->step)) return res;
 				}
+				if (c->write != WRITE_NONE) write_data(c->write ^ (flip ? VAL_DI : 0));
 				CAS_OFF;
+				RAS_OFF;
 			}
-			RAS_OFF;
-			if ((addr_row & 0b11) == 0) full_refresh(addr_space);
 		}
+		if (failmap_enabled) failmap_check();
 	}
 
-	if (w != WRITE_NONE) {
+	return res;
+}
+
+// -----------------------------------------------------------------------
+// MARCH element using separate read and write cycles
+static uint8_t march_element_rw(const struct march_element *e, uint16_t addr_space)
+{
+	uint8_t res = RESP_PASS;
+	const uint8_t dir = e->dir;
+	const struct march_cycle *last = e->cycle + e->cycle_count;
+
+	for (uint16_t addr_col=0 ; addr_col < addr_space; addr_col++) {
 		for (uint16_t addr_row=0 ; addr_row < addr_space; addr_row++) {
+			uint8_t flip = bg_flip(e->background, addr_row, addr_col, dir);
+			for (const struct march_cycle *c=e->cycle ; c<last ; c++) {
+				set_row_addr(addr_row, dir);
+				set_col_addr(addr_col, dir);
+				if (c->read != READ_NONE) {
+					if (read_data() != (c->read ^ (flip ? VAL_DO : 0))) {
+						res = RESP_FAIL;
+						if (cell_failed(addr_row, addr_col, c->step)) return res;
+					}
+				} else {
+					write_data(c->write ^ (flip ? VAL_DI : 0));
+				}
+				CAS_OFF;
+				RAS_OFF;
+			}
+		}
+		if (failmap_enabled) failmap_check();
+	}
+
+	return res;
+}
+
+// -----------------------------------------------------------------------
+// MARCH element using full page reads and writes + refresh (each operation is done for the whole page).
+// Refresh budget: all rows have to be refreshed within 4ms (2ms for 128-row refresh). A page sweep is addr_space
+// (up to 512) column cycles, and an element does one sweep per operation, so the memory is refreshed after each sweep.
+static uint8_t march_element_page(const struct march_element *e, uint16_t addr_space)
+{
+	uint8_t res = RESP_PASS;
+	const uint8_t dir = e->dir;
+	const struct march_cycle *last = e->cycle + e->cycle_count;
+
+	for (uint16_t addr_row=0 ; addr_row < addr_space; addr_row++) {
+		for (const struct march_cycle *c=e->cycle ; c<last ; c++) {
 			set_row_addr(addr_row, dir);
 			for (uint16_t addr_col=0 ; addr_col < addr_space; addr_col++) {
+				uint8_t flip = bg_flip(e->background, addr_row, addr_col, dir);
 				set_col_addr(addr_col, dir);
-				write_data(w);
+				if (c->read != READ_NONE) {
+					if (read_data() != (c->read ^ (flip ? VAL_DO : 0))) {
+						res = RESP_FAIL;
+						if (cell_failed(addr_row, addr_col, c->step)) return res;
+					}
+				} else {
+					write_data(c->write ^ (flip ? VAL_DI : 0));
+				}
 				CAS_OFF;
 			}
 			RAS_OFF;
-			if ((addr_row & 0b11) == 0) full_refresh(addr_space);
+			full_refresh(addr_space);
+			if (failmap_enabled) failmap_check();
 		}
 	}
 
-	return RESP_PASS;
+	return res;
 }
 
 // -----------------------------------------------------------------------
@@ -304,6 +512,103 @@ void test_speed(uint16_t loops)
 	}
 }
 
+// -----------------------------------------------------------------------
+// Pull ~CAS low and read Dout 'cycles' CPU cycles later, with nothing scheduled in between.
+// ~CAS falls at the end of CBI. IN returns the pin value latched half a cycle before it executes
+// (pin synchronizer, see "Reading the Pin Value" in the datasheet), so Dout is sampled
+// cycles - 0.5 CPU cycles after ~CAS falls.
+static inline __attribute__((always_inline)) uint8_t cas_read(const uint8_t cycles)
+{
+	uint8_t pin;
+	asm volatile(
+		"cbi %[port], %[cas]" "\n\t"
+		".rept %[nops]" "\n\t"
+		"nop" "\n\t"
+		".endr" "\n\t"
+		"in %[pin], %[pins]" "\n\t"
+		: [pin] "=r" (pin)
+		: [port] "I" (_SFR_IO_ADDR(PORT_CAS)), [cas] "I" (ZIF_22_PORT_BIT),
+		  [nops] "n" (cycles), [pins] "I" (_SFR_IO_ADDR(PIN_DOUT))
+	);
+	return pin & VAL_DO;
+}
+
+// -----------------------------------------------------------------------
+// Write checkerboard pattern, then read it back sampling Dout 'cycles' - 0.5 CPU cycles after ~CAS falls.
+// Returns number of failed reads.
+static inline __attribute__((always_inline)) uint32_t speed_bin_pass(const uint8_t cycles, uint8_t inv, uint16_t addr_space)
+{
+	uint32_t fails = 0;
+
+	for (uint16_t addr_col=0 ; addr_col < addr_space ; addr_col++) {
+		for (uint16_t addr_row=0 ; addr_row < addr_space ; addr_row++) {
+			set_row_addr(addr_row, DIR_UP);
+			set_col_addr(addr_col, DIR_UP);
+			write_data(((addr_row ^ addr_col ^ inv) & 1) ? WRITE_ONE : WRITE_ZERO);
+			CAS_OFF;
+			RAS_OFF;
+		}
+	}
+
+	for (uint16_t addr_col=0 ; addr_col < addr_space ; addr_col++) {
+		for (uint16_t addr_row=0 ; addr_row < addr_space ; addr_row++) {
+			set_row_addr(addr_row, DIR_UP);
+			PORT_ADDR_L = addr_low(addr_col) | VAL_WE;
+			PORT_ADDR_H = DOUT_PULLUP | addr_high(addr_col) | VAL_CAS;
+			uint8_t d = cas_read(cycles);
+			CAS_OFF;
+			RAS_OFF;
+			if (d != (((addr_row ^ addr_col ^ inv) & 1) ? READ_ONE : READ_ZERO)) {
+				failing_row = addr_row;
+				failing_col = addr_col;
+				fails++;
+			}
+		}
+	}
+
+	return fails;
+}
+
+// step n reads Dout n+1 cycles after ~CAS falls: sampling times are 25, 75, ... 375ns
+#define SPEED_BIN_STEP(n) case n: fails = speed_bin_pass(n+1, 0, addr_space) + speed_bin_pass(n+1, 1, addr_space); break
+
+// -----------------------------------------------------------------------
+// Find the shortest CAS-to-Dout sampling time at which the memory works.
+// ~RAS to ~CAS delay (at least 3 cycles, 150ns) is longer than tRCD(max) of all supported grades,
+// so the access is ~CAS-limited.
+static uint8_t test_speed_bin(uint16_t loops, uint16_t addr_space)
+{
+	uint8_t res = RESP_FAIL;
+
+	for (uint8_t step=0 ; step<DRAM_SPEED_BIN_STEPS ; step++) {
+		speed_bin.failed_reads[step] = 0;
+	}
+
+	for (uint16_t rep=0 ; rep<loops ; rep++) {
+		for (uint8_t step=0 ; step<DRAM_SPEED_BIN_STEPS ; step++) {
+			uint32_t fails = 0;
+			switch (step) {
+				SPEED_BIN_STEP(0);
+				SPEED_BIN_STEP(1);
+				SPEED_BIN_STEP(2);
+				SPEED_BIN_STEP(3);
+				SPEED_BIN_STEP(4);
+				SPEED_BIN_STEP(5);
+				SPEED_BIN_STEP(6);
+				SPEED_BIN_STEP(7);
+			}
+			speed_bin.failed_reads[step] += fails;
+			failed_reads += fails;
+		}
+	}
+
+	for (uint8_t step=0 ; step<DRAM_SPEED_BIN_STEPS ; step++) {
+		if (!speed_bin.failed_reads[step]) res = RESP_PASS;
+	}
+
+	return res;
+}
+
 // -----------------------------------------------------------------------
 void dram_imeasure()
 {
@@ -361,9 +666,9 @@ uint8_t dram_run(uint16_t loops)
 
 	march_fun m_funcs[4] = {
 		[DRAM_TEST_SPEED] = NULL,
-		[DRAM_TEST_MARCH_RMW] = march_step_rmw,
-		[DRAM_TEST_MARCH_RW] = march_step_rw,
-		[DRAM_TEST_MARCH_PAGE] = march_step_page,
+		[DRAM_TEST_MARCH_RMW] = march_element_rmw,
+		[DRAM_TEST_MARCH_RW] = march_element_rw,
+		[DRAM_TEST_MARCH_PAGE] = march_element_page,
 	};
 
 	uint16_t address_space;
@@ -389,16 +694,33 @@ uint8_t dram_run(uint16_t loops)
 		return RESP_PASS;
 	}
 
+	failed_reads = 0;
+	failmap_overflow = false;
+	failing_step = 0;
+
+	if (dram_test_type == DRAM_TEST_SPEED_BIN) {
+		return test_speed_bin(loops, address_space);
+	}
+
 	march_fun m_fun = m_funcs[dram_test_type];
 
+	failmap.resp = RESP_DATA;
+	failmap.data_type = DATA_DRAM_FAILMAP;
+	failmap_count = 0;
+	failmap_addr_space = address_space;
+	run_len = 0;
+
 	for (uint16_t rep=0 ; rep<loops ; rep++) {
-		for (uint8_t i=0 ; i<MARCH_STEPS ; i++) {
-			if (m_fun(march_cm[i].dir, march_cm[i].read, march_cm[i].write, address_space) != RESP_PASS) {
-				failing_step = i;
+		for (uint8_t i=0 ; i<march_elements ; i++) {
+			if (m_fun(march + i, address_space) != RESP_PASS) {
 				CAS_OFF;
 				RAS_OFF;
 				res = RESP_FAIL;
 			}
+			if (failmap_enabled) {
+				failmap_store_run();
+				failmap_flush();
+			}
 		}
 	}
 
@@ -412,7 +734,20 @@ uint16_t dram_store_result(uint8_t *buf, uint8_t dut_pin_count)
 	resp->row_address = failing_row;
 	resp->column_address = failing_col;
 	resp->march_step = failing_step;
-	return 5;
+	resp->failed_reads = failed_reads;
+	resp->failmap_overflow = failmap_overflow;
+	return sizeof(struct resp_dram_fail);
+}
+
+// -----------------------------------------------------------------------
+uint16_t dram_store_pass_result(uint8_t *buf)
+{
+	if (dram_test_type != DRAM_TEST_SPEED_BIN) {
+		return 0;
+	}
+
+	memcpy(buf, &speed_bin, sizeof(struct resp_dram_speed_bin));
+	return sizeof(struct resp_dram_speed_bin);
 }
 
 // vim: tabstop=4 shiftwidth=4 autoindent
@@ -1,6 +1,7 @@
 #include <inttypes.h>
 #include <stdbool.h>
 #include <avr/io.h>
+#include <avr/interrupt.h>
 #include <util/delay.h>
 
 #include "serial.h"
@@ -16,7 +17,7 @@
 
 #define LINK_SPEED 500000
 #define NO_CONFIG -1
-#define BUF_SIZE 2048
+#define BUF_SIZE 256
 uint8_t buf[BUF_SIZE];
 
 uint8_t dut_package_type;
@@ -24,10 +25,24 @@ uint8_t dut_pin_count;
 uint8_t test_type;
 
 bool configured = false;
+bool relays_switched;
 
 uint16_t vbus;
 int16_t ivcc, ignd;
 
+// -----------------------------------------------------------------------
+static uint16_t store_hello(uint8_t *buf)
+{
+	struct resp_hello *resp = (struct resp_hello*) buf;
+	resp->protocol_version = PROTOCOL_VERSION;
+	resp->firmware_version = FIRMWARE_VERSION;
+	resp->max_vectors_16 = logic_max_vectors(16);
+	resp->max_vectors_24 = logic_max_vectors(24);
+	resp->reserved = 0;
+
+	return sizeof(struct resp_hello);
+}
+
 // -----------------------------------------------------------------------
 static uint8_t handle_dut_setup(struct cmd_dut_setup *data)
 {
@@ -72,6 +87,8 @@ static uint8_t handle_test_setup(struct cmd_test_setup *data)
 	}
 
 	zif_config_select(data->cfg_num);
+	// relays are switched only if the configuration isn't already active
+	relays_switched = !zif_connected();
 	if (!zif_connect()) {
 		return RESP_ERR;
 	}
@@ -142,6 +159,15 @@ static uint8_t handle_run(struct cmd_run *data)
 		return error(ERR_NO_CONF);
 	}
 
+	// no receive interrupts while the test runs, so they don't disturb test timing
+	serial_rx_pause();
+
+	if (data->flags & RUN_FLAG_ITRACE) {
+		itrace_start();
+	} else if (data->flags & RUN_FLAG_NO_IMEASURE) {
+		imeasure_enable(false);
+	}
+
 	switch (test_type) {
 		case TEST_LOGIC:
 			res = logic_run(dut_pin_count, data->loops);
@@ -157,6 +183,10 @@ static uint8_t handle_run(struct cmd_run *data)
 			break;
 	}
 
+	itrace_stop();
+	imeasure_enable(true);
+	serial_rx_resume();
+
 	if (res == RESP_FAIL) {
 		handle_dut_disconnect(res);
 	}
@@ -174,16 +204,25 @@ int main()
 	isense_init();
 	led_welcome();
 
+	sei();
+
 	uint8_t resp;
 	uint8_t cmd;
+	uint16_t size;
 	uint8_t *data = buf+1;
 
 	while (true) {
-		if (!receive_cmd(buf, BUF_SIZE)) {
+		cmd = receive_cmd_header(&size);
+		if (cmd == CMD_VECTORS_LOAD) {
+			// vectors don't go through the buffer, they're decoded on the fly
+			resp = logic_vectors_receive(size);
+		} else if (!receive_cmd(data, size, BUF_SIZE-1)) {
 			resp = error(ERR_CMD_TOOBIG);
 		} else {
-			cmd = buf[0];
 			switch (cmd) {
+				case CMD_HELLO:
+					resp = RESP_HELLO;
+					break;
 				case CMD_DUT_SETUP:
 					resp = handle_dut_setup((struct cmd_dut_setup*) data);
 					break;
@@ -193,9 +232,6 @@ int main()
 				case CMD_TEST_SETUP:
 					resp = handle_test_setup((struct cmd_test_setup*) data);
 					break;
-				case CMD_VECTORS_LOAD:
-					resp = logic_vectors_load((struct vectors*) data, dut_pin_count, zif_get_vcc_pin());
-					break;
 				case CMD_TEST_RUN:
 					resp = handle_run((struct cmd_run*) data);
 					break;
@@ -207,6 +243,10 @@ int main()
 			}
 		}
 
+		if (serial_rx_overflow()) {
+			resp = error(ERR_RX_OVERFLOW);
+		}
+
 		uint16_t count = 0;
 		buf[count++] = resp;
 
@@ -225,10 +265,26 @@ int main()
 					// test does not store result data
 					break;
 			}
+		} else if ((resp == RESP_PASS) && (cmd == CMD_TEST_RUN)) {
+			switch (test_type) {
+				case TEST_DRAM:
+					count += dram_store_pass_result(buf+count);
+					break;
+				case TEST_UNIVIB:
+					count += univib_store_pass_result(buf+count);
+					break;
+				default:
+					// test does not store result data
+					break;
+			}
 		}
-		if (cmd == CMD_DUT_POWERUP) {
+		if (resp == RESP_HELLO) {
+			count += store_hello(buf+count);
+		} else if (cmd == CMD_DUT_POWERUP) {
 			buf[count++] = vbus & 0xff;
 			buf[count++] = vbus >> 8;
+		} else if ((cmd == CMD_TEST_SETUP) && (resp == RESP_OK)) {
+			buf[count++] = relays_switched;
 		} else if (cmd == CMD_DUT_DISCONNECT) {
 			count += store_current_stats(buf+count);
 		}
@@ -8,8 +8,20 @@
 #include "isense.h"
 #include "protocol.h"
 
+#define ITRACE_CHUNK 128
+
 static struct resp_logic_imeasure imeas;
 
+static bool imeasure_enabled = true;
+static bool itrace_enabled;
+static uint8_t itrace_count;
+static struct itrace_frame {
+	uint8_t resp;
+	uint8_t data_type;
+	uint16_t first_point;
+	struct resp_itrace_point point[ITRACE_CHUNK];
+} itrace;
+
 // -----------------------------------------------------------------------
 void isense_init()
 {
@@ -81,12 +93,27 @@ void update_current_stats()
 	int16_t ivcc, ignd;
 	uint16_t vbus;
 
+	if (!imeasure_enabled) return;
+
 	isense_all(&vbus, &ivcc, &ignd);
 	if (ivcc > imeas.max_ivcc.ivcc) { imeas.max_ivcc.ivcc = ivcc; imeas.max_ivcc.ignd = ignd; }
 	if (ignd > imeas.max_ignd.ignd) { imeas.max_ignd.ivcc = ivcc; imeas.max_ignd.ignd = ignd; }
 	if (ivcc < imeas.min_ivcc.ivcc) { imeas.min_ivcc.ivcc = ivcc; imeas.min_ivcc.ignd = ignd; }
 	if (ignd < imeas.min_ignd.ignd) { imeas.min_ignd.ivcc = ivcc; imeas.min_ignd.ignd = ignd; }
 	if (vbus < imeas.min_vbus) { imeas.min_vbus = vbus; }
+
+	if (itrace_enabled) {
+		itrace.point[itrace_count].vbus = vbus;
+		itrace.point[itrace_count].ivcc = ivcc;
+		itrace.point[itrace_count].ignd = ignd;
+		if (++itrace_count >= ITRACE_CHUNK) itrace_flush();
+	}
+}
+
+// -----------------------------------------------------------------------
+void imeasure_enable(bool enable)
+{
+	imeasure_enabled = enable;
 }
 
 // -----------------------------------------------------------------------
@@ -97,4 +124,34 @@ uint16_t store_current_stats(uint8_t *buf)
 	return count;
 }
 
+// -----------------------------------------------------------------------
+void itrace_start()
+{
+	itrace.resp = RESP_DATA;
+	itrace.data_type = DATA_ITRACE;
+	itrace.first_point = 0;
+	itrace_count = 0;
+	itrace_enabled = true;
+}
+
+// -----------------------------------------------------------------------
+void itrace_flush()
+{
+	if (!itrace_count) return;
+
+	// measurement points are sent to the host in bulk, as they are collected
+	send_response((uint8_t*) &itrace, 4 + itrace_count * sizeof(struct resp_itrace_point));
+	itrace.first_point += itrace_count;
+	itrace_count = 0;
+}
+
+// -----------------------------------------------------------------------
+void itrace_stop()
+{
+	if (!itrace_enabled) return;
+
+	itrace_flush();
+	itrace_enabled = false;
+}
+
 // vim: tabstop=4 shiftwidth=4 autoindent
@@ -1,6 +1,8 @@
 #ifndef __ISENSE_H__
 #define __ISENSE_H__
 
+#include <stdbool.h>
+
 #define SHUNT_190_MA 15200  // 190 mA / (2.5 uV / 0.2 ohm)
 
 void isense_init();
@@ -11,7 +13,11 @@ int16_t isense_shunt_gnd();
 void isense_all(uint16_t *vbus, int16_t *ivcc, int16_t *ignd);
 void clear_current_stats();
 void update_current_stats();
+void imeasure_enable(bool enable);
 uint16_t store_current_stats(uint8_t *buf);
+void itrace_start();
+void itrace_flush();
+void itrace_stop();
 
 #endif
 
@@ -11,28 +11,54 @@
 #include "protocol.h"
 #include "serial.h"
 #include "isense.h"
+#include "remap.h"
+
+// Vectors are stored packed: one byte per MCU port used by the DUT (ports 0 and 2 for <=16-pin DUTs,
+// all three for larger ones), holding expected DUT output values and DUT input values to set
+// (in MCU port pin order). Port masks are applied at run time.
+// "Check outputs" flags are kept separately in a bitmap, one bit per vector.
+#define VECTOR_MEM_SIZE 12800
+// RAM left by the vector memory holds all other static data and the stack.
+// Static data size of the linked firmware is checked against STACK_MARGIN (see Makefile).
+#define VECTOR_STRIDE(dut_pin_count) (((dut_pin_count) <= 16) ? 2 : 3)
+// vector byte offset for each MCU port
+#define VOFF(port) (((port) == ZIF_PORT_0) ? 0 : ((port) == ZIF_PORT_2) ? 1 : 2)
+
+static uint8_t vector_mem[VECTOR_MEM_SIZE];
+static uint8_t *vector_check;
+static uint8_t *vector_data;
+static uint8_t vector_stride;
+static uint16_t max_vectors;
+static uint16_t vectors_count;
 
-#define MAX_VECTORS 1024
+static uint8_t vector_bytes;
 
-static uint16_t vectors_count;
-static struct vector {
-	uint8_t check;
-	struct port {
-		uint8_t in, out;
-	} port[MCU_PORT_CNT];
-} vectors[MAX_VECTORS];
+static struct mcu_port_config run_port_cfg[MCU_PORT_CNT];
 
 static uint16_t delay;
 static uint16_t rep;
 static uint8_t failed_vector[MCU_PORT_CNT];
 static uint16_t failed_vector_pos;
 
+// -----------------------------------------------------------------------
+// Number of vectors that fit in the vector memory for a given DUT
+uint16_t logic_max_vectors(uint8_t dut_pin_count)
+{
+	// each vector takes stride bytes + 1 check bit, keep the bitmap byte-aligned
+	return (uint32_t) VECTOR_MEM_SIZE * 8 / (VECTOR_STRIDE(dut_pin_count) * 8 + 1) & ~7;
+}
+
 // -----------------------------------------------------------------------
 uint8_t logic_test_setup(uint8_t dut_pin_count, struct logic_params *params)
 {
 	delay = params->delay;
 	vectors_count = 0;
 
+	vector_stride = VECTOR_STRIDE(dut_pin_count);
+	max_vectors = logic_max_vectors(dut_pin_count);
+	vector_check = vector_mem;
+	vector_data = vector_mem + max_vectors / 8;
+
 	struct mcu_port_config *mcu_port = mcu_get_port_config();
 	if (!mcu_port) {
 		return error(ERR_NO_PINCFG);
@@ -42,13 +68,18 @@ uint8_t logic_test_setup(uint8_t dut_pin_count, struct logic_params *params)
 		mcu_port[i].mask = 0;
 	}
 
+	vector_bytes = (dut_pin_count + 7) / 8;
+	remap_setup(dut_pin_count, zif_get_vcc_pin());
+
 	// fill in port masks
 	for (uint8_t i=0 ; i<dut_pin_count ; i++) {
+		uint8_t zif_pin = zif_pos(dut_pin_count, i);
+		uint8_t port = zif_mcu_port(zif_pin);
+		uint8_t bit = _BV(zif_mcu_port_bit(zif_pin));
+
 		uint8_t pin_used = (params->pin_usage[i/8] >> (i%8)) & 1;
 		if (pin_used) {
-			uint8_t zif_pin = zif_pos(dut_pin_count, i);
-			int8_t port_pos = zif_mcu_port(zif_pin);
-			mcu_port[port_pos].mask |= _BV(zif_mcu_port_bit(zif_pin));
+			mcu_port[port].mask |= bit;
 		}
 	}
 
@@ -56,41 +87,53 @@ uint8_t logic_test_setup(uint8_t dut_pin_count, struct logic_params *params)
 }
 
 // -----------------------------------------------------------------------
-uint8_t logic_vectors_load(struct vectors *data, uint8_t dut_pin_count, uint8_t zif_vcc_pin)
+// Reorder bits of a received vector into MCU port pin order
+static void vector_decode(uint16_t pos, uint8_t *data)
 {
-	uint16_t chunk_vectors_count = data->vector_cnt;
-	uint8_t *vector_slice = data->vectors;
-	struct vector *v = vectors + vectors_count;
-	vectors_count += chunk_vectors_count;
+	uint8_t out[MCU_PORT_CNT];
+	bool check = remap_vector(data, out);
+
+	uint8_t *v = vector_data + pos * vector_stride;
+	v[VOFF(ZIF_PORT_0)] = out[ZIF_PORT_0];
+	v[VOFF(ZIF_PORT_2)] = out[ZIF_PORT_2];
+	if (vector_stride > VOFF(ZIF_PORT_1)) {
+		v[VOFF(ZIF_PORT_1)] = out[ZIF_PORT_1];
+	}
+
+	uint8_t *check_byte = vector_check + pos / 8;
+	if (check) {
+		*check_byte |= _BV(pos % 8);
+	} else {
+		*check_byte &= ~_BV(pos % 8);
+	}
+}
 
-	if (vectors_count > MAX_VECTORS) {
+// -----------------------------------------------------------------------
+// Vectors are decoded as they arrive, while the rest of the command is still being received.
+// Decoding a vector needs to take less time than receiving it (20us per byte at 500kbps),
+// otherwise receive buffer overflows.
+uint8_t logic_vectors_receive(uint16_t size)
+{
+	if (size < 2) {
+		serial_rx_skip(size);
 		return error(ERR_VECT_NUM);
 	}
 
-	// reorder bits in each vector into MCU port pin order
-	while (chunk_vectors_count--) {
-		// convert received vector bytes into a temporary 32-bit number
-		uint32_t bitvector = 0;
-		for (uint8_t i=0 ; i<dut_pin_count ; i+=8, vector_slice++) {
-			bitvector |= (uint32_t) *vector_slice << i;
-		}
+	uint16_t chunk_vectors_count = serial_rx_16le();
+	size -= 2;
 
-		// clear current vector data
-		for (uint8_t i=0 ; i<MCU_PORT_CNT ; i++) v->port[i].out = 0;
-		v->check = 1;
-
-		// fill in bits in MCU port pin order
-		for (uint8_t dut_pin=0 ; dut_pin<dut_pin_count ; dut_pin++) {
-			uint8_t zif_pin = zif_pos(dut_pin_count, dut_pin);
-			int8_t port_pos = zif_mcu_port(zif_pin);
-			uint8_t bit_val = (bitvector >> dut_pin) & 1;
-			if ((zif_pin == zif_vcc_pin) && bit_val) {
-				v->check = 0;
-			} else {
-				v->port[port_pos].out |= bit_val << zif_mcu_port_bit(zif_pin);
-			}
-		}
-		v++;
+	if (!vector_bytes || (vectors_count + chunk_vectors_count > max_vectors) || (size != chunk_vectors_count * vector_bytes)) {
+		serial_rx_skip(size);
+		return error(ERR_VECT_NUM);
+	}
+
+	uint8_t data[3];
+	uint16_t pos = vectors_count;
+	vectors_count += chunk_vectors_count;
+
+	while (chunk_vectors_count--) {
+		serial_rx_bytes(data, vector_bytes);
+		vector_decode(pos++, data);
 	}
 
 	return RESP_OK;
@@ -109,59 +152,96 @@ static uint8_t handle_failure(uint16_t pos, struct mcu_port_config *mcu_port)
 	failed_vector[ZIF_PORT_1] = ZIF_MCU_PIN_1;
 	failed_vector[ZIF_PORT_2] = ZIF_MCU_PIN_2;
 
-	if ((failed_vector[ZIF_PORT_0] & mcu_port[ZIF_PORT_0].mask) != vectors[pos].port[ZIF_PORT_0].out) return RESP_FAIL;
-	if ((failed_vector[ZIF_PORT_1] & mcu_port[ZIF_PORT_1].mask) != vectors[pos].port[ZIF_PORT_1].out) return RESP_FAIL;
-	if ((failed_vector[ZIF_PORT_2] & mcu_port[ZIF_PORT_2].mask) != vectors[pos].port[ZIF_PORT_2].out) return RESP_FAIL;
+	const uint8_t *v = vector_data + pos * vector_stride;
+	if ((failed_vector[ZIF_PORT_0] ^ v[VOFF(ZIF_PORT_0)]) & mcu_port[ZIF_PORT_0].mask) return RESP_FAIL;
+	if ((failed_vector[ZIF_PORT_2] ^ v[VOFF(ZIF_PORT_2)]) & mcu_port[ZIF_PORT_2].mask) return RESP_FAIL;
+	if ((vector_stride > VOFF(ZIF_PORT_1)) && ((failed_vector[ZIF_PORT_1] ^ v[VOFF(ZIF_PORT_1)]) & mcu_port[ZIF_PORT_1].mask)) return RESP_FAIL;
 
 	return RESP_TIMING_ERROR;
 }
 
 // -----------------------------------------------------------------------
-static inline uint8_t logic_run_2port(struct mcu_port_config *mcu_port)
+// Generic run loop, specialized for ports that need to be written ('wr' bitmask)
+// and checked ('chk' bitmask), and for tests where all vectors are checked.
+// Ports are accessed directly, so the specialization is done at compile time.
+// Input values and output masks are applied to the stored vectors on the fly.
+static inline __attribute__((always_inline)) uint8_t logic_run_ports(const uint8_t wr, const uint8_t chk, const bool all_checked)
 {
-	uint16_t local_delay = delay; // need to trick the optimizer :-(
-	for (uint16_t pos=0 ; pos<vectors_count ; pos++) {
-		ZIF_MCU_PORT_0 = vectors[pos].port[ZIF_PORT_0].in;
-		ZIF_MCU_PORT_2 = vectors[pos].port[ZIF_PORT_2].in;
-
-		if (!vectors[pos].check) continue;
-		if (local_delay) _delay_loop_2(local_delay);
+	struct mcu_port_config *mcu_port = run_port_cfg;
+	const uint8_t *v = vector_data;
+	const uint8_t *check = vector_check;
+	const uint8_t stride = vector_stride;
+	uint8_t check_bits = 0;
+	uint8_t check_bit = 0;
 
-		if ((ZIF_MCU_PIN_0 & mcu_port[ZIF_PORT_0].mask) != vectors[pos].port[ZIF_PORT_0].out) return handle_failure(pos, mcu_port);
-		if ((ZIF_MCU_PIN_2 & mcu_port[ZIF_PORT_2].mask) != vectors[pos].port[ZIF_PORT_2].out) return handle_failure(pos, mcu_port);
-	}
-
-	return RESP_PASS;
-}
-
-// -----------------------------------------------------------------------
-static inline uint8_t logic_run_3port(struct mcu_port_config *mcu_port)
-{
 	uint16_t local_delay = delay; // need to trick the optimizer :-(
-	for (uint16_t pos=0 ; pos<vectors_count ; pos++) {
-		ZIF_MCU_PORT_0 = vectors[pos].port[ZIF_PORT_0].in;
-		ZIF_MCU_PORT_1 = vectors[pos].port[ZIF_PORT_1].in;
-		ZIF_MCU_PORT_2 = vectors[pos].port[ZIF_PORT_2].in;
-
-		if (!vectors[pos].check) continue;
+	for (uint16_t pos=0 ; pos<vectors_count ; pos++, v+=stride) {
+		if (wr & _BV(ZIF_PORT_0)) ZIF_MCU_PORT_0 = (v[VOFF(ZIF_PORT_0)] & mcu_port[ZIF_PORT_0].output) | mcu_port[ZIF_PORT_0].pullup;
+		if (wr & _BV(ZIF_PORT_1)) ZIF_MCU_PORT_1 = (v[VOFF(ZIF_PORT_1)] & mcu_port[ZIF_PORT_1].output) | mcu_port[ZIF_PORT_1].pullup;
+		if (wr & _BV(ZIF_PORT_2)) ZIF_MCU_PORT_2 = (v[VOFF(ZIF_PORT_2)] & mcu_port[ZIF_PORT_2].output) | mcu_port[ZIF_PORT_2].pullup;
+
+		if (!all_checked) {
+			if (!check_bit) {
+				check_bit = 1;
+				check_bits = *check++;
+			}
+			uint8_t checked = check_bits & check_bit;
+			check_bit <<= 1;
+			if (!checked) continue;
+		}
 		if (local_delay) _delay_loop_2(local_delay);
 
-		if ((ZIF_MCU_PIN_0 & mcu_port[ZIF_PORT_0].mask) != vectors[pos].port[ZIF_PORT_0].out) return handle_failure(pos, mcu_port);
-		if ((ZIF_MCU_PIN_1 & mcu_port[ZIF_PORT_1].mask) != vectors[pos].port[ZIF_PORT_1].out) return handle_failure(pos, mcu_port);
-		if ((ZIF_MCU_PIN_2 & mcu_port[ZIF_PORT_2].mask) != vectors[pos].port[ZIF_PORT_2].out) return handle_failure(pos, mcu_port);
+		if ((chk & _BV(ZIF_PORT_0)) && ((ZIF_MCU_PIN_0 ^ v[VOFF(ZIF_PORT_0)]) & mcu_port[ZIF_PORT_0].mask)) return handle_failure(pos, mcu_port);
+		if ((chk & _BV(ZIF_PORT_1)) && ((ZIF_MCU_PIN_1 ^ v[VOFF(ZIF_PORT_1)]) & mcu_port[ZIF_PORT_1].mask)) return handle_failure(pos, mcu_port);
+		if ((chk & _BV(ZIF_PORT_2)) && ((ZIF_MCU_PIN_2 ^ v[VOFF(ZIF_PORT_2)]) & mcu_port[ZIF_PORT_2].mask)) return handle_failure(pos, mcu_port);
 	}
 
 	return RESP_PASS;
 }
 
+typedef uint8_t (*logic_run_fun)();
+
+#define PORT_COMBINATIONS 8
+
+#define LOGIC_RUN(wr, chk) \
+	static uint8_t logic_run_##wr##_##chk() { return logic_run_ports(wr, chk, false); } \
+	static uint8_t logic_run_##wr##_##chk##_all() { return logic_run_ports(wr, chk, true); }
+#define LOGIC_RUN_WR(wr) \
+	LOGIC_RUN(wr, 0) LOGIC_RUN(wr, 1) LOGIC_RUN(wr, 2) LOGIC_RUN(wr, 3) \
+	LOGIC_RUN(wr, 4) LOGIC_RUN(wr, 5) LOGIC_RUN(wr, 6) LOGIC_RUN(wr, 7)
+
+LOGIC_RUN_WR(0)
+LOGIC_RUN_WR(1)
+LOGIC_RUN_WR(2)
+LOGIC_RUN_WR(3)
+LOGIC_RUN_WR(4)
+LOGIC_RUN_WR(5)
+LOGIC_RUN_WR(6)
+LOGIC_RUN_WR(7)
+
+#define LOGIC_RUN_ENTRIES(wr, suffix) { \
+	logic_run_##wr##_0##suffix, logic_run_##wr##_1##suffix, logic_run_##wr##_2##suffix, logic_run_##wr##_3##suffix, \
+	logic_run_##wr##_4##suffix, logic_run_##wr##_5##suffix, logic_run_##wr##_6##suffix, logic_run_##wr##_7##suffix }
+#define LOGIC_RUN_TABLE(suffix) { \
+	LOGIC_RUN_ENTRIES(0, suffix), LOGIC_RUN_ENTRIES(1, suffix), LOGIC_RUN_ENTRIES(2, suffix), LOGIC_RUN_ENTRIES(3, suffix), \
+	LOGIC_RUN_ENTRIES(4, suffix), LOGIC_RUN_ENTRIES(5, suffix), LOGIC_RUN_ENTRIES(6, suffix), LOGIC_RUN_ENTRIES(7, suffix) }
+
+// [all vectors checked][ports written][ports checked]
+static const __flash logic_run_fun logic_run_funcs[2][PORT_COMBINATIONS][PORT_COMBINATIONS] = {
+	LOGIC_RUN_TABLE(),
+	LOGIC_RUN_TABLE(_all),
+};
+
 // -----------------------------------------------------------------------
-void logic_imeasure(uint8_t dut_pin_count)
+void logic_imeasure(struct mcu_port_config *mcu_port)
 {
-	for (uint16_t pos=0 ; pos<vectors_count ; pos++) {
-		ZIF_MCU_PORT_0 = vectors[pos].port[ZIF_PORT_0].in;
-		ZIF_MCU_PORT_1 = vectors[pos].port[ZIF_PORT_1].in;
-		if (dut_pin_count <= 16) {
-			ZIF_MCU_PORT_2 = vectors[pos].port[ZIF_PORT_2].in;
+	const uint8_t *v = vector_data;
+
+	for (uint16_t pos=0 ; pos<vectors_count ; pos++, v+=vector_stride) {
+		ZIF_MCU_PORT_0 = (v[VOFF(ZIF_PORT_0)] & mcu_port[ZIF_PORT_0].output) | mcu_port[ZIF_PORT_0].pullup;
+		ZIF_MCU_PORT_2 = (v[VOFF(ZIF_PORT_2)] & mcu_port[ZIF_PORT_2].output) | mcu_port[ZIF_PORT_2].pullup;
+		if (vector_stride > VOFF(ZIF_PORT_1)) {
+			ZIF_MCU_PORT_1 = (v[VOFF(ZIF_PORT_1)] & mcu_port[ZIF_PORT_1].output) | mcu_port[ZIF_PORT_1].pullup;
 		}
 
 		update_current_stats();
@@ -173,36 +253,47 @@ uint8_t logic_run(uint8_t dut_pin_count, uint16_t loops)
 {
 	uint8_t res;
 
-	// local copy for speed (pointer known at compile time)
-	struct mcu_port_config mcu_port_copy[MCU_PORT_CNT];
+	// local copy for speed (address known at compile time)
 	struct mcu_port_config *mcu_port = mcu_get_port_config();
 	if (!mcu_port) {
 		return error(ERR_NO_PINCFG);
 	}
-	for (uint8_t i=0 ; i<MCU_PORT_CNT ; i++) mcu_port_copy[i] = mcu_port[i];
+	for (uint8_t i=0 ; i<MCU_PORT_CNT ; i++) run_port_cfg[i] = mcu_port[i];
 
 	if (!vectors_count) {
 		return error(ERR_VECT_NUM);
 	}
 
-	// precompute input/output vectors with port masks
-	for (uint16_t pos=0 ; pos<vectors_count ; pos++) {
-		for (uint8_t port=0 ; port<MCU_PORT_CNT ; port++) {
-			vectors[pos].port[port].in = (vectors[pos].port[port].out & mcu_port[port].output) | mcu_port[port].pullup;
-			vectors[pos].port[port].out &= mcu_port[port].mask;
-		}
+	logic_imeasure(mcu_port);
+
+	// <=16-pin DUTs don't use port 1
+	uint8_t ports = (dut_pin_count <= 16) ? _BV(ZIF_PORT_0) | _BV(ZIF_PORT_2) : _BV(ZIF_PORT_0) | _BV(ZIF_PORT_1) | _BV(ZIF_PORT_2);
+	uint8_t wr = 0;
+	uint8_t chk = 0;
+	bool all_checked = true;
+
+	for (uint8_t port=0 ; port<MCU_PORT_CNT ; port++) {
+		if (!(ports & _BV(port))) continue;
+		// ports with no DUT inputs are set just once
+		if (mcu_port[port].output) wr |= _BV(port);
+		if (mcu_port[port].mask) chk |= _BV(port);
+	}
+	for (uint16_t i=0 ; i<vectors_count/8 ; i++) {
+		if (vector_check[i] != 0xff) all_checked = false;
+	}
+	if ((vectors_count % 8) && ((uint8_t) (vector_check[vectors_count/8] | (0xff << (vectors_count % 8))) != 0xff)) {
+		all_checked = false;
 	}
 
-	logic_imeasure(dut_pin_count);
+	// no DUT inputs on the port, only pull-ups are set
+	if ((ports & ~wr) & _BV(ZIF_PORT_0)) ZIF_MCU_PORT_0 = mcu_port[ZIF_PORT_0].pullup;
+	if ((ports & ~wr) & _BV(ZIF_PORT_1)) ZIF_MCU_PORT_1 = mcu_port[ZIF_PORT_1].pullup;
+	if ((ports & ~wr) & _BV(ZIF_PORT_2)) ZIF_MCU_PORT_2 = mcu_port[ZIF_PORT_2].pullup;
 
-	if (dut_pin_count <= 16) {
-		for (rep=0 ; rep<loops ; rep++) {
-			if ((res = logic_run_2port(mcu_port_copy)) != RESP_PASS) return res;
-		}
-	} else {
-		for (rep=0 ; rep<loops ; rep++) {
-			if ((res = logic_run_3port(mcu_port_copy)) != RESP_PASS) return res;
-		}
+	logic_run_fun run = logic_run_funcs[all_checked][wr][chk];
+
+	for (rep=0 ; rep<loops ; rep++) {
+		if ((res = run()) != RESP_PASS) return res;
 	}
 
 	return RESP_PASS;
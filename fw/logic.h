@@ -3,7 +3,8 @@
 
 #include <inttypes.h>
 
-uint8_t logic_vectors_load(struct vectors *data, uint8_t pin_count, uint8_t zif_vcc_pin);
+uint16_t logic_max_vectors(uint8_t dut_pin_count);
+uint8_t logic_vectors_receive(uint16_t size);
 uint8_t logic_test_setup(uint8_t dut_pin_count, struct logic_params *params);
 uint8_t logic_run(uint8_t dut_pin_count, uint16_t loops);
 uint16_t logic_store_result(uint8_t *buf, uint8_t dut_pin_count);
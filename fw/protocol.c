@@ -7,13 +7,21 @@
 static uint8_t error_reason = ERR_UNKNOWN;
 
 // -----------------------------------------------------------------------
-bool receive_cmd(uint8_t *buf, uint16_t buf_size)
+uint8_t receive_cmd_header(uint16_t *size)
 {
-	uint16_t size = serial_rx_16le();
+	*size = serial_rx_16le();
+	if (!*size) return 0;
 
+	(*size)--;
+	return serial_rx_char();
+}
+
+// -----------------------------------------------------------------------
+bool receive_cmd(uint8_t *buf, uint16_t size, uint16_t buf_size)
+{
 	if (size > buf_size) {
 		// flush incomming data
-		while (size--) serial_rx_char();
+		serial_rx_skip(size);
 		return false;
 	} else {
 		serial_rx_bytes(buf, size);
@@ -1,6 +1,9 @@
 #ifndef __PROTOCOL_H__
 #define __PROTOCOL_H__
 
+#define PROTOCOL_VERSION 1
+#define FIRMWARE_VERSION 1
+
 #define MAX_TEST_PARAMS 2
 #define MAX_CONFIGS 4
 
@@ -23,6 +26,17 @@ enum responses {
 	RESP_FAIL			= 131,
 	RESP_ERR			= 132,
 	RESP_TIMING_ERROR	= 133,
+	RESP_DATA			= 134,
+};
+
+enum data_types {
+	DATA_ITRACE		= 1,	// supply current trace
+	DATA_DRAM_FAILMAP	= 2,	// DRAM failing cells
+};
+
+enum run_flags {
+	RUN_FLAG_ITRACE	= 1,	// stream supply current measurements
+	RUN_FLAG_NO_IMEASURE	= 2,	// skip supply current measurements (ignored with RUN_FLAG_ITRACE)
 };
 
 enum error_types {
@@ -47,6 +61,8 @@ enum error_types {
 	ERR_UNKNOWN_CHIP	= 18,	// selected chip type is unknown
 	ERR_UNKNOWN_TEST	= 19,	// no such test for selected chip
 	ERR_OVERCURRENT	= 20, // current to high (> 190mA)
+	ERR_PROGRAM		= 21,	// invalid test program
+	ERR_RX_OVERFLOW	= 22,	// receive buffer overflow, data lost
 };
 
 enum test_type {
@@ -96,6 +112,7 @@ struct cmd_dut_powerup {
 
 struct cmd_run {
 	uint16_t loops;
+	uint8_t flags;
 };
 
 struct logic_params {
@@ -106,6 +123,12 @@ struct logic_params {
 struct dram_params {
 	uint8_t device;
 	uint8_t test_type;
+	uint8_t flags;
+	uint8_t program[];	// march program: element count, then for each element: header byte + operations
+};
+
+enum dram_flags {
+	DRAM_FLAG_FAILMAP	= 1,	// don't stop on failure, stream all failing cells
 };
 
 struct univib_params {
@@ -118,6 +141,14 @@ struct vectors {
 	uint8_t vectors[];
 };
 
+struct resp_hello {
+	uint8_t protocol_version;
+	uint8_t firmware_version;
+	uint16_t max_vectors_16;	// logic test vector capacity for <=16-pin DUTs
+	uint16_t max_vectors_24;	// logic test vector capacity for 20- and 24-pin DUTs
+	uint16_t reserved;
+};
+
 struct resp_logic_fail {
 	uint16_t loop_num;
 	uint16_t vector_num;
@@ -128,19 +159,50 @@ struct resp_dram_fail {
 	uint16_t row_address;
 	uint16_t column_address;
 	uint8_t march_step;
+	uint32_t failed_reads;
+	uint8_t failmap_overflow;
+};
+
+#define DRAM_SPEED_BIN_STEPS 8
+
+struct resp_dram_speed_bin {
+	uint32_t failed_reads[DRAM_SPEED_BIN_STEPS];	// for each sampling step (Dout read 1, 2, ... 8 CPU cycles after ~CAS falls)
+};
+
+#define DRAM_FAILRUN_DIR_DOWN 0x80
+
+struct resp_dram_failrun {
+	uint8_t march_step;			// step number, DRAM_FAILRUN_DIR_DOWN set for descending address order
+	uint16_t row_address;		// first failing cell
+	uint16_t column_address;
+	uint16_t length;			// consecutive failing cells (row-wise, or column-wise in page mode)
+};
+
+struct resp_univib_pulse {
+	uint16_t count;			// pulses measured
+	uint16_t min, max;		// pulse width (CPU cycles)
+	uint32_t sum;
+	uint64_t sum_sq;
+	uint16_t retrig_offset;	// last retrigger time, relative to the first trigger (CPU cycles)
 };
 
 struct resp_imeasure {
 	int16_t ivcc, ignd;
 };
 
+struct resp_itrace_point {
+	uint16_t vbus;
+	int16_t ivcc, ignd;
+};
+
 struct resp_logic_imeasure {
 	uint16_t min_vbus;
 	struct resp_imeasure max_ivcc, max_ignd;
 	struct resp_imeasure min_ivcc, min_ignd;
 };
 
-bool receive_cmd(uint8_t *buf, uint16_t buf_size);
+uint8_t receive_cmd_header(uint16_t *size);
+bool receive_cmd(uint8_t *buf, uint16_t size, uint16_t buf_size);
 void send_response(uint8_t *buf, uint16_t len);
 uint8_t error(uint8_t reason);
 uint8_t get_error();
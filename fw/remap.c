@@ -0,0 +1,72 @@
+#include <inttypes.h>
+#include <stdbool.h>
+
+#include "zif.h"
+#include "mcu.h"
+#include "remap.h"
+
+// Vector decoding tables: vector nibble value -> bits to set in each MCU port.
+// Built for the current DUT setup, each vector byte is remapped with two lookups.
+#define VECTOR_NIBBLES (ZIF_PIN_CNT / 4)
+
+static uint8_t vector_bytes;
+static uint8_t remap[VECTOR_NIBBLES][16][MCU_PORT_CNT];
+static uint8_t vcc_byte, vcc_mask;
+
+// -----------------------------------------------------------------------
+void remap_setup(uint8_t dut_pin_count, uint8_t vcc_zif_pin)
+{
+	vector_bytes = (dut_pin_count + 7) / 8;
+	vcc_byte = 0;
+	vcc_mask = 0;
+
+	for (uint8_t nibble=0 ; nibble<VECTOR_NIBBLES ; nibble++) {
+		for (uint8_t val=0 ; val<16 ; val++) {
+			for (uint8_t port=0 ; port<MCU_PORT_CNT ; port++) {
+				remap[nibble][val][port] = 0;
+			}
+		}
+	}
+
+	for (uint8_t i=0 ; i<dut_pin_count ; i++) {
+		uint8_t zif_pin = zif_pos(dut_pin_count, i);
+
+		if (zif_pin == vcc_zif_pin) {
+			// VCC pin bit is not a pin value, it's the "don't check" marker
+			vcc_byte = i / 8;
+			vcc_mask = 1 << (i % 8);
+		} else {
+			uint8_t port = zif_mcu_port(zif_pin);
+			uint8_t bit = 1 << zif_mcu_port_bit(zif_pin);
+			uint8_t (*table)[MCU_PORT_CNT] = remap[i / 4];
+			for (uint8_t val=0 ; val<16 ; val++) {
+				if (val & (1 << (i % 4))) {
+					table[val][port] |= bit;
+				}
+			}
+		}
+	}
+}
+
+// -----------------------------------------------------------------------
+// Reorder bits of a received vector into MCU port pin order, returns the "check outputs" flag
+bool remap_vector(const uint8_t *data, uint8_t *out)
+{
+	uint8_t (*table)[16][MCU_PORT_CNT] = remap;
+
+	for (uint8_t port=0 ; port<MCU_PORT_CNT ; port++) {
+		out[port] = 0;
+	}
+
+	for (uint8_t i=0 ; i<vector_bytes ; i++, table+=2) {
+		const uint8_t *lo = table[0][data[i] & 0x0f];
+		const uint8_t *hi = table[1][data[i] >> 4];
+		for (uint8_t port=0 ; port<MCU_PORT_CNT ; port++) {
+			out[port] |= lo[port] | hi[port];
+		}
+	}
+
+	return !(data[vcc_byte] & vcc_mask);
+}
+
+// vim: tabstop=4 shiftwidth=4 autoindent
@@ -0,0 +1,15 @@
+#ifndef __REMAP_H__
+#define __REMAP_H__
+
+#include <inttypes.h>
+#include <stdbool.h>
+
+// Vector bit order (DUT pin order) -> MCU port pin order.
+// No AVR dependencies, so it's also built natively by test/remap_test.c
+
+void remap_setup(uint8_t dut_pin_count, uint8_t vcc_zif_pin);
+bool remap_vector(const uint8_t *data, uint8_t *out);
+
+#endif
+
+// vim: tabstop=4 shiftwidth=4 autoindent
@@ -17,10 +17,33 @@
 
 #include <stddef.h>
 #include <inttypes.h>
+#include <stdbool.h>
 #include <avr/io.h>
+#include <avr/interrupt.h>
 
 #include "serial.h"
 
+// receive ring buffer, 8-bit indexes wrap around on their own
+#define RX_BUF_SIZE 256
+
+static volatile uint8_t rx_buf[RX_BUF_SIZE];
+static volatile uint8_t rx_head, rx_tail;
+static volatile bool rx_overflow;
+
+// -----------------------------------------------------------------------
+ISR(USART0_RX_vect)
+{
+	uint8_t c = UDR0;
+	uint8_t next = rx_head + 1;
+
+	if (next == rx_tail) {
+		rx_overflow = true;
+	} else {
+		rx_buf[rx_head] = c;
+		rx_head = next;
+	}
+}
+
 // -----------------------------------------------------------------------
 void serial_init(unsigned long baud)
 {
@@ -28,10 +51,28 @@ void serial_init(unsigned long baud)
 	uint16_t speed = F_CPU / 8 / baud-1;
 	UBRR0H = speed >> 8;
 	UBRR0L = speed;
-	UCSR0B = (1 << TXEN0) | (1 << RXEN0);
+	UCSR0B = (1 << TXEN0) | (1 << RXEN0) | (1 << RXCIE0);
 	UCSR0C = (1 << UCSZ01) | (1 << UCSZ00); // 8N1
 }
 
+// -----------------------------------------------------------------------
+// Receive interrupt is disabled for cycle-timed code (test runs).
+// The host doesn't send anything until it gets the response, bytes that arrive anyway
+// wait in the USART (2 bytes), overrun is reported as receive buffer overflow.
+void serial_rx_pause()
+{
+	UCSR0B &= ~(1 << RXCIE0);
+}
+
+// -----------------------------------------------------------------------
+void serial_rx_resume()
+{
+	if (UCSR0A & (1 << DOR0)) {
+		rx_overflow = true;
+	}
+	UCSR0B |= (1 << RXCIE0);
+}
+
 // -----------------------------------------------------------------------
 void serial_tx_char(uint8_t c)
 {
@@ -42,8 +83,16 @@ void serial_tx_char(uint8_t c)
 // -----------------------------------------------------------------------
 uint8_t serial_rx_char()
 {
-	while (!(UCSR0A & (1 << RXC0)));
-	return UDR0;
+	while (rx_head == rx_tail);
+	return rx_buf[rx_tail++];
+}
+
+// -----------------------------------------------------------------------
+bool serial_rx_overflow()
+{
+	bool overflow = rx_overflow;
+	rx_overflow = false;
+	return overflow;
 }
 
 // -----------------------------------------------------------------------
@@ -71,6 +120,14 @@ void serial_rx_bytes(uint8_t *data, uint16_t count)
 	}
 }
 
+// -----------------------------------------------------------------------
+void serial_rx_skip(uint16_t count)
+{
+	while (count--) {
+		serial_rx_char();
+	}
+}
+
 // -----------------------------------------------------------------------
 void serial_tx_bytes(uint8_t *data, uint16_t count)
 {
@@ -2,6 +2,7 @@
 #define __SERIAL_H__
 
 #include <inttypes.h>
+#include <stdbool.h>
 
 void serial_init(unsigned long baud);
 void serial_tx_char(uint8_t c);
@@ -10,6 +11,10 @@ uint8_t serial_rx_char();
 uint16_t serial_rx_16le();
 void serial_tx_16le(uint16_t v);
 void serial_rx_bytes(uint8_t *data, uint16_t count);
+void serial_rx_skip(uint16_t count);
+bool serial_rx_overflow();
+void serial_rx_pause();
+void serial_rx_resume();
 #endif
 
 // vim: tabstop=4 shiftwidth=4 autoindent
@@ -30,6 +30,9 @@ const __flash struct switch_drv {
 
 uint8_t switch_config[MAX_CONFIGS][SWITCH_CNT];
 uint8_t *switch_config_active;
+// configuration currently set on the switches, NULL if unknown
+uint8_t *switch_config_pushed;
+uint8_t switch_pins_pushed;
 
 // -----------------------------------------------------------------------
 void sw_init()
@@ -38,6 +41,7 @@ void sw_init()
 	i2c_b_init();
 	sw_config_clear();
 	switch_config_active = NULL;
+	switch_config_pushed = NULL;
 }
 
 // -----------------------------------------------------------------------
@@ -50,6 +54,7 @@ void sw_config_select(uint8_t cfgnum)
 void sw_on(uint8_t port, uint8_t bit)
 {
 	switch_config_active[port] |= _BV(bit);
+	switch_config_pushed = NULL;
 }
 
 // -----------------------------------------------------------------------
@@ -75,6 +80,14 @@ static void sw_push_config(uint8_t pin_type)
 		sw->i2c_write(switch_config);
 		sw->i2c_stop();
 	}
+	switch_config_pushed = switch_config_active;
+	switch_pins_pushed = pin_type;
+}
+
+// -----------------------------------------------------------------------
+bool sw_connected(uint8_t pin_type)
+{
+	return switch_config_active && (switch_config_active == switch_config_pushed) && (pin_type == switch_pins_pushed);
 }
 
 // -----------------------------------------------------------------------
@@ -85,6 +98,11 @@ bool sw_connect(uint8_t pin_type)
 		return false;
 	}
 
+	// switches are already set, no need to wait for them again
+	if (sw_connected(pin_type)) {
+		return true;
+	}
+
 	if (!sw_config_sane()) {
 		error(ERR_PIN_COMB);
 		return false;
@@ -104,6 +122,7 @@ void sw_config_clear()
 			switch_config[cfgnum][i] = 0;
 		}
 	}
+	switch_config_pushed = NULL;
 }
 
 // -----------------------------------------------------------------------
@@ -117,6 +136,7 @@ void sw_disconnect()
 	sw_push_config(SW_PINS_ALL);
 	_delay_us(SWITCH_ON_DELAY_US);
 	switch_config_active = NULL;
+	switch_config_pushed = NULL;
 }
 
 // vim: tabstop=4 shiftwidth=4 autoindent
@@ -17,6 +17,7 @@ void sw_init();
 void sw_on(uint8_t port, uint8_t bit);
 bool sw_config_sane();
 bool sw_connect(uint8_t pin_type);
+bool sw_connected(uint8_t pin_type);
 void sw_disconnect();
 void sw_config_clear();
 void sw_config_select(uint8_t cfgnum);
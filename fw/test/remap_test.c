@@ -0,0 +1,182 @@
+// Host-native test of vector remapping tables (remap.c):
+// compares them against the per-pin remapping for all DUT pin counts and VCC pin positions,
+// and measures the speedup.
+//
+//    make test
+
+#include <inttypes.h>
+#include <stdbool.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <time.h>
+
+#include "zif.h"
+#include "mcu.h"
+#include "remap.h"
+
+#define NO_VCC ZIF_PIN_CNT
+#define RANDOM_VECTORS 100000
+#define BENCH_VECTORS 2000000
+
+// -----------------------------------------------------------------------
+// ZIF pin translation, as in zif.c
+static const uint8_t zif_port_bit[ZIF_PIN_CNT] = {
+	ZIF_0_PORT_BIT, ZIF_1_PORT_BIT, ZIF_2_PORT_BIT, ZIF_3_PORT_BIT, ZIF_4_PORT_BIT, ZIF_5_PORT_BIT,
+	ZIF_6_PORT_BIT, ZIF_7_PORT_BIT, ZIF_8_PORT_BIT, ZIF_9_PORT_BIT, ZIF_10_PORT_BIT, ZIF_11_PORT_BIT,
+	ZIF_12_PORT_BIT, ZIF_13_PORT_BIT, ZIF_14_PORT_BIT, ZIF_15_PORT_BIT, ZIF_16_PORT_BIT, ZIF_17_PORT_BIT,
+	ZIF_18_PORT_BIT, ZIF_19_PORT_BIT, ZIF_20_PORT_BIT, ZIF_21_PORT_BIT, ZIF_22_PORT_BIT, ZIF_23_PORT_BIT
+};
+
+uint8_t zif_pos(uint8_t dut_pin_count, uint8_t dut_pin)
+{
+	return dut_pin < (dut_pin_count/2) ? dut_pin : ZIF_PIN_CNT-dut_pin_count + dut_pin;
+}
+
+uint8_t zif_mcu_port(uint8_t zif_pin)
+{
+	return zif_pin < 8 ? ZIF_PORT_0 : zif_pin < 16 ? ZIF_PORT_1 : ZIF_PORT_2;
+}
+
+uint8_t zif_mcu_port_bit(uint8_t zif_pin)
+{
+	return zif_port_bit[zif_pin];
+}
+
+// -----------------------------------------------------------------------
+// Per-pin remapping, as done before the tables
+static struct pin_map {
+	uint8_t port;
+	uint8_t bit;
+} pin_map[ZIF_PIN_CNT];
+static uint8_t ref_pins, ref_bytes, ref_vcc_pin;
+
+static void ref_setup(uint8_t dut_pin_count, uint8_t vcc_zif_pin)
+{
+	ref_pins = dut_pin_count;
+	ref_bytes = (dut_pin_count + 7) / 8;
+	ref_vcc_pin = ZIF_PIN_CNT;
+	for (uint8_t i=0 ; i<ZIF_PIN_CNT ; i++) {
+		pin_map[i].port = 0;
+		pin_map[i].bit = 0;
+	}
+	for (uint8_t i=0 ; i<dut_pin_count ; i++) {
+		uint8_t zif_pin = zif_pos(dut_pin_count, i);
+		pin_map[i].port = zif_mcu_port(zif_pin);
+		pin_map[i].bit = 1 << zif_mcu_port_bit(zif_pin);
+		if (zif_pin == vcc_zif_pin) {
+			ref_vcc_pin = i;
+		}
+	}
+}
+
+static bool ref_vector(const uint8_t *data, uint8_t *out)
+{
+	bool check = true;
+	for (uint8_t i=0 ; i<MCU_PORT_CNT ; i++) out[i] = 0;
+
+	const struct pin_map *pm = pin_map;
+	for (uint8_t i=0 ; i<ref_bytes ; i++) {
+		uint8_t byte = data[i];
+		for (uint8_t bit=0 ; bit<8 ; bit++, pm++, byte >>= 1) {
+			if (byte & 1) {
+				out[pm->port] |= pm->bit;
+			}
+		}
+	}
+
+	if (ref_vcc_pin < ref_pins) {
+		struct pin_map *vcc = pin_map + ref_vcc_pin;
+		if (out[vcc->port] & vcc->bit) {
+			check = false;
+			out[vcc->port] &= ~vcc->bit;
+		}
+	}
+	return check;
+}
+
+// -----------------------------------------------------------------------
+static int compare(uint8_t pins, uint8_t vcc, const uint8_t *data)
+{
+	uint8_t out[MCU_PORT_CNT], ref[MCU_PORT_CNT];
+	bool check = remap_vector(data, out);
+	bool ref_check = ref_vector(data, ref);
+
+	if ((check == ref_check) && (out[0] == ref[0]) && (out[1] == ref[1]) && (out[2] == ref[2])) {
+		return 0;
+	}
+	printf("FAIL: %u pins, VCC at ZIF pin %u, vector %02x %02x %02x: ports %02x %02x %02x check %u, expected %02x %02x %02x check %u\n",
+		pins, vcc, data[0], data[1], data[2], out[0], out[1], out[2], check, ref[0], ref[1], ref[2], ref_check);
+	return 1;
+}
+
+static double seconds()
+{
+	struct timespec ts;
+	clock_gettime(CLOCK_MONOTONIC, &ts);
+	return ts.tv_sec + ts.tv_nsec * 1e-9;
+}
+
+// -----------------------------------------------------------------------
+int main()
+{
+	int failures = 0;
+	int checked = 0;
+	srand(1);
+
+	for (uint8_t pins=2 ; pins<=ZIF_PIN_CNT ; pins+=2) {
+		uint8_t bytes = (pins + 7) / 8;
+		// VCC at each DUT pin, or not a DUT pin
+		for (uint8_t vcc=0 ; vcc<=ZIF_PIN_CNT ; vcc++) {
+			remap_setup(pins, vcc);
+			ref_setup(pins, vcc);
+			uint8_t data[3] = { 0 };
+			// every value of each vector byte, including padding bits past the last DUT pin
+			for (uint8_t i=0 ; i<bytes ; i++) {
+				for (uint16_t val=0 ; val<256 ; val++) {
+					data[0] = data[1] = data[2] = 0;
+					data[i] = val;
+					failures += compare(pins, vcc, data);
+					checked++;
+				}
+			}
+			for (uint32_t n=0 ; n<RANDOM_VECTORS ; n++) {
+				for (uint8_t i=0 ; i<3 ; i++) data[i] = i < bytes ? rand() : 0;
+				failures += compare(pins, vcc, data);
+				checked++;
+			}
+		}
+	}
+	printf("%d vectors checked, %d failures\n", checked, failures);
+
+	// remapping time per vector, VCC at the last DUT pin as usual
+	printf("\npins  per-pin [ns]  tables [ns]  speedup\n");
+	static uint8_t vectors[4096][3];
+	for (uint16_t n=0 ; n<4096 ; n++) {
+		for (uint8_t i=0 ; i<3 ; i++) vectors[n][i] = rand();
+	}
+	for (uint8_t pins=14 ; pins<=ZIF_PIN_CNT ; pins+=2) {
+		uint8_t vcc = zif_pos(pins, pins-1);
+		uint8_t out[MCU_PORT_CNT];
+		volatile uint8_t sink = 0;
+		remap_setup(pins, vcc);
+		ref_setup(pins, vcc);
+
+		double start = seconds();
+		for (uint32_t n=0 ; n<BENCH_VECTORS ; n++) {
+			sink += ref_vector(vectors[n % 4096], out) + out[0] + out[1] + out[2];
+		}
+		double ref_time = seconds() - start;
+
+		start = seconds();
+		for (uint32_t n=0 ; n<BENCH_VECTORS ; n++) {
+			sink += remap_vector(vectors[n % 4096], out) + out[0] + out[1] + out[2];
+		}
+		double time = seconds() - start;
+
+		printf("%4u  %12.2f  %11.2f  %6.2fx\n", pins, ref_time * 1e9 / BENCH_VECTORS, time * 1e9 / BENCH_VECTORS, ref_time / time);
+	}
+
+	return failures ? 1 : 0;
+}
+
+// vim: tabstop=4 shiftwidth=4 autoindent
@@ -1,5 +1,6 @@
 #include <inttypes.h>
 #include <stdbool.h>
+#include <string.h>
 #include <avr/io.h>
 #include <avr/cpufunc.h>
 #include <util/delay.h>
@@ -23,12 +24,16 @@ enum test_types {
 	TEST_CLEAR		= 3,
 	TEST_CROSSTRIG	= 4,
 	TEST_CLEARTRIG	= 5,
-	UNIVIB_TEST_MAX	= TEST_CLEARTRIG
+	TEST_PULSE		= 6,
+	TEST_RETRIG_PULSE	= 7,
+	UNIVIB_TEST_MAX	= TEST_RETRIG_PULSE
 };
 
 uint8_t univib_device;
 uint8_t univib_test_type;
 
+static struct resp_univib_pulse pulse;
+
 // 74121
 
 #define VAL_121_A1		_BV(ZIF_2_PORT_BIT)
@@ -63,6 +68,15 @@ uint8_t univib_test_type;
 #define RETRIG_LOOPS 6
 #define LAST_TRIG 0xff
 
+// pulse width measurement
+
+#define PULSE_TIMEOUT 0xffff
+#define PULSE_SAMPLES 48
+#define PULSE_SAMPLE_CYCLES 4	// LD + ST, see pulse_sample()
+#define PULSE_SAMPLE_OFFSET 5	// trigger edge to the first sample, estimated (not measured)
+
+static uint8_t pulse_samples[PULSE_SAMPLES];
+
 // {B, A2, A1} combinations that trigger 74121
 static const __flash uint8_t trigs_121[] = {
 	VAL_121_B |          0 |          0,
@@ -394,12 +408,91 @@ static inline uint8_t test_clear(const __flash struct univib_test *uvt)
 	return RESP_PASS;
 }
 
+// -----------------------------------------------------------------------
+static inline void pulse_stats_update(uint16_t width)
+{
+	if (width < pulse.min) pulse.min = width;
+	if (width > pulse.max) pulse.max = width;
+	pulse.sum += width;
+	pulse.sum_sq += (uint32_t) width * width;
+	pulse.count++;
+}
+
+// -----------------------------------------------------------------------
+// Sample Q output every PULSE_SAMPLE_CYCLES, right after the trigger.
+// Q pin differs between tests, so it is read through a pointer: LD from an I/O register
+// in data space and ST X+ take 2 cycles each.
+static inline __attribute__((always_inline)) void pulse_sample(const __flash struct univib_test *uvt)
+{
+	uint8_t *sample = pulse_samples;
+	asm volatile(
+		".rept %[samples]" "\n\t"
+		"ld __tmp_reg__, %a[pin]" "\n\t"
+		"st %a[sample]+, __tmp_reg__" "\n\t"
+		".endr" "\n\t"
+		: [sample] "+x" (sample)
+		: [pin] "z" (uvt->pin_q), [samples] "n" (PULSE_SAMPLES)
+		: "memory"
+	);
+}
+
+// -----------------------------------------------------------------------
+// Measure output pulse width, counted from the last (re)trigger.
+// Sampling start is shifted by 0..PULSE_SAMPLE_CYCLES-1 cycles for consecutive pulses, so the mean
+// width is resolved to a single cycle, even though the sampling period is longer.
+// Pulses longer than the sampling window are timed with Timer1 (running at F_CPU) only.
+static inline uint8_t test_pulse(const __flash struct univib_test *uvt, uint8_t retrigs)
+{
+	uint16_t start;
+	uint16_t width = 0;
+	uint8_t phase = pulse.count % PULSE_SAMPLE_CYCLES;
+
+	TCNT1 = 0;
+	TIFR1 = _BV(TOV1);
+
+	for (uint8_t i=0 ; i<retrigs ; i++) {
+		trig(uvt, uvt->val_trig);
+		_delay_us(0.5);
+	}
+
+	start = TCNT1;
+	switch (phase) {
+		case 0: trig(uvt, uvt->val_trig); pulse_sample(uvt); break;
+		case 1: trig(uvt, uvt->val_trig); _NOP(); pulse_sample(uvt); break;
+		case 2: trig(uvt, uvt->val_trig); _NOP(); _NOP(); pulse_sample(uvt); break;
+		default: trig(uvt, uvt->val_trig); _NOP(); _NOP(); _NOP(); pulse_sample(uvt); break;
+	}
+	pulse.retrig_offset = start;
+
+	for (uint8_t i=0 ; i<PULSE_SAMPLES ; i++) {
+		if (!(pulse_samples[i] & uvt->val_q)) {
+			width = PULSE_SAMPLE_OFFSET + phase + i * PULSE_SAMPLE_CYCLES;
+			break;
+		}
+	}
+
+	if (!width) {
+		while (output_active(uvt)) {
+			if (TIFR1 & _BV(TOV1)) break;
+		}
+		width = (TIFR1 & _BV(TOV1)) ? PULSE_TIMEOUT : TCNT1 - start;
+	}
+
+	pulse_stats_update(width);
+
+	// let the timing capacitor recover before the next trigger
+	_delay_us(2);
+
+	return RESP_PASS;
+}
+
 // -----------------------------------------------------------------------
 static uint8_t test_121(uint8_t test)
 {
 	switch (test) {
 		case TEST_NOTRIG: return test_no_trig(univib_test + UNIVIB_121);
 		case TEST_TRIG: return test_trig(univib_test + UNIVIB_121);
+		case TEST_PULSE: return test_pulse(univib_test + UNIVIB_121, 0);
 		default:
 			return error(ERR_UNKNOWN_TEST);
 	}
@@ -414,6 +507,8 @@ static uint8_t test_122(uint8_t test)
 		case TEST_RETRIG: return test_retrig(univib_test + UNIVIB_122);
 		case TEST_CLEAR: return test_clear(univib_test + UNIVIB_122);
 		case TEST_CLEARTRIG: return test_cleartrig(univib_test + UNIVIB_122);
+		case TEST_PULSE: return test_pulse(univib_test + UNIVIB_122, 0);
+		case TEST_RETRIG_PULSE: return test_pulse(univib_test + UNIVIB_122, RETRIG_LOOPS);
 		default:
 			return error(ERR_UNKNOWN_TEST);
 	}
@@ -429,6 +524,8 @@ static uint8_t test_123_1(uint8_t test)
 		case TEST_CLEAR: return test_clear(univib_test + UNIVIB_123_1);
 		case TEST_CROSSTRIG: return test_crosstrig(univib_test + UNIVIB_123_1);
 		case TEST_CLEARTRIG: return test_cleartrig(univib_test + UNIVIB_123_1);
+		case TEST_PULSE: return test_pulse(univib_test + UNIVIB_123_1, 0);
+		case TEST_RETRIG_PULSE: return test_pulse(univib_test + UNIVIB_123_1, RETRIG_LOOPS);
 		default:
 			return error(ERR_UNKNOWN_TEST);
 	}
@@ -444,6 +541,8 @@ static uint8_t test_123_2(uint8_t test)
 		case TEST_CLEAR: return test_clear(univib_test + UNIVIB_123_2);
 		case TEST_CROSSTRIG: return test_crosstrig(univib_test + UNIVIB_123_2);
 		case TEST_CLEARTRIG: return test_cleartrig(univib_test + UNIVIB_123_2);
+		case TEST_PULSE: return test_pulse(univib_test + UNIVIB_123_2, 0);
+		case TEST_RETRIG_PULSE: return test_pulse(univib_test + UNIVIB_123_2, RETRIG_LOOPS);
 		default:
 			return error(ERR_UNKNOWN_TEST);
 	}
@@ -454,6 +553,17 @@ uint8_t univib_run(uint16_t loops)
 {
 	uint8_t res;
 
+	pulse.count = 0;
+	pulse.min = PULSE_TIMEOUT;
+	pulse.max = 0;
+	pulse.sum = 0;
+	pulse.sum_sq = 0;
+	pulse.retrig_offset = 0;
+
+	// Timer1 is used for pulse width measurements only
+	TCCR1A = 0;
+	TCCR1B = _BV(CS10);
+
 	for (uint16_t rep=0 ; rep<loops ; rep++) {
 		switch (univib_device) {
 			case UNIVIB_121:
@@ -473,9 +583,22 @@ uint8_t univib_run(uint16_t loops)
 		}
 	}
 
+	TCCR1B = 0;
+
 	test_imeasure(univib_test + univib_device);
 
 	return RESP_PASS;
 }
 
+// -----------------------------------------------------------------------
+uint16_t univib_store_pass_result(uint8_t *buf)
+{
+	if ((univib_test_type != TEST_PULSE) && (univib_test_type != TEST_RETRIG_PULSE)) {
+		return 0;
+	}
+
+	memcpy(buf, &pulse, sizeof(struct resp_univib_pulse));
+	return sizeof(struct resp_univib_pulse);
+}
+
 // vim: tabstop=4 shiftwidth=4 autoindent
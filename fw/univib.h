@@ -5,6 +5,7 @@
 
 uint8_t univib_test_setup(struct univib_params *params);
 uint8_t univib_run(uint16_t loops);
+uint16_t univib_store_pass_result(uint8_t *buf);
 
 #endif
 
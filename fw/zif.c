@@ -184,6 +184,12 @@ bool zif_connect()
 	return true;
 }
 
+// -----------------------------------------------------------------------
+bool zif_connected()
+{
+	return sw_connected(SW_PINS_ALL);
+}
+
 // -----------------------------------------------------------------------
 void zif_disconnect()
 {
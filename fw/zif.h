@@ -62,6 +62,7 @@ bool zif_func(uint8_t func, uint8_t zif_pin);
 bool zif_power_up(uint16_t *vbus, int16_t *ivcc, int16_t *ignd, bool safty_off);
 void zif_config_select(uint8_t cfgnum);
 bool zif_connect();
+bool zif_connected();
 void zif_disconnect();
 void zif_config_clear();
 uint8_t zif_get_vcc_pin();